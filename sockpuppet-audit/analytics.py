@@ -0,0 +1,330 @@
+"""
+Incremental recommendation-audit metrics over data/logs.
+
+Per platform/persona/day:
+  n_recs, unique_recs, entropy_bits, norm_entropy  diversity of recommended ids
+  seed_match      share of titled recs sharing a word with the seed query
+                  (1 = on-topic, falling values = drift away from the seed)
+  n_watched, followed_share, rabbit_hole_depth
+                  how often the next watched video came from the previous
+                  video's recs, and the longest run of such follows
+Per platform/day: Jaccard overlap of rec sets between persona pairs.
+
+Each run reads only bytes appended since the last run (offsets per file) and
+folds them into small per-day aggregates under <out>/.state/<day>/, so only
+days that received new rows are recomputed. A run's new state files and
+offsets are committed together through <out>/.state/commit.json (written
+first, replayed if the run dies mid-rename), so rows are never counted twice.
+
+    python analytics.py --logs data/logs --out data/analytics
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import ensure_dir
+from sqlite_store import HEAD_BYTES, fingerprint
+
+KEY = ["platform", "persona"]
+
+
+# -------------------------- incremental reads --------------------------
+class Offsets:
+    """Byte offset, header and head fingerprint per log file, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+
+    def read_new(self, csv_path):
+        """New complete records of csv_path since the last call, as strings."""
+        st = self.files.get(csv_path, {"offset": 0, "header": None})
+        size = os.path.getsize(csv_path)
+        head = st.get("head")  # absent for offsets saved before fingerprints: only shrinking is detectable
+        if size < st["offset"] or (head and fingerprint(csv_path, int(head.split(":")[1])) != head):
+            # rotated, replaced or rewritten: the stored offset and header belong to another file
+            st = {"offset": 0, "header": None}
+        if size == st["offset"]:
+            return None
+        with open(csv_path, "rb") as f:
+            f.seek(st["offset"])
+            data = f.read(size - st["offset"])
+        ends = record_ends(data)  # never consume a half-written record
+        if not len(ends):
+            return None
+        end = int(ends[-1]) + 1
+        data = data[:end]
+        header = st["header"]
+        if header is None:
+            first, data = data[:ends[0]], data[ends[0] + 1:]
+            header = next(csv.reader([first.decode("utf-8").rstrip("\r")]))
+        offset = st["offset"] + end
+        self.files[csv_path] = {"offset": offset, "header": header,
+                                "head": fingerprint(csv_path, min(offset, HEAD_BYTES))}
+        if not data.strip():
+            return None
+        return pd.read_csv(io.BytesIO(data), names=header, header=None, dtype=str,
+                           keep_default_na=False)
+
+    def stage(self):
+        """Write the offsets next to their file; commit() moves them into place."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.files, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp, self.path
+
+    def save(self):
+        os.replace(*self.stage())
+
+
+def record_ends(data):
+    """Positions of the newlines in data that end a csv record (not inside a quoted field)."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    quotes = np.cumsum(b == ord('"'))  # "" escapes toggle twice, so parity is the quote state
+    nl = np.flatnonzero(b == ord("\n"))
+    return nl[quotes[nl] % 2 == 0]
+
+
+def read_new_rows(offsets, logs_root, table):
+    """Concatenate new rows of every <table>.csv, tagged with platform/persona/day from the path."""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(logs_root, "*", "*", "*", f"{table}.csv"))):
+        df = offsets.read_new(path)
+        if df is None or df.empty:
+            continue
+        platform, persona, day = path.split(os.sep)[-4:-1]
+        df["platform"], df["persona"], df["day"] = platform, persona, day
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# -------------------------- per-day state --------------------------
+def _load(state_dir, name, columns):
+    path = os.path.join(state_dir, f"{name}.pkl")
+    return pd.read_pickle(path) if os.path.exists(path) else pd.DataFrame(columns=columns)
+
+
+def _fold(state, new, by, cols):
+    """Add new aggregate rows into state (sum of cols by key)."""
+    both = pd.concat([state, new]) if len(state) else new
+    return both.groupby(by, as_index=False)[cols].sum().astype({c: "int64" for c in cols})
+
+
+def _stage(df, state_dir, name):
+    ensure_dir(state_dir)
+    path = os.path.join(state_dir, f"{name}.pkl")
+    df.to_pickle(path + ".tmp")
+    with open(path + ".tmp", "rb") as f:
+        os.fsync(f.fileno())
+    return path + ".tmp", path
+
+
+# -------------------------- commit --------------------------
+def commit(state_root, staged):
+    """Move staged (tmp, path) files into place as one step: all of them or, after a crash, replay."""
+    journal = os.path.join(state_root, "commit.json")
+    with open(journal + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(staged, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(journal + ".tmp", journal)
+    recover(state_root)
+
+
+def recover(state_root):
+    """Finish a commit a crashed run left behind; without commit.json, staged files are ignored."""
+    journal = os.path.join(state_root, "commit.json")
+    if not os.path.exists(journal):
+        return
+    with open(journal, "r", encoding="utf-8") as f:
+        staged = json.load(f)
+    for tmp, path in staged:
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+    os.remove(journal)
+
+
+# -------------------------- metrics --------------------------
+def seed_matches(recs):
+    """Boolean Series: rec_title shares a word (3+ letters) with seed_query; NaN when untitled."""
+    out = pd.Series(np.nan, index=recs.index)
+    if "rec_title" not in recs:
+        return out
+    titled = recs["rec_title"].fillna("") != ""
+    for seed, idx in recs[titled].groupby("seed_query").groups.items():
+        words = sorted({w for w in re.findall(r"\w{3,}", str(seed).lower())})
+        if not words:
+            continue
+        pat = r"\b(?:" + "|".join(map(re.escape, words)) + r")\b"
+        # titles repeat heavily; match each distinct title once
+        codes, uniq = pd.factorize(recs.loc[idx, "rec_title"])
+        hits = pd.Series(uniq).str.contains(pat, case=False, regex=True).to_numpy(dtype=float)
+        out.loc[idx] = hits[codes]
+    return out
+
+
+def diversity(counts):
+    """Entropy of rec_vid counts per platform/persona."""
+    c = counts[counts["n"] > 0].copy()
+    total = c.groupby(KEY)["n"].transform("sum")
+    p = c["n"] / total
+    c["h"] = -p * np.log2(p)
+    out = c.groupby(KEY).agg(n_recs=("n", "sum"), unique_recs=("rec_vid", "size"), entropy_bits=("h", "sum"))
+    out["norm_entropy"] = out["entropy_bits"] / np.log2(out["unique_recs"].clip(lower=2))
+    return out
+
+
+def overlap(counts):
+    """Jaccard of rec_vid sets for every persona pair within a platform."""
+    u = counts.loc[counts["n"] > 0, KEY + ["rec_vid"]].drop_duplicates()
+    sizes = u.groupby(KEY).size()
+    m = u.merge(u, on=["platform", "rec_vid"], suffixes=("_a", "_b"))
+    m = m[m["persona_a"] < m["persona_b"]]
+    shared = m.groupby(["platform", "persona_a", "persona_b"]).size().rename("shared").reset_index()
+    na = sizes.rename("n_a").reset_index().rename(columns={"persona": "persona_a"})
+    nb = sizes.rename("n_b").reset_index().rename(columns={"persona": "persona_b"})
+    shared = shared.merge(na, on=["platform", "persona_a"]).merge(nb, on=["platform", "persona_b"])
+    shared["jaccard"] = shared["shared"] / (shared["n_a"] + shared["n_b"] - shared["shared"])
+    return shared[["platform", "persona_a", "persona_b", "shared", "jaccard"]]
+
+
+def advance_chains(watched, pairs, chains):
+    """
+    Extend per-persona follow chains with newly watched rows.
+
+    watched: new rows (platform, persona, video_id) in log order
+    pairs:   known (platform, persona, watching, rec_vid) rec edges for the day
+    chains:  carried state per persona: last_vid, cur_run, max_run, n_watched, followed
+    """
+    carry = chains.rename(columns={"last_vid": "video_id"})[KEY + ["video_id"]].assign(_carry=True)
+    seq = pd.concat([carry, watched[KEY + ["video_id"]].assign(_carry=False)], ignore_index=True)
+    seq["_order"] = np.arange(len(seq))
+    seq = seq.sort_values(KEY + ["_order"], kind="stable")  # carried row first, then log order
+    seq["next_vid"] = seq.groupby(KEY)["video_id"].shift(-1)
+
+    trans = seq[seq["next_vid"].notna()]
+    edges = pairs[KEY + ["watching", "rec_vid"]].drop_duplicates().assign(_hit=True)
+    trans = trans.merge(edges, how="left", left_on=KEY + ["video_id", "next_vid"],
+                        right_on=KEY + ["watching", "rec_vid"])
+    trans = trans.merge(chains[KEY + ["cur_run"]].rename(columns={"cur_run": "_carry_run"}), on=KEY, how="left")
+    trans = trans.sort_values("_order", kind="stable").reset_index(drop=True)
+    trans["followed"] = trans["_hit"].eq(True)
+
+    # run length of consecutive follows; segment 0 continues the carried run
+    keys = [trans[k] for k in KEY]
+    seg = (~trans["followed"]).groupby(keys).cumsum()
+    run = trans["followed"].astype(int).groupby(keys + [seg]).cumsum()
+    carried = pd.to_numeric(trans["_carry_run"], errors="coerce").fillna(0).astype(int)
+    trans["run"] = run + np.where(seg == 0, carried, 0)
+    prev = chains.set_index(KEY)
+
+    g = trans.groupby(KEY)
+    upd = pd.DataFrame({"cur_run": g["run"].last(), "max_run": g["run"].max(),
+                        "followed": g["followed"].sum(), "transitions": g.size()})
+    last = seq.groupby(KEY)["video_id"].last().rename("last_vid")
+    n_new = watched.groupby(KEY).size().rename("n_new")
+
+    out = prev.reindex(prev.index.union(last.index))
+    out["last_vid"] = last
+    for col in ("cur_run", "max_run", "n_watched", "followed", "transitions"):
+        out[col] = pd.to_numeric(out.get(col), errors="coerce").fillna(0).astype(int)
+    out.loc[upd.index, "cur_run"] = upd["cur_run"].astype(int)
+    out.loc[upd.index, "max_run"] = np.maximum(out.loc[upd.index, "max_run"], upd["max_run"].astype(int))
+    out.loc[upd.index, "followed"] += upd["followed"].astype(int)
+    out.loc[upd.index, "transitions"] += upd["transitions"].astype(int)
+    out.loc[n_new.index, "n_watched"] += n_new
+    return out.reset_index()
+
+
+CHAIN_COLS = KEY + ["last_vid", "cur_run", "max_run", "n_watched", "followed", "transitions"]
+
+
+def update_day(day, recs, watched, state_root, out_root, staged):
+    """Fold one day's new rows into its state (appended to staged) and rewrite that day's metrics."""
+    state_dir = os.path.join(state_root, day)
+    counts = _load(state_dir, "rec_counts", KEY + ["rec_vid", "n"])
+    seed = _load(state_dir, "seed", KEY + ["matched", "titled"])
+    chains = _load(state_dir, "chains", CHAIN_COLS)
+    pairs = _load(state_dir, "pairs", KEY + ["watching", "rec_vid"])
+
+    if not recs.empty:
+        new_counts = recs.groupby(KEY + ["rec_vid"]).size().rename("n").reset_index()
+        counts = _fold(counts, new_counts, KEY + ["rec_vid"], ["n"])
+        m = seed_matches(recs)
+        new_seed = pd.DataFrame({"platform": recs["platform"], "persona": recs["persona"],
+                                 "matched": m.fillna(0), "titled": m.notna().astype(int)})
+        seed = _fold(seed, new_seed, KEY, ["matched", "titled"])
+        new_pairs = recs[KEY + ["watching", "rec_vid"]]
+        pairs = (pd.concat([pairs, new_pairs]) if len(pairs) else new_pairs).drop_duplicates()
+
+    if not watched.empty:
+        chains = advance_chains(watched, pairs, chains)
+        # only edges out of each persona's current video can still matter
+        open_vids = chains[KEY + ["last_vid"]].rename(columns={"last_vid": "watching"})
+        seen = watched[KEY + ["video_id"]].rename(columns={"video_id": "watching"}).drop_duplicates()
+        keep = pairs.merge(open_vids.assign(_open=True), on=KEY + ["watching"], how="left") \
+                    .merge(seen.assign(_seen=True), on=KEY + ["watching"], how="left")
+        pairs = keep.loc[keep["_open"].eq(True) | keep["_seen"].ne(True), KEY + ["watching", "rec_vid"]]
+
+    for name, df in (("rec_counts", counts), ("seed", seed), ("chains", chains), ("pairs", pairs)):
+        staged.append(_stage(df, state_dir, name))
+
+    metrics = diversity(counts) if len(counts) else pd.DataFrame()
+    if len(seed):
+        s = seed.set_index(KEY)
+        metrics = metrics.join((s["matched"] / s["titled"].where(s["titled"] > 0)).rename("seed_match"), how="outer")
+    if len(chains):
+        c = chains.set_index(KEY)
+        metrics = metrics.join(pd.DataFrame({
+            "n_watched": c["n_watched"],
+            "followed_share": c["followed"] / c["transitions"].where(c["transitions"] > 0),
+            "rabbit_hole_depth": c["max_run"]}), how="outer")
+    day_out = os.path.join(out_root, day)
+    ensure_dir(day_out)
+    metrics.reset_index().assign(day=day).to_csv(os.path.join(day_out, "persona_metrics.csv"), index=False)
+    if len(counts):
+        overlap(counts).assign(day=day).to_csv(os.path.join(day_out, "overlap.csv"), index=False)
+    return metrics
+
+
+def update(logs_root="data/logs", out_root="data/analytics"):
+    """Process rows appended since the last run; returns {day: metrics DataFrame}."""
+    state_root = os.path.join(out_root, ".state")
+    ensure_dir(state_root)
+    recover(state_root)
+    offsets = Offsets(os.path.join(state_root, "offsets.json"))
+    recs = read_new_rows(offsets, logs_root, "recs")
+    watched = read_new_rows(offsets, logs_root, "watched")
+    days = sorted(set(recs.get("day", [])) | set(watched.get("day", [])))
+    results, staged = {}, []
+    for day in days:
+        r = recs[recs["day"] == day] if len(recs) else recs
+        w = watched[watched["day"] == day] if len(watched) else watched
+        results[day] = update_day(day, r, w, state_root, out_root, staged)
+    staged.append(offsets.stage())
+    commit(state_root, staged)
+    return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Incremental rec-audit metrics.")
+    ap.add_argument("--logs", default="data/logs")
+    ap.add_argument("--out", default="data/analytics")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    results = update(args.logs, args.out)
+    print(f"Updated {len(results)} day(s) in {time.time() - t0:.2f}s: {', '.join(results) or '-'}")
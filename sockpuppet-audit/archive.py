@@ -0,0 +1,361 @@
+"""
+Content-addressed archive of the raw inputs behind each logged item, so rows
+can be re-extracted offline after a markup change instead of re-running days
+of dwell time.
+
+    data/archive/blobs/<sha[:2]>/<sha256>.zst            one zstd frame per blob
+    data/archive/index/<platform>/<persona>/<day>.jsonl  one line per item
+
+A blob is named by the sha256 of its uncompressed bytes (JSON is serialized
+canonically first), so a SIGI_STATE entry or API response seen by several
+personas is stored once. Index lines carry what the raw data can't give back
+(timestamps, seed query, dwell, is_repeat) and the blob hashes by kind:
+
+    youtube watch:   page ({title, url, duration}), sidebar_html, initial_data
+                     (ytInitialData, first page only), responses ([[endpoint, sha]]
+                     youtubei next/player, with --capture)
+    tiktok item:     sigi (ItemModule entry), html (the feed item's markup)
+    tiktok response: response (item_list / recommend JSON, with --capture)
+
+Index lines are buffered and written when the scraper's log flushes.
+
+    python archive.py reextract --workers 8    # -> data/reextract/<platform>/<persona>/<day>/*.csv
+    python archive.py stats
+
+reextract loads each archived fragment into a headless page and runs the
+current extractors (SNAPSHOT_JS / parse_snapshot, the feed harvester,
+item_fields, extract_current_video, capture parsers) on it, one browser per
+worker process. is_repeat is carried over for watched/feed rows and left empty
+for recs, which depend on the persona's full history.
+"""
+import argparse
+import glob
+import hashlib
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import ensure_dir, write_rows
+
+ARCHIVE_ROOT = "data/archive"
+REEXTRACT_ROOT = "data/reextract"
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class Archive:
+    def __init__(self, root=ARCHIVE_ROOT, level=10):
+        import zstandard
+        self.root = root
+        self.level = level
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+        self.known = set()   # hashes already on disk (saves a stat per put)
+        self.pending = {}    # index path -> [json lines]
+        self.stats = {"puts": 0, "new_blobs": 0, "raw_bytes": 0, "stored_bytes": 0, "records": 0}
+
+    def blob_path(self, sha):
+        return os.path.join(self.root, "blobs", sha[:2], sha + ".zst")
+
+    def index_path(self, platform, persona, day):
+        return os.path.join(self.root, "index", platform, persona, f"{day}.jsonl")
+
+    # -------------------------- blobs --------------------------
+    def put(self, data):
+        """Store bytes (or str) once; returns the sha256 hex digest."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        self.stats["puts"] += 1
+        self.stats["raw_bytes"] += len(data)
+        if sha in self.known:
+            return sha
+        path = self.blob_path(sha)
+        if not os.path.exists(path):
+            ensure_dir(os.path.dirname(path))
+            frame = self.compressor.compress(data)
+            tmp = f"{path}.{os.getpid()}.tmp"  # a reader (or another persona) never sees half a blob
+            with open(tmp, "wb") as f:
+                f.write(frame)
+            os.replace(tmp, path)
+            self.stats["new_blobs"] += 1
+            self.stats["stored_bytes"] += len(frame)
+        self.known.add(sha)
+        return sha
+
+    def put_json(self, obj):
+        return self.put(_canonical(obj))
+
+    def get(self, sha):
+        with open(self.blob_path(sha), "rb") as f:
+            return self.decompressor.decompress(f.read())
+
+    def get_json(self, sha):
+        return json.loads(self.get(sha))
+
+    # -------------------------- index --------------------------
+    def record(self, platform, persona, day, entry):
+        """Queue one index line; written out by flush()."""
+        path = self.index_path(platform, persona, day)
+        self.pending.setdefault(path, []).append(json.dumps(entry, ensure_ascii=False))
+        self.stats["records"] += 1
+
+    def flush(self):
+        for path, lines in self.pending.items():
+            ensure_dir(os.path.dirname(path))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['records']} items, {s['puts']} blobs ({s['new_blobs']} new), "
+                f"{s['raw_bytes'] / 1e6:.1f} MB raw -> {s['stored_bytes'] / 1e6:.1f} MB stored")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_index(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def partitions(root=ARCHIVE_ROOT, platform=None, persona=None, since=None, until=None):
+    """(platform, persona, day, index path) for every index file matching the filters."""
+    out = []
+    for path in sorted(glob.glob(os.path.join(root, "index", "*", "*", "*.jsonl"))):
+        rest, name = os.path.split(path)
+        rest, pers = os.path.split(rest)
+        plat = os.path.basename(rest)
+        day = name[:-len(".jsonl")]
+        if (platform and plat != platform) or (persona and pers != persona) \
+                or (since and day < since) or (until and day > until):
+            continue
+        out.append((plat, pers, day, path))
+    return out
+
+
+# -------------------------- re-extraction --------------------------
+class _Pages:
+    """One headless page per worker, launched only if a partition needs the DOM."""
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self.pw = self.browser = self.page = None
+
+    def __call__(self):
+        if self.page is None:
+            from playwright.sync_api import sync_playwright
+            self.pw = sync_playwright().start()
+            self.browser = self.pw.chromium.launch(headless=self.headless)
+            self.page = self.browser.new_page()
+            self.page.route("**/*", lambda route: route.abort())  # archived markup stays offline
+        return self.page
+
+    def close(self):
+        if self.browser:
+            self.browser.close()
+        if self.pw:
+            self.pw.stop()
+
+
+def _reextract_youtube(arc, entries, pages):
+    from capture import ResponseCapture, YT_NEXT, YT_PLAYER
+    from youtube.simple_watch_YT import SNAPSHOT_JS, parse_snapshot
+
+    watched, recs = [], []
+    for e in entries:
+        if e.get("kind") != "watch":
+            continue
+        b = e.get("blobs") or {}
+        meta = arc.get_json(b["page"]) if b.get("page") else {}
+        snap = parse_snapshot({"url": meta.get("url") or f"watch?v={e['video_id']}", "title": meta.get("title", ""),
+                               "duration": meta.get("duration", "")})
+        if b.get("sidebar_html"):
+            page = pages()
+            page.set_content(f"<!doctype html><html><head><meta charset='utf-8'>"
+                             f"<title>{html.escape(meta.get('title', ''))}</title></head><body>"
+                             f"<span class='ytp-time-duration'>{html.escape(meta.get('duration', ''))}</span>"
+                             f"{arc.get(b['sidebar_html']).decode('utf-8')}</body></html>")
+            raw = page.evaluate(SNAPSHOT_JS, 20)
+            raw["url"] = meta.get("url", "")  # about:blank in the replay page
+            snap = parse_snapshot(raw)
+
+        cap = ResponseCapture()
+        if b.get("initial_data"):
+            cap.feed(YT_NEXT, arc.get_json(b["initial_data"]))  # same shape as a next response
+        for endpoint, sha in b.get("responses") or []:
+            cap.feed(YT_PLAYER if endpoint == "player" else YT_NEXT, arc.get_json(sha))
+        net = cap.take(snap["video_id"] or e["video_id"])
+        # as in the live run: API data wins when it was captured, otherwise it only fills gaps
+        if net and (e.get("capture") or not snap["recs"]):
+            snap["recs"] = net["recs"] or snap["recs"]
+        if net and (e.get("capture") or not snap["duration_secs"]):
+            snap["duration_secs"] = net["meta"].get("duration_secs") or snap["duration_secs"]
+
+        vid_id = snap["video_id"] or e["video_id"]
+        recs += [{"ts": e["ts"], "persona": e["persona"], "seed_query": e.get("seed_query", ""),
+                  "watching": vid_id, **r, "is_repeat": ""} for r in snap["recs"]]
+        watched.append({"ts": e.get("watched_ts") or e["ts"], "persona": e["persona"],
+                        "seed_query": e.get("seed_query", ""), "video_id": vid_id, "title": snap["title"],
+                        "dwell_secs": e.get("dwell_secs", ""), "duration_secs": snap["duration_secs"],
+                        "is_repeat": e.get("is_repeat", "")})
+    return {"watched.csv": watched, "recs.csv": recs}
+
+
+def _reextract_tiktok(arc, entries, pages):
+    from capture import FeedCapture, parse_tt_feed
+    from harvest import HARVEST_JS, FeedHarvester
+    from tiktok.simple_watch_TT_v4 import FEED_HEADER, ItemCache, extract_current_video, item_fields
+
+    netcap = FeedCapture(max_items=None)
+    feed_recs = []
+    for e in entries:
+        if e.get("kind") == "response" and (e.get("blobs") or {}).get("response"):
+            data = arc.get_json(e["blobs"]["response"])
+            netcap.feed(data)
+            feed_recs += [{"ts_iso": e["ts"], "batch": e.get("batch", ""), "rank": i + 1,
+                           "video_id": itm["video_id"], "author_handle": itm["author_handle"],
+                           "caption": itm["caption"], "is_repeat": ""} for i, itm in enumerate(parse_tt_feed(data))]
+
+    harvester = FeedHarvester()
+    feed = []
+    for e in entries:
+        if e.get("kind") != "item":
+            continue
+        b = e.get("blobs") or {}
+        vid_id = e["video_id"]
+        sigi = arc.get_json(b["sigi"]) if b.get("sigi") else None
+        if b.get("html"):
+            page = pages()
+            state = json.dumps({"ItemModule": {vid_id: sigi}} if sigi else {}).replace("</", "<\\/")
+            page.set_content(f"<!doctype html><html><head><meta charset='utf-8'></head><body>"
+                             f"{arc.get(b['html']).decode('utf-8')}"
+                             f"<script id='SIGI_STATE' type='application/json'>{state}</script></body></html>")
+            page.evaluate("() => { delete window.__harvest; delete window.__sigiDelta; }")
+            page.evaluate(HARVEST_JS)
+            hit = next((h for h in harvester.drain(page)["items"] if h["video_id"] == vid_id), None)
+            if hit:
+                data = item_fields(vid_id, sigi or hit.get("sigi"), hit.get("dom"), netcap)
+            else:
+                # markup the harvester doesn't recognize: the visible-video fallback
+                cache = ItemCache()
+                cache.update({vid_id: sigi})
+                data = extract_current_video(page, netcap, cache)
+                data["video_id"] = data["video_id"] or vid_id
+        else:
+            data = item_fields(vid_id, sigi, None, netcap)
+        feed.append({**{k: data.get(k, "") for k in FEED_HEADER}, "ts_iso": e["ts"], "index": e.get("index", ""),
+                     "is_repeat": e.get("is_repeat", "")})
+    return {"feed.csv": feed, "feed_recs.csv": feed_recs}
+
+
+def reextract_group(parts, root, out_root, headless=True):
+    """Rebuild the CSVs of a list of partitions in this process; returns {rows, partitions}."""
+    from tiktok.simple_watch_TT_v4 import FEED_HEADER, TT_RECS_HEADER
+    from youtube.simple_watch_YT import RECS_HEADER, WATCHED_HEADER
+
+    headers = {"watched.csv": WATCHED_HEADER, "recs.csv": RECS_HEADER,
+               "feed.csv": FEED_HEADER, "feed_recs.csv": TT_RECS_HEADER}
+    arc = Archive(root)
+    pages = _Pages(headless)
+    rows = 0
+    try:
+        for platform, persona, day, path in parts:
+            entries = read_index(path)
+            for e in entries:
+                e.setdefault("persona", persona)
+            fn = _reextract_youtube if platform == "youtube" else _reextract_tiktok
+            out_dir = os.path.join(out_root, platform, persona, day)
+            ensure_dir(out_dir)
+            for name, table in fn(arc, entries, pages).items():
+                target = os.path.join(out_dir, name)
+                if os.path.exists(target):
+                    os.remove(target)  # a rebuild replaces, never appends
+                if table:
+                    write_rows(target, headers[name], table)
+                rows += len(table)
+    finally:
+        pages.close()
+    return {"rows": rows, "partitions": len(parts)}
+
+
+def reextract(root=ARCHIVE_ROOT, out_root=REEXTRACT_ROOT, workers=None, headless=True, **filters):
+    """Re-extract every matching partition, spread over `workers` processes (default: all cores)."""
+    t0 = time.perf_counter()
+    parts = partitions(root, **filters)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(parts) or 1))
+    # largest first, dealt round-robin, a few groups per worker so the pool stays busy
+    parts.sort(key=lambda p: -os.path.getsize(p[3]))
+    n_groups = min(len(parts), workers * 4) or 1
+    groups = [parts[i::n_groups] for i in range(n_groups)]
+    stats = {"rows": 0, "partitions": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for res in pool.map(reextract_group, groups, [root] * n_groups, [out_root] * n_groups,
+                            [headless] * n_groups):
+            for k in stats:
+                stats[k] += res[k]
+    stats.update(workers=workers, secs=round(time.perf_counter() - t0, 1))
+    return stats
+
+
+def archive_stats(root=ARCHIVE_ROOT):
+    """Blob count, stored vs. referenced (logical) bytes and the dedup ratio, from frame headers."""
+    import zstandard
+    sizes = {}
+    stored = 0
+    for path in glob.glob(os.path.join(root, "blobs", "*", "*.zst")):
+        with open(path, "rb") as f:
+            header = f.read(18)
+        sizes[os.path.basename(path)[:-len(".zst")]] = max(zstandard.frame_content_size(header), 0)
+        stored += os.path.getsize(path)
+    refs = logical = records = 0
+    for _, _, _, path in partitions(root):
+        for e in read_index(path):
+            records += 1
+            for v in (e.get("blobs") or {}).values():
+                for sha in ([s for _, s in v] if isinstance(v, list) else [v]):
+                    refs += 1
+                    logical += sizes.get(sha, 0)
+    unique = sum(sizes.values())
+    return {"records": records, "blobs": len(sizes), "refs": refs, "logical_mb": round(logical / 1e6, 2),
+            "unique_mb": round(unique / 1e6, 2), "stored_mb": round(stored / 1e6, 2),
+            "dedup_ratio": round(logical / unique, 2) if unique else 0.0,
+            "compression_ratio": round(unique / stored, 2) if stored else 0.0}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Raw snapshot archive: offline re-extraction and stats.")
+    ap.add_argument("--archive", default=ARCHIVE_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("reextract", help="Rebuild watched/recs (feed/feed_recs) CSVs with the current extractors.")
+    r.add_argument("--out", default=REEXTRACT_ROOT)
+    r.add_argument("--workers", type=int, default=None, help="Processes (default: all cores).")
+    r.add_argument("--platform", choices=["youtube", "tiktok"])
+    r.add_argument("--persona")
+    r.add_argument("--since", help="First day (YYYY-MM-DD).")
+    r.add_argument("--until", help="Last day (YYYY-MM-DD).")
+    r.add_argument("--headful", action="store_true")
+    sub.add_parser("stats", help="Blob counts, dedup and compression ratios.")
+    args = ap.parse_args()
+
+    if args.cmd == "stats":
+        for k, v in archive_stats(args.archive).items():
+            print(f"{k:18s} {v}")
+        raise SystemExit(0)
+
+    stats = reextract(args.archive, args.out, args.workers, not args.headful, platform=args.platform,
+                      persona=args.persona, since=args.since, until=args.until)
+    print(f"Re-extracted {stats['rows']} rows from {stats['partitions']} partitions "
+          f"with {stats['workers']} workers in {stats['secs']}s -> {args.out}")
@@ -0,0 +1,89 @@
+"""
+Benchmark analytics.update on synthetic logs.
+
+Writes --rows recs rows (5 recs per watched video) spread over --personas x
+--days into a temp data/logs tree, times the cold run, appends --append more
+watched videos to one persona/day and times the incremental run.
+
+    python bench/bench_analytics.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analytics  # noqa: E402
+from youtube.simple_watch_YT import WATCHED_HEADER, RECS_HEADER  # noqa: E402
+
+RECS_PER_VIDEO = 5
+TITLES = np.array(["home workouts for beginners", "10 min abs", "election news tonight",
+                   "cat compilation", "progressive policies explained", "music mix"])
+
+
+def synth(rng, persona, n_videos, vocab):
+    """Watched + recs frames for one persona/day; ~70% of next videos follow rec #1."""
+    recs = rng.integers(0, vocab, size=(n_videos, RECS_PER_VIDEO))
+    follow = rng.random(n_videos) < 0.7
+    vids = np.empty(n_videos, dtype=np.int64)
+    vids[0] = rng.integers(0, vocab)
+    vids[1:] = np.where(follow[:-1], recs[:-1, 0], rng.integers(0, vocab, n_videos - 1))
+    ts = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(n_videos) * 60, unit="s")
+    watched = pd.DataFrame({"ts": ts.strftime("%Y-%m-%dT%H:%M:%S"), "persona": persona,
+                            "seed_query": "home workouts", "video_id": "v" + pd.Series(vids).astype(str),
+                            "title": "", "dwell_secs": 30, "duration_secs": 60, "is_repeat": 0})[WATCHED_HEADER]
+    recs_df = pd.DataFrame({
+        "ts": np.repeat(watched["ts"].to_numpy(), RECS_PER_VIDEO), "persona": persona,
+        "seed_query": "home workouts", "watching": np.repeat(watched["video_id"].to_numpy(), RECS_PER_VIDEO),
+        "rec_vid": "v" + pd.Series(recs.ravel()).astype(str),
+        "rank": np.tile(np.arange(1, RECS_PER_VIDEO + 1), n_videos),
+        "rec_title": TITLES[rng.integers(0, len(TITLES), n_videos * RECS_PER_VIDEO)], "rec_channel": "c",
+        "is_repeat": 0})
+    return watched, recs_df[RECS_HEADER]
+
+
+def write(logs, persona, day, watched, recs, mode="w"):
+    d = os.path.join(logs, "youtube", persona, day)
+    os.makedirs(d, exist_ok=True)
+    for name, df in (("watched", watched), ("recs", recs)):
+        path = os.path.join(d, f"{name}.csv")
+        df.to_csv(path, mode=mode, header=mode == "w", index=False)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000, help="Total recs rows.")
+    ap.add_argument("--personas", type=int, default=20)
+    ap.add_argument("--days", type=int, default=10)
+    ap.add_argument("--vocab", type=int, default=200_000, help="Distinct video ids.")
+    ap.add_argument("--append", type=int, default=50, help="Watched videos appended before the incremental run.")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    per = max(1, args.rows // (args.personas * args.days * RECS_PER_VIDEO))
+    with tempfile.TemporaryDirectory() as tmp:
+        logs, out = os.path.join(tmp, "logs"), os.path.join(tmp, "analytics")
+        t0 = time.perf_counter()
+        days = [f"2024-01-{d + 1:02d}" for d in range(args.days)]
+        for p in range(args.personas):
+            for day in days:
+                write(logs, f"persona_{p:02d}", day, *synth(rng, f"persona_{p:02d}", per, args.vocab))
+        gen = time.perf_counter() - t0
+        total = per * args.personas * args.days * RECS_PER_VIDEO
+
+        t0 = time.perf_counter()
+        analytics.update(logs, out)
+        cold = time.perf_counter() - t0
+
+        write(logs, "persona_00", days[-1], *synth(rng, "persona_00", args.append, args.vocab), mode="a")
+        t0 = time.perf_counter()
+        analytics.update(logs, out)
+        warm = time.perf_counter() - t0
+
+    print(f"recs rows      {total:>12,d}  (generated in {gen:.1f}s)")
+    print(f"cold update    {cold:>12.2f}s  ({total / cold:,.0f} rows/s)")
+    print(f"incremental    {warm:>12.3f}s  (+{args.append * RECS_PER_VIDEO} recs rows, 1 day touched)")
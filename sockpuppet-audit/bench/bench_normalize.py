@@ -0,0 +1,96 @@
+"""
+Benchmark normalize.py on synthetic messy logs.
+
+Writes --rows rows split between TikTok feed.csv and YouTube recs.csv over
+--personas x --days into a temp data/logs tree, with the mixed formats seen in
+old logs (K/M/B counts, [h:]mm:ss and ISO durations, URLs in id columns,
+handles as URLs, timestamps with/without fractions), then times the
+normalization with --workers processes.
+
+    python bench/bench_normalize.py --rows 20000000 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import normalize  # noqa: E402
+from tiktok.simple_watch_TT_v4 import FEED_HEADER  # noqa: E402
+from youtube.simple_watch_YT import RECS_HEADER  # noqa: E402
+
+
+def pick(rng, options, n):
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), n)]
+
+
+def messy_counts(rng, n):
+    v = rng.integers(0, 5_000_000, n)
+    forms = [v.astype(str), np.char.add((v / 1e3).round(1).astype(str), "K"),
+             np.char.add((v / 1e6).round(1).astype(str), "M"), pd.Series(v).map("{:,}".format).to_numpy(dtype=str)]
+    return np.choose(rng.integers(0, len(forms), n), forms)
+
+
+def synth_feed(rng, n, vocab, ts):
+    ids = rng.integers(7_000_000_000_000_000_000, 7_000_000_000_000_000_000 + vocab, n).astype(str)
+    handles = np.char.add("user", rng.integers(0, vocab // 10 + 1, n).astype(str))
+    url = np.char.add(np.char.add(np.char.add("https://www.tiktok.com/@", handles), "/video/"), ids)
+    return pd.DataFrame({
+        "ts_iso": ts, "index": np.arange(1, n + 1), "video_id": np.where(rng.random(n) < 0.1, url, ids),
+        "post_url": url, "video_src": "", "duration_sec": pick(rng, ["15", "15.2", "0:31", "PT1M2S", ""], n),
+        "author_handle": np.where(rng.random(n) < 0.5, np.char.add("@", handles), handles),
+        "caption": "caption #fyp", "like_count": messy_counts(rng, n), "comment_count": messy_counts(rng, n),
+        "share_count": pick(rng, ["12", "1.2K", "3M", "2.5B", ""], n), "music_title": "original sound",
+        "is_paused": pick(rng, ["True", "False", ""], n), "is_repeat": pick(rng, ["0", "1"], n)})[FEED_HEADER]
+
+
+def synth_recs(rng, n, vocab, ts):
+    vids = np.char.add("yt", rng.integers(0, vocab, n).astype(str))
+    watching = np.char.add("yt", rng.integers(0, vocab, n).astype(str))
+    return pd.DataFrame({
+        "ts": ts, "persona": "p", "seed_query": "home workouts",
+        "watching": np.where(rng.random(n) < 0.05, np.char.add("https://www.youtube.com/watch?v=", watching), watching),
+        "rec_vid": np.where(rng.random(n) < 0.05, np.char.add("/watch?v=", vids), vids),
+        "rank": np.tile(np.arange(1, 21), n // 20 + 1)[:n], "rec_title": "title", "rec_channel": "channel",
+        "is_repeat": pick(rng, ["0", "1", ""], n)})[RECS_HEADER]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000, help="Total rows (half feed, half recs).")
+    ap.add_argument("--personas", type=int, default=10)
+    ap.add_argument("--days", type=int, default=10)
+    ap.add_argument("--vocab", type=int, default=500_000, help="Distinct video ids.")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    per = max(1, args.rows // (2 * args.personas * args.days))
+    with tempfile.TemporaryDirectory() as tmp:
+        logs, out = os.path.join(tmp, "logs"), os.path.join(tmp, "normalized")
+        t0 = time.perf_counter()
+        for p in range(args.personas):
+            for d in range(args.days):
+                day = f"2024-01-{d + 1:02d}"
+                ts = pd.Timestamp(day) + pd.to_timedelta(np.arange(per) * 20, unit="s")
+                ts = np.where(rng.random(per) < 0.5, ts.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+                              ts.strftime("%Y-%m-%dT%H:%M:%S"))
+                for platform, name, df in (("tiktok", "feed", synth_feed(rng, per, args.vocab, ts)),
+                                           ("youtube", "recs", synth_recs(rng, per, args.vocab, ts))):
+                    d_out = os.path.join(logs, platform, f"persona_{p:02d}", day)
+                    os.makedirs(d_out, exist_ok=True)
+                    df.to_csv(os.path.join(d_out, f"{name}.csv"), index=False)
+        gen = time.perf_counter() - t0
+
+        stats = normalize.normalize(logs, out, args.workers)
+        print(f"synthetic logs: {2 * per * args.personas * args.days:,} rows in {gen:.1f}s")
+        print(f"normalize: {stats['rows']:,} rows, {stats['files']} partitions, {stats['workers']} workers, "
+              f"{stats['secs']:.1f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+        t0 = time.perf_counter()
+        one = normalize.normalize_file(os.path.join(logs, "tiktok", "persona_00", "2024-01-01", "feed.csv"),
+                                       out, force=True)
+        print(f"one feed partition ({one:,} rows), single process: {time.perf_counter() - t0:.2f}s")
@@ -0,0 +1,71 @@
+"""
+Benchmark recgraph on synthetic logs.
+
+Writes --rows recs rows over --personas x --days (bench_analytics.synth) into
+a temp data/logs tree, times the cold build, appends one more day and times
+the incremental build, then times the queries on the memory-mapped graph.
+
+    python bench/bench_recgraph.py --rows 20000000 --vocab 2000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import recgraph  # noqa: E402
+from bench_analytics import RECS_PER_VIDEO, synth, write  # noqa: E402
+
+
+def timed(fn, reps=20):
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000, help="Total recs rows.")
+    ap.add_argument("--personas", type=int, default=20)
+    ap.add_argument("--days", type=int, default=10)
+    ap.add_argument("--vocab", type=int, default=500_000, help="Distinct video ids.")
+    ap.add_argument("--k", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    per = max(1, args.rows // (args.personas * args.days * RECS_PER_VIDEO))
+    with tempfile.TemporaryDirectory() as tmp:
+        logs, root = os.path.join(tmp, "logs"), os.path.join(tmp, "graph")
+        t0 = time.perf_counter()
+        days = [f"2024-01-{d + 1:02d}" for d in range(args.days)]
+        for p in range(args.personas):
+            for day in days:
+                write(logs, f"persona_{p:02d}", day, *synth(rng, f"persona_{p:02d}", per, args.vocab))
+        gen = time.perf_counter() - t0
+
+        cold = recgraph.build(logs, root=root)
+        for p in range(args.personas):
+            write(logs, f"persona_{p:02d}", "2024-02-01", *synth(rng, f"persona_{p:02d}", per, args.vocab))
+        incr = recgraph.build(logs, root=root)
+
+        g = recgraph.RecGraph.open(root=root)
+        seeds = g.lookup(recgraph.session_seeds(persona="persona_00", root=root))
+        reached = len(g.khop(seeds, args.k)[0])
+        print(f"synthetic logs: {per * args.personas * args.days * RECS_PER_VIDEO:,} recs rows in {gen:.1f}s")
+        print(f"cold build:        {cold['secs']:.2f}s  ({cold['nodes']:,} nodes, {cold['edges']:,} edges)")
+        print(f"incremental build: {incr['secs']:.2f}s  (+{incr['new_rows']:,} rows)")
+        print(f"khop k={args.k}, all personas:  {timed(lambda: g.khop(seeds, args.k))} ms  ({reached:,} videos)")
+        print(f"khop k={args.k}, one persona:   {timed(lambda: g.khop(seeds, args.k, 'persona_00'))} ms")
+        print(f"top in-degree:          {timed(lambda: g.top_in_degree(20))} ms")
+        print(f"top in-degree, persona: {timed(lambda: g.top_in_degree(20, 'persona_00'))} ms")
+        print(f"subgraph(persona):      {timed(lambda: g.subgraph('persona_00'), reps=5)} ms")
+        print(f"lookup 1k ids:          {timed(lambda: g.lookup([f'v{i}' for i in range(1000)]))} ms")
+        del g
@@ -0,0 +1,128 @@
+"""
+End-to-end scraper benchmark against the offline replay server.
+
+Reports per-video overhead with dwell and pauses removed (virtual clock):
+  youtube.run_session     (wall(2N videos) - wall(N videos)) / N, so browser
+                          startup cancels out
+  youtube.extract_snapshot
+  tiktok.extract_current_video, tiktok.scroll_next, tiktok.harvest_drain
+                          per call over N feed items
+
+No network is used. Each run appends one JSON line (with the git commit) to
+--out so numbers can be compared between commits.
+
+    python bench/bench_scrapers.py --videos 20
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from clock import make_clock, set_clock  # noqa: E402
+from replay.server import serve, load_fixtures  # noqa: E402
+
+
+def summary(samples_ms):
+    s = sorted(samples_ms)
+    return {"n": len(s), "median_ms": round(statistics.median(s), 3),
+            "p90_ms": round(s[int(0.9 * (len(s) - 1))], 3), "mean_ms": round(statistics.fmean(s), 3)}
+
+
+def bench_youtube(base, n, headless):
+    from playwright.sync_api import sync_playwright
+    from youtube.simple_watch_YT import run_session, extract_snapshot
+
+    out = {}
+    walls = {}
+    for videos in (n, 2 * n):
+        set_clock(make_clock("virtual", seed=0))
+        with tempfile.TemporaryDirectory() as profile:
+            t0 = time.perf_counter()
+            run_session("bench", ["home workouts"], videos, profile, headless=headless, base_url=base)
+            walls[videos] = time.perf_counter() - t0
+    out["youtube.run_session"] = {"n": n, "per_video_ms": round((walls[2 * n] - walls[n]) / n * 1000, 3),
+                                  "startup_plus_n_ms": round(walls[n] * 1000, 1)}
+
+    first = next(iter(load_fixtures()[0]))
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        page = browser.new_page()
+        page.goto(f"{base}/watch?v={first}")
+        samples = [extract_snapshot(page)["extract_ms"] for _ in range(max(n, 20))]
+        browser.close()
+    out["youtube.extract_snapshot"] = summary(samples)
+    return out
+
+
+def bench_tiktok(base, n, headless):
+    from browsers import PlaywrightManager
+    from harvest import FeedHarvester
+    from tiktok.simple_watch_TT_v4 import open_page, extract_current_video, scroll_next
+
+    set_clock(make_clock("virtual", seed=0))
+    extract, scroll, drain = [], [], []
+    items = 0
+    with tempfile.TemporaryDirectory() as profile, PlaywrightManager() as pm:
+        page = open_page(pm, headless, profile)
+        harvester = FeedHarvester()
+        harvester.attach(page)
+        page.goto(f"{base}/foryou")
+        for _ in range(n):
+            t0 = time.perf_counter()
+            items += len(harvester.drain(page)["items"])
+            drain.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            extract_current_video(page)
+            extract.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            scroll_next(page)
+            scroll.append((time.perf_counter() - t0) * 1000)
+    return {"tiktok.extract_current_video": summary(extract), "tiktok.scroll_next": summary(scroll),
+            "tiktok.harvest_drain": {**summary(drain), "items": items}}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return ""
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--videos", type=int, default=20)
+    ap.add_argument("--only", choices=["youtube", "tiktok"])
+    ap.add_argument("--headful", action="store_true")
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench", "results.jsonl"))
+    args = ap.parse_args()
+
+    server, base = serve(0)
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work:
+        os.chdir(work)  # keep data/logs out of the repo
+        try:
+            for name, fn in (("youtube", bench_youtube), ("tiktok", bench_tiktok)):
+                if args.only and args.only != name:
+                    continue
+                try:
+                    results.update(fn(base, args.videos, not args.headful))
+                except Exception as e:
+                    results[f"{name}.error"] = f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}"
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+
+    record = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "python": platform.python_version(),
+              "machine": platform.machine(), "videos": args.videos, "results": results}
+    with open(args.out, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    for k, v in results.items():
+        print(f"{k:32s} {v}")
@@ -0,0 +1,94 @@
+"""
+Browser lifecycle shared across sessions.
+
+Launching Chromium costs seconds; opening a page costs milliseconds. The
+manager below keeps one warm browser per profile alive across consecutive
+sessions and hands each session a fresh page, so only the first session of a
+run pays the cold start:
+
+    with PlaywrightManager() as pm:
+        for _ in range(days):
+            run_session(..., browsers=pm)
+        print(pm.report())
+"""
+import os
+import time
+
+
+class _Manager:
+    def __init__(self):
+        self.timings = []  # (kind, secs) per session start
+
+    def _timed(self, kind, t0):
+        self.timings.append((kind, time.perf_counter() - t0))
+
+    def report(self):
+        """e.g. 'cold 1 x 2310.4 ms, warm 4 x 38.2 ms'."""
+        parts = []
+        for kind in ("cold", "warm"):
+            secs = [s for k, s in self.timings if k == kind]
+            if secs:
+                parts.append(f"{kind} {len(secs)} x {sum(secs) / len(secs) * 1000:.1f} ms")
+        return ", ".join(parts) or "no sessions"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PlaywrightManager(_Manager):
+    """One persistent context per user_data_dir ("" = a throwaway profile); a new page per session."""
+
+    def __init__(self):
+        super().__init__()
+        self.pw = None
+        self.contexts = {}  # abspath(user_data_dir) -> (launch options, context)
+
+    def page(self, user_data_dir, headless=False, args=None):
+        t0 = time.perf_counter()
+        key = os.path.abspath(user_data_dir) if user_data_dir else ""
+        launch = (headless, tuple(args or ()))
+        opts, ctx = self.contexts.get(key, (None, None))
+        if ctx is not None and opts != launch:
+            ctx.close()
+            ctx = None
+        if ctx is None:
+            if self.pw is None:
+                from playwright.sync_api import sync_playwright
+                self.pw = sync_playwright().start()
+            ctx = self.pw.chromium.launch_persistent_context(user_data_dir=user_data_dir, headless=headless,
+                                                             args=list(args) if args else None)
+            self.contexts[key] = (launch, ctx)
+            kind = "cold"
+        else:
+            kind = "warm"
+        old = list(ctx.pages)
+        page = ctx.new_page()
+        for p in old:
+            p.close()
+        self._timed(kind, t0)
+        return page
+
+    def recycle(self, user_data_dir):
+        """Close the profile's context (and its renderers); the next page() relaunches it from disk."""
+        key = os.path.abspath(user_data_dir) if user_data_dir else ""
+        _, ctx = self.contexts.pop(key, (None, None))
+        if ctx is not None:
+            try:
+                ctx.close()
+            except Exception:
+                pass
+
+    def close(self):
+        for _, ctx in self.contexts.values():
+            try:
+                ctx.close()
+            except Exception:
+                pass
+        self.contexts = {}
+        if self.pw is not None:
+            self.pw.stop()
+            self.pw = None
+
@@ -0,0 +1,230 @@
+"""
+Network-response capture: read metadata and recommendations from the JSON
+the page itself fetches instead of scraping the rendered DOM.
+
+- YouTube: youtubei/v1/next (watch-next recs, continuations) and
+  youtubei/v1/player (videoDetails), via Playwright response events.
+- TikTok: the item_list / recommend feed, via Playwright response events.
+
+Parsers are plain functions over decoded JSON so they can be run on recorded
+responses offline.
+"""
+import re
+from collections import OrderedDict
+
+YT_NEXT = "/youtubei/v1/next"
+YT_PLAYER = "/youtubei/v1/player"
+TT_FEED = re.compile(r"/api/(recommend/item_list|item_list|preload/item_list)")
+
+
+def _text(node):
+    """YouTube text object ({simpleText} / {runs:[{text}]} / {content}) -> str."""
+    if not isinstance(node, dict):
+        return node if isinstance(node, str) else ""
+    if "simpleText" in node:
+        return node["simpleText"]
+    if "content" in node:
+        return node["content"]
+    return "".join(r.get("text", "") for r in node.get("runs", []))
+
+
+def _walk(node, key):
+    """Yield every value stored under `key`, depth-first in document order."""
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k == key:
+                yield v
+            yield from _walk(v, key)
+    elif isinstance(node, list):
+        for v in node:
+            yield from _walk(v, key)
+
+
+# -------------------------- YouTube --------------------------
+def parse_yt_player(data):
+    """videoDetails -> {video_id, title, channel, duration_secs, view_count}."""
+    vd = data.get("videoDetails") or {}
+    return {
+        "video_id": vd.get("videoId", ""),
+        "title": vd.get("title", ""),
+        "channel": vd.get("author", ""),
+        "duration_secs": int(vd.get("lengthSeconds") or 0),
+        "view_count": int(vd.get("viewCount") or 0),
+    }
+
+
+def parse_yt_next(data):
+    """
+    Return (video_id, recs) from a watch-next response or continuation.
+    recs is the full ordered list: [{rec_vid, rank, rec_title, rec_channel}].
+    """
+    video_id = ""
+    for ep in _walk(data.get("currentVideoEndpoint") or {}, "watchEndpoint"):
+        video_id = ep.get("videoId", "")
+        break
+
+    recs = []
+    for node in _walk(data, "compactVideoRenderer"):
+        recs.append({"rec_vid": node.get("videoId", ""),
+                     "rec_title": _text(node.get("title")),
+                     "rec_channel": _text(node.get("longBylineText") or node.get("shortBylineText"))})
+    for node in _walk(data, "lockupViewModel"):
+        if node.get("contentType", "LOCKUP_CONTENT_TYPE_VIDEO") != "LOCKUP_CONTENT_TYPE_VIDEO":
+            continue
+        meta = ((node.get("metadata") or {}).get("lockupMetadataViewModel") or {})
+        rows = (((meta.get("metadata") or {}).get("contentMetadataViewModel") or {}).get("metadataRows") or [])
+        channel = ""
+        if rows and rows[0].get("metadataParts"):
+            channel = _text(rows[0]["metadataParts"][0].get("text"))
+        recs.append({"rec_vid": node.get("contentId", ""), "rec_title": _text(meta.get("title")),
+                     "rec_channel": channel})
+    for i, r in enumerate(recs):
+        r["rank"] = i + 1
+    return video_id, recs
+
+
+class ResponseCapture:
+    """
+    Collect youtubei responses from a (sync) Playwright page, keyed by video id.
+
+        cap = ResponseCapture(); cap.attach(page)
+        net = cap.take(video_id)  # {"meta": {...}, "recs": [...]} or None
+
+    With keep_raw, each entry also carries "raw": [(endpoint, decoded JSON)]
+    for the archive. Entries that are never taken (player responses for
+    hovered or prefetched videos) are dropped oldest first past max_videos.
+    """
+
+    def __init__(self, keep_raw=False, max_videos=64):
+        self.videos = {}
+        self.errors = 0
+        self.keep_raw = keep_raw
+        self.max_videos = max_videos
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        url = response.url
+        if YT_NEXT not in url and YT_PLAYER not in url:
+            return
+        try:
+            data = response.json()
+        except Exception:
+            self.errors += 1
+            return
+        self.feed(url, data)
+
+    def feed(self, url, data):
+        """Merge one decoded response; also used when replaying recorded fixtures."""
+        entry = None
+        if YT_PLAYER in url:
+            meta = parse_yt_player(data)
+            if meta["video_id"]:
+                entry = self.videos.setdefault(meta["video_id"], {"meta": {}, "recs": []})
+                entry["meta"] = meta
+        elif YT_NEXT in url:
+            video_id, recs = parse_yt_next(data)
+            if video_id:
+                entry = self.videos.setdefault(video_id, {"meta": {}, "recs": []})
+                entry["recs"] = recs
+            elif recs and self.videos:
+                # continuation page: extend the most recent watch's list
+                entry = self.videos[next(reversed(self.videos))]
+                last = entry["recs"]
+                for r in recs:
+                    r["rank"] += len(last)
+                last.extend(recs)
+        if entry is not None and self.keep_raw:
+            entry.setdefault("raw", []).append(("player" if YT_PLAYER in url else "next", data))
+        while len(self.videos) > self.max_videos:
+            del self.videos[next(iter(self.videos))]
+
+    def take(self, video_id):
+        return self.videos.pop(video_id, None)
+
+
+# -------------------------- TikTok --------------------------
+def parse_tt_item(itm):
+    """One itemList entry -> the same fields extract_current_video fills."""
+    author = itm.get("author") or {}
+    handle = author.get("uniqueId", "") if isinstance(author, dict) else str(author)
+    stats = itm.get("stats") or {}
+    video = itm.get("video") or {}
+    music = itm.get("music") or {}
+    vid = str(itm.get("id", ""))
+    out = {
+        "video_id": vid,
+        "post_url": f"https://www.tiktok.com/@{handle}/video/{vid}" if handle and vid else "",
+        "video_src": video.get("playAddr", ""),
+        "duration_sec": str(video.get("duration", "")),
+        "author_handle": f"@{handle}" if handle else "",
+        "caption": itm.get("desc", ""),
+        "like_count": str(stats.get("diggCount", "")),
+        "comment_count": str(stats.get("commentCount", "")),
+        "share_count": str(stats.get("shareCount", "")),
+        "music_title": music.get("title", ""),
+    }
+    return {k: ("" if v == "None" else v) for k, v in out.items()}
+
+
+def parse_tt_feed(data):
+    """item_list / recommend response -> list of parsed items in feed order."""
+    return [parse_tt_item(i) for i in (data.get("itemList") or data.get("items") or []) if i.get("id")]
+
+
+class FeedCapture:
+    """
+    Collect TikTok feed responses from a (sync) Playwright page.
+
+        cap = FeedCapture(); cap.attach(page)
+        for n, batch, raw in cap.poll():   # batches received since the last poll
+            ...
+        itm = cap.get(video_id)
+
+    n numbers the batches from 1; raw is the decoded response with keep_raw,
+    else None. Polled batches are not kept, and items are a bounded LRU
+    (max_items; None keeps every item, e.g. for offline re-extraction).
+    """
+
+    def __init__(self, keep_raw=False, max_items=4096):
+        self.items = OrderedDict()
+        self.pending = []
+        self.n_batches = 0
+        self.keep_raw = keep_raw
+        self.max_items = max_items
+        self.errors = 0
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if not TT_FEED.search(response.url):
+            return
+        try:
+            data = response.json()
+        except Exception:
+            self.errors += 1
+            return
+        self.feed(data)
+
+    def feed(self, data):
+        """Add one decoded feed response; also used when replaying recorded fixtures."""
+        batch = parse_tt_feed(data)
+        for itm in batch:
+            self.items[itm["video_id"]] = itm
+            self.items.move_to_end(itm["video_id"])
+        while self.max_items is not None and len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+        self.n_batches += 1
+        self.pending.append((self.n_batches, batch, data if self.keep_raw else None))
+
+    def poll(self):
+        new, self.pending = self.pending, []
+        return new
+
+    def get(self, video_id):
+        itm = self.items.get(video_id)
+        if itm is not None:
+            self.items.move_to_end(video_id)
+        return itm
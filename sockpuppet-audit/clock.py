@@ -0,0 +1,109 @@
+"""
+Pluggable clock for every sleep, timestamp and dwell draw in the scrapers.
+
+RealClock is wall-clock time. VirtualClock skips (or, with speedup, shortens)
+sleeps but advances its own time by the full amount, so a 50-video session
+against a local fixture site runs in seconds while logged timestamps still
+advance as if the dwell had been spent:
+
+    now() = start + real time elapsed + total virtual sleep
+
+The virtual sleep total is kept per context (contextvars): each asyncio task,
+e.g. one persona of youtube/async_engine.py, advances only its own time and
+starts from the offset of the code that created it.
+
+Scripts install one process-wide clock with set_clock(make_clock(...)) and
+call clock.sleep()/clock.now() instead of time.sleep()/datetime.utcnow().
+"""
+import asyncio
+import contextvars
+import datetime as dt
+import random
+import time
+
+
+class RealClock:
+    mode = "real"
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed) if seed is not None else random
+
+    def now(self):
+        return dt.datetime.utcnow()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, secs):
+        if secs > 0:
+            time.sleep(secs)
+
+    async def async_sleep(self, secs):
+        await asyncio.sleep(max(secs, 0))
+
+
+class VirtualClock(RealClock):
+    """Sleeps advance virtual time; real time only passes secs/speedup (0 = instant)."""
+    mode = "virtual"
+
+    def __init__(self, speedup=0, seed=None, start=None):
+        super().__init__(seed)
+        self.speedup = speedup
+        self.start = start or dt.datetime.utcnow()
+        self.t0 = time.monotonic()
+        self._skipped = contextvars.ContextVar(f"virtual_skipped_{id(self)}", default=0.0)
+
+    @property
+    def skipped(self):
+        """Virtual seconds slept so far by the current task (or thread)."""
+        return self._skipped.get()
+
+    def _advance(self, secs):
+        self._skipped.set(self._skipped.get() + secs)
+
+    def monotonic(self):
+        return self.t0 + (time.monotonic() - self.t0) + self.skipped
+
+    def now(self):
+        return self.start + dt.timedelta(seconds=self.monotonic() - self.t0)
+
+    def _real(self, secs):
+        return secs / self.speedup if self.speedup else 0.0
+
+    def sleep(self, secs):
+        if secs <= 0:
+            return
+        real = self._real(secs)
+        if real:
+            time.sleep(real)
+        self._advance(secs - real)
+
+    async def async_sleep(self, secs):
+        real = self._real(max(secs, 0))
+        await asyncio.sleep(real)
+        self._advance(max(secs, 0) - real)
+
+
+def make_clock(mode="real", speedup=0, seed=None):
+    return VirtualClock(speedup, seed) if mode == "virtual" else RealClock(seed)
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    global _clock
+    _clock = clock
+    return clock
+
+
+def now():
+    return _clock.now()
+
+
+def sleep(secs):
+    _clock.sleep(secs)
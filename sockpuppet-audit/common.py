@@ -1,21 +1,27 @@
-import os, random, time, csv, datetime as dt
+import os, csv
 from pathlib import Path
+from clock import get_clock
 
 def ensure_dir(p:str):
     Path(p).mkdir(parents=True, exist_ok=True)
 
 def ts():
-    return dt.datetime.utcnow().isoformat()
+    return get_clock().now().isoformat()
 
 def rand_dwell(dwell_min:int, dwell_max:int):
-    return random.randint(dwell_min, dwell_max)
+    return get_clock().random.randint(dwell_min, dwell_max)
 
 def out_paths(platform:str, persona:str):
-    day = dt.date.today().isoformat()
+    day = get_clock().now().date().isoformat()  # the session's clock, like ts()
     root = f"data/logs/{platform}/{persona}/{day}"
     ensure_dir(root)
     return (os.path.join(root, "watched.csv"), os.path.join(root, "recs.csv"))
 
+def tiktok_feed_path(persona:str):
+    # TikTok logs its feed (and feed_recs.csv with --capture) next to out_paths
+    watched_path, _ = out_paths("tiktok", persona)
+    return os.path.join(os.path.dirname(watched_path), "feed.csv")
+
 def write_rows(path, header, rows):
     new = not os.path.exists(path)
     with open(path, "a", newline="", encoding="utf-8") as f:
@@ -0,0 +1,296 @@
+"""
+Persona profile footprint: measure, prune and snapshot the Chromium profiles
+under ./profiles/<persona>.
+
+A persistent profile keeps every cache Chromium fills while browsing (HTTP
+cache, V8 Code Cache, Service Worker CacheStorage, GPU/shader and media
+caches). None of it is identity: the persona is its cookies, localStorage /
+IndexedDB, history and preferences. Caches grow without limit, and
+launch_persistent_context gets slower as they do.
+
+    python footprint.py report                       # per-persona size: identity vs cache
+    python footprint.py prune [--persona P] [--startup]
+    python footprint.py snapshot --persona P         # -> data/profile_snapshots
+    python footprint.py restore --persona P --to ./profiles/P [--at STAMP]
+
+prune deletes only the cache directories in CACHE_DIRS (never while Chromium
+holds the profile's SingletonLock) and reports the bytes freed; with --startup
+it also times a headless launch before and after.
+
+Snapshots leave the caches out and store each file once by content (the
+archive's blob store: zstd, named by sha256), so consecutive snapshots of one
+persona, and files that are identical across personas, cost nothing extra.
+A manifest lists path -> blob per file:
+
+    data/profile_snapshots/blobs/<sha[:2]>/<sha256>.zst
+    data/profile_snapshots/manifests/<persona>/<stamp>.json
+
+Files whose size and mtime match the previous manifest are not re-read. To
+clone a persona onto another worker, copy data/profile_snapshots (rsync only
+sends new blobs) and run restore there; restore builds the profile beside
+the target and swaps it in.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+
+from archive import Archive
+from common import ensure_dir
+
+SNAPSHOT_ROOT = "data/profile_snapshots"
+CONFIG = "personas/personas.yaml"
+
+# relative to the user_data_dir; "*" is the profile dir (Default, Profile 1, …)
+CACHE_DIRS = [
+    "*/Cache",
+    "*/Code Cache",
+    "*/GPUCache",
+    "*/DawnCache",
+    "*/DawnGraphiteCache",
+    "*/DawnWebGPUCache",
+    "*/Media Cache",
+    "*/Application Cache",
+    "*/Service Worker/CacheStorage",
+    "*/Service Worker/ScriptCache",
+    "GrShaderCache",
+    "GraphiteDawnCache",
+    "ShaderCache",
+    "component_crx_cache",
+    "extensions_crx_cache",
+    "Crashpad/completed",
+]
+# present only while Chromium runs (or after it crashed): never copied
+LOCK_FILES = {"SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile", "LOCK"}
+
+
+def _du(path):
+    if os.path.islink(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            p = os.path.join(root, name)
+            if not os.path.islink(p):
+                try:
+                    total += os.path.getsize(p)
+                except OSError:
+                    pass
+    return total
+
+
+def cache_dirs(user_data_dir):
+    out = []
+    for pattern in CACHE_DIRS:
+        out += [p for p in glob.glob(os.path.join(glob.escape(user_data_dir), pattern)) if os.path.isdir(p)]
+    return sorted(out)
+
+
+def in_use(user_data_dir):
+    """Chromium holds SingletonLock (a symlink to host-pid) for as long as it has the profile open."""
+    return os.path.lexists(os.path.join(user_data_dir, "SingletonLock"))
+
+
+def measure(user_data_dir):
+    """{"total", "cache", "identity"} bytes, plus "dirs": {relative cache dir: bytes}."""
+    dirs = {os.path.relpath(p, user_data_dir): _du(p) for p in cache_dirs(user_data_dir)}
+    total = _du(user_data_dir)
+    cache = sum(dirs.values())
+    return {"total": total, "cache": cache, "identity": total - cache, "dirs": dirs}
+
+
+def prune(user_data_dir, dry_run=False):
+    """Delete the profile's cache dirs; returns bytes freed (would be freed, with dry_run)."""
+    if in_use(user_data_dir):
+        raise RuntimeError(f"{user_data_dir} is open in Chromium (SingletonLock); close it first.")
+    freed = 0
+    for path in cache_dirs(user_data_dir):
+        freed += _du(path)
+        if not dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+    return freed
+
+
+def startup_secs(user_data_dir, runs=3, headless=True):
+    """Median launch_persistent_context + first page time for the profile."""
+    from playwright.sync_api import sync_playwright
+    secs = []
+    with sync_playwright() as pw:
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            ctx = pw.chromium.launch_persistent_context(user_data_dir=user_data_dir, headless=headless)
+            if not ctx.pages:
+                ctx.new_page()
+            secs.append(time.perf_counter() - t0)
+            ctx.close()
+    return sorted(secs)[len(secs) // 2]
+
+
+# -------------------------- snapshots --------------------------
+def _skipped(user_data_dir):
+    return {os.path.abspath(p) for p in cache_dirs(user_data_dir)}
+
+
+def _files(user_data_dir):
+    """Relative paths of every file worth keeping (caches, locks and symlinks left out)."""
+    skip = _skipped(user_data_dir)
+    for root, dirs, files in os.walk(user_data_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) not in skip)
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name in LOCK_FILES or os.path.islink(path):
+                continue
+            yield os.path.relpath(path, user_data_dir)
+
+
+def manifests(persona, root=SNAPSHOT_ROOT):
+    """Snapshot manifest paths for the persona, oldest first."""
+    return sorted(glob.glob(os.path.join(root, "manifests", persona, "*.json")))
+
+
+def load_manifest(persona, at=None, root=SNAPSHOT_ROOT):
+    paths = manifests(persona, root)
+    if at:
+        paths = [p for p in paths if os.path.basename(p).startswith(at)]
+    if not paths:
+        raise SystemExit(f"No snapshot of {persona}" + (f" at {at}" if at else "") + f" under {root}.")
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snapshot(persona, user_data_dir, root=SNAPSHOT_ROOT):
+    """Store the profile without its caches; returns the manifest."""
+    if in_use(user_data_dir):
+        raise RuntimeError(f"{user_data_dir} is open in Chromium (SingletonLock); close it first.")
+    prev = {}
+    if manifests(persona, root):
+        prev = load_manifest(persona, root=root)["files"]
+    store = Archive(root, level=3)
+    files, read = {}, 0
+    for rel in _files(user_data_dir):
+        st = os.stat(os.path.join(user_data_dir, rel))
+        old = prev.get(rel)
+        if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+            files[rel] = old  # unchanged since the last snapshot
+            continue
+        with open(os.path.join(user_data_dir, rel), "rb") as f:
+            sha = store.put(f.read())
+        read += st.st_size
+        files[rel] = {"sha": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o777}
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    manifest = {"persona": persona, "stamp": stamp, "source": os.path.abspath(user_data_dir),
+                "bytes": sum(f["size"] for f in files.values()), "files": files}
+    path = os.path.join(root, "manifests", persona, f"{stamp}.json")
+    ensure_dir(os.path.dirname(path))
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+    manifest["stats"] = {"read_bytes": read, **store.stats}
+    return manifest
+
+
+def restore(manifest, dest, root=SNAPSHOT_ROOT):
+    """Rebuild the snapshot's profile at dest (replacing what is there); returns bytes written."""
+    if os.path.isdir(dest) and in_use(dest):
+        raise RuntimeError(f"{dest} is open in Chromium (SingletonLock); close it first.")
+    store = Archive(root)
+    staging = dest.rstrip("/\\") + ".restoring"
+    shutil.rmtree(staging, ignore_errors=True)
+    written = 0
+    for rel, meta in manifest["files"].items():
+        path = os.path.join(staging, rel)
+        ensure_dir(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(store.get(meta["sha"]))
+        os.chmod(path, meta["mode"])
+        os.utime(path, ns=(meta["mtime_ns"], meta["mtime_ns"]))
+        written += meta["size"]
+    ensure_dir(staging)
+    old = dest.rstrip("/\\") + ".old"
+    if os.path.exists(dest):
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(dest, old)
+    os.replace(staging, dest)
+    shutil.rmtree(old, ignore_errors=True)
+    return written
+
+
+def load_profiles(config=CONFIG):
+    """{persona: user_data_dir} from personas.yaml."""
+    import yaml
+    with open(config, "r") as f:
+        return {p["name"]: p["user_data_dir"] for p in yaml.safe_load(f)["personas"]}
+
+
+def _mb(n):
+    return f"{n / 1e6:,.1f} MB"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Measure, prune and snapshot persona browser profiles.")
+    ap.add_argument("--config", default=CONFIG)
+    ap.add_argument("--root", default=SNAPSHOT_ROOT, help="Snapshot store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("report", help="Per-persona profile size, identity vs cache.")
+    p.add_argument("--persona", action="append", help="Limit to these personas (repeatable).")
+    p = sub.add_parser("prune", help="Delete cache dirs (cookies, storage and history stay).")
+    p.add_argument("--persona", action="append", help="Limit to these personas (repeatable).")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--startup", action="store_true", help="Time a headless launch before and after pruning.")
+    p = sub.add_parser("snapshot", help="Deduplicated snapshot of a profile without its caches.")
+    p.add_argument("--persona", action="append")
+    p = sub.add_parser("restore", help="Rebuild a profile from a snapshot (also: clone onto another worker).")
+    p.add_argument("--persona", required=True)
+    p.add_argument("--to", default=None, help="Target dir (default: the persona's user_data_dir).")
+    p.add_argument("--at", default=None, help="Snapshot stamp prefix (default: latest).")
+    args = ap.parse_args()
+
+    profiles = load_profiles(args.config)
+    names = getattr(args, "persona", None)
+    selected = {n: d for n, d in profiles.items()
+                if (not names or n in names) and os.path.isdir(d)} if args.cmd != "restore" else {}
+
+    if args.cmd == "report":
+        totals = [0, 0]
+        for name, udd in selected.items():
+            m = measure(udd)
+            totals[0] += m["total"]
+            totals[1] += m["cache"]
+            print(f"{name:24s} {_mb(m['total']):>12s}  identity {_mb(m['identity']):>11s}  cache {_mb(m['cache']):>11s}")
+        print(f"{'all':24s} {_mb(totals[0]):>12s}  prunable {_mb(totals[1]):>11s}")
+    elif args.cmd == "prune":
+        freed_all = 0
+        for name, udd in selected.items():
+            if in_use(udd):
+                print(f"{name:24s} skipped: open in Chromium")
+                continue
+            before = startup_secs(udd) if args.startup and not args.dry_run else None
+            freed = prune(udd, args.dry_run)
+            freed_all += freed
+            line = f"{name:24s} {'would free' if args.dry_run else 'freed'} {_mb(freed)}"
+            if before is not None:
+                after = startup_secs(udd)
+                line += f", startup {before * 1000:.0f} -> {after * 1000:.0f} ms"
+            print(line)
+        print(f"Total {'prunable' if args.dry_run else 'freed'}: {_mb(freed_all)}")
+    elif args.cmd == "snapshot":
+        for name, udd in selected.items():
+            if in_use(udd):
+                print(f"{name:24s} skipped: open in Chromium")
+                continue
+            m = snapshot(name, udd, args.root)
+            s = m["stats"]
+            print(f"{name:24s} {m['stamp']}  {len(m['files'])} files, {_mb(m['bytes'])} "
+                  f"(read {_mb(s['read_bytes'])}, {s['new_blobs']} new blobs, stored {_mb(s['stored_bytes'])})")
+        print(f"Store: {_mb(_du(args.root))} in {args.root}")
+    else:
+        m = load_manifest(args.persona, args.at, args.root)
+        dest = args.to or profiles.get(args.persona)
+        if not dest:
+            raise SystemExit(f"Unknown persona {args.persona}; pass --to.")
+        n = restore(m, dest, args.root)
+        print(f"Restored {args.persona}@{m['stamp']} -> {dest} ({len(m['files'])} files, {_mb(n)})")
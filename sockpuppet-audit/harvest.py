@@ -0,0 +1,177 @@
+"""
+In-page TikTok feed harvester.
+
+An init script (installed once per page) watches the feed list (the parent of
+the feed items; childList only) and the #SIGI_STATE script with
+MutationObservers; until the list exists, a childList observer on the document
+waits for it, and every drain re-binds if the page replaced it. Whenever a [data-e2e="video-feed-item"] node is hydrated
+(it has an id and either its SIGI_STATE ItemModule entry or its author/caption
+markup), the item is pushed onto window.__harvest.q. This includes items
+rendered ahead of the viewport, which the visible-video extractor never sees.
+Python drains that queue in one round trip and blocks on it only when the
+visible item has not been hydrated yet, rather than sleeping and retrying:
+
+    harvester = FeedHarvester(); harvester.attach(page)   # before page.goto
+    page.goto(url)
+    batch = harvester.drain(page)   # {"items": [...], "current": visible id}
+    if batch["current"] not in seen:
+        batch = harvester.wait(page)
+
+Each item is {video_id, t (page ms), sigi: ItemModule entry or null, dom: {...}},
+plus html (the item's outerHTML) with FeedHarvester(keep_html=True), for the
+archive.
+SIGI_STATE is re-parsed in the page only after its observer saw it rewritten
+(a version counter, so same-length rewrites are not missed), and only the new
+items cross into Python.
+"""
+
+HARVEST_JS = r"""
+(() => {
+  if (window.__harvest) return;
+  const ITEM = "[data-e2e='video-feed-item']";
+  const h = window.__harvest = {q: [], emitted: new Set(), meta: {}, sigiVersion: 0, sigiRead: -1, total: 0};
+  const keepHtml = !!window.__harvestKeepHtml;
+  const pending = new Set();
+
+  const text = el => el ? (el.textContent || "").trim() : "";
+  const pick = (root, sels) => { for (const s of sels) { const el = root.querySelector(s); if (el) return el; } return null; };
+  const idOf = el => {
+    if (el.dataset && (el.dataset.awemeId || el.dataset.videoId)) return el.dataset.awemeId || el.dataset.videoId;
+    const a = el.querySelector("a[href*='/video/']");
+    const m = ((a && a.href) || "").match(/\/video\/(\d+)/);
+    return m ? m[1] : "";
+  };
+  const domOf = el => {
+    const v = el.querySelector("video");
+    const a = el.querySelector("a[href*='/video/']");
+    const author = pick(el, ["[data-e2e='video-author-uniqueid']"]) ||
+                   Array.from(el.querySelectorAll("a")).find(x => (x.getAttribute("href") || "").startsWith("/@"));
+    return {
+      video_src: v ? (v.currentSrc || v.src || "") : "",
+      is_paused: v ? !!v.paused : "",
+      post_url: a ? a.href : "",
+      author_handle: text(author),
+      caption: text(pick(el, ["[data-e2e='browse-video-desc']", "[data-e2e='video-desc']"])),
+      music_title: text(pick(el, ["[data-e2e='browse-music']", "[data-e2e='music-title']", "a[href*='/music/']"])),
+      duration_sec: v && Number.isFinite(v.duration) ? String(v.duration) : "",
+    };
+  };
+
+  const readSigi = () => {
+    if (h.sigiVersion === h.sigiRead) return false;  // not rewritten since the last parse
+    h.sigiRead = h.sigiVersion;
+    const el = document.getElementById("SIGI_STATE");
+    try { Object.assign(h.meta, (JSON.parse(el ? el.textContent : "") || {}).ItemModule || {}); } catch (e) { return false; }
+    return true;
+  };
+
+  const offer = el => {
+    const id = idOf(el);
+    if (id && h.emitted.has(id)) { pending.delete(el); return; }
+    const meta = id ? h.meta[id] || null : null;
+    const dom = domOf(el);
+    if (!id || !(meta || dom.author_handle || dom.caption)) { pending.add(el); return; }  // not hydrated yet
+    pending.delete(el);
+    h.emitted.add(id);
+    h.total++;
+    const it = {video_id: id, t: Date.now(), sigi: meta, dom};
+    if (keepHtml) it.html = el.outerHTML;
+    h.q.push(it);
+  };
+
+  const scan = (nodes) => {
+    const els = nodes.map(n => n.nodeType === 1 ? n : n.parentElement).filter(Boolean);
+    const items = new Set(readSigi() ? pending : []);
+    for (const el of els) {
+      const own = el.closest(ITEM);
+      if (own) items.add(own);
+      el.querySelectorAll(ITEM).forEach(x => items.add(x));
+    }
+    items.forEach(offer);
+  };
+
+  h.current = () => {
+    const vh = window.innerHeight || document.documentElement.clientHeight;
+    let best = null, bestArea = 0;
+    for (const el of document.querySelectorAll(ITEM)) {
+      const r = el.getBoundingClientRect();
+      const vis = Math.max(0, Math.min(r.bottom, vh) - Math.max(r.top, 0)) * r.width;
+      if (vis > bestArea) { best = el; bestArea = vis; }
+    }
+    if (best) offer(best);
+    return best ? idOf(best) : "";
+  };
+
+  // new items and their hydrating children are childList mutations under the feed list
+  let feed = null, sigiEl = null;
+  const feedObs = new MutationObserver(muts => {
+    const nodes = [];
+    for (const m of muts) { nodes.push(m.target); m.addedNodes.forEach(n => nodes.push(n)); }
+    scan(nodes);
+  });
+  const sigiObs = new MutationObserver(() => { h.sigiVersion++; scan([]); });
+  const bind = () => {
+    const el = document.getElementById("SIGI_STATE");
+    if (el && el !== sigiEl) {
+      sigiEl = el;
+      h.sigiVersion++;
+      sigiObs.disconnect();
+      sigiObs.observe(el, {childList: true, characterData: true, subtree: true});
+    }
+    const first = document.querySelector(ITEM);
+    const list = first && first.parentElement;
+    if (list && list !== feed) {
+      feed = list;
+      feedObs.disconnect();
+      feedObs.observe(list, {childList: true, subtree: true});
+      scan([list]);
+    }
+    return !!feed;
+  };
+  const boot = new MutationObserver(() => { if (bind()) boot.disconnect(); });
+  boot.observe(document, {childList: true, subtree: true});
+  document.addEventListener("DOMContentLoaded", () => { if (bind()) boot.disconnect(); });
+
+  h.drain = () => {
+    bind();  // the page may have swapped the list or SIGI_STATE out
+    pending.forEach(offer);  // hydration the observer can't see (attributes only)
+    const current = h.current();
+    return {items: h.q.splice(0), current, total: h.total};
+  };
+})();
+"""
+
+DRAIN_JS = "() => window.__harvest ? window.__harvest.drain() : {items: [], current: '', total: 0}"
+READY_JS = "() => !!window.__harvest && window.__harvest.q.length > 0"
+
+
+class FeedHarvester:
+    def __init__(self, wait_ms=3000, keep_html=False):
+        self.wait_ms = wait_ms
+        self.keep_html = keep_html
+        self.drained = 0
+
+    def attach(self, page):
+        """Install on every document the page loads from now on."""
+        if self.keep_html:
+            page.add_init_script("window.__harvestKeepHtml = true;")  # init scripts run in order
+        page.add_init_script(HARVEST_JS)
+
+    def drain(self, page):
+        """Items hydrated since the last drain, plus the id of the visible item."""
+        try:
+            batch = page.evaluate(DRAIN_JS) or {}
+        except Exception:
+            batch = {}
+        batch.setdefault("items", [])
+        batch.setdefault("current", "")
+        self.drained += len(batch["items"])
+        return batch
+
+    def wait(self, page, timeout_ms=None):
+        """Block until the page queues an item (or timeout), then drain."""
+        try:
+            page.wait_for_function(READY_JS, timeout=timeout_ms or self.wait_ms)
+        except Exception:
+            pass
+        return self.drain(page)
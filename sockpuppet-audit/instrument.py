@@ -0,0 +1,177 @@
+"""
+Hot-path instrumentation: timing spans and counters per scraping session.
+
+    with session_tracer("youtube", persona, "…/trace.jsonl", "data/metrics") as tracer:
+        with tracer.span("goto"):
+            page.goto(url)
+        tracer.count("fallback_homepage")
+
+- every span/counter event is one JSONL line in trace_path (if given);
+- close() (end of the with block) appends a per-session summary line and,
+  with prom_dir, writes
+  <prom_dir>/sockpuppet_<platform>_<persona>.prom for node_exporter's
+  textfile collector (values are for the last session);
+- code paths without a session tracer hit NullTracer, which does nothing.
+
+profiled() wraps a run in cProfile (.prof) or pyinstrument (.html).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from common import ensure_dir, ts
+
+
+class NullTracer:
+    def span(self, name, **attrs):
+        return nullcontext()
+
+    def count(self, name, n=1, **attrs):
+        pass
+
+    def close(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        set_tracer(NullTracer())
+
+
+def session_tracer(platform, persona, trace_path=None, prom_dir=None):
+    """Install and return a Tracer if anything is to be exported, else a NullTracer."""
+    return set_tracer(Tracer(platform, persona, trace_path, prom_dir) if trace_path or prom_dir else NullTracer())
+
+
+class Tracer(NullTracer):
+    def __init__(self, platform, persona, trace_path=None, prom_dir=None):
+        self.platform = platform
+        self.persona = persona
+        self.prom_dir = prom_dir
+        self.spans = {}     # name -> [count, total secs, max secs]
+        self.counters = {}  # name -> n
+        self.started = time.perf_counter()
+        self.trace = None
+        if trace_path:
+            ensure_dir(os.path.dirname(os.path.abspath(trace_path)))
+            self.trace = open(trace_path, "a", encoding="utf-8")
+
+    def _emit(self, event):
+        if self.trace:
+            self.trace.write(json.dumps(event) + "\n")
+
+    @contextmanager
+    def span(self, name, **attrs):
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            secs = time.perf_counter() - t0
+            s = self.spans.setdefault(name, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += secs
+            s[2] = max(s[2], secs)
+            self._emit({"ts": ts(), "span": name, "ms": round(secs * 1000, 3), "ok": ok, **attrs})
+
+    def count(self, name, n=1, **attrs):
+        self.counters[name] = self.counters.get(name, 0) + n
+        self._emit({"ts": ts(), "count": name, "n": n, **attrs})
+
+    def summary(self):
+        return {
+            "platform": self.platform, "persona": self.persona,
+            "session_secs": round(time.perf_counter() - self.started, 3),
+            "spans": {k: {"n": n, "total_ms": round(tot * 1000, 3), "max_ms": round(mx * 1000, 3)}
+                      for k, (n, tot, mx) in sorted(self.spans.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def write_prom(self, prom_dir):
+        labels = f'platform="{self.platform}",persona="{self.persona}"'
+        lines = [
+            "# HELP sockpuppet_span_seconds_sum Time spent in each phase (last session).",
+            "# TYPE sockpuppet_span_seconds_sum gauge",
+            *[f'sockpuppet_span_seconds_sum{{{labels},span="{k}"}} {tot:.6f}' for k, (_, tot, _) in sorted(self.spans.items())],
+            "# HELP sockpuppet_span_count Number of times each phase ran (last session).",
+            "# TYPE sockpuppet_span_count gauge",
+            *[f'sockpuppet_span_count{{{labels},span="{k}"}} {n}' for k, (n, _, _) in sorted(self.spans.items())],
+            "# HELP sockpuppet_span_seconds_max Slowest single run of each phase (last session).",
+            "# TYPE sockpuppet_span_seconds_max gauge",
+            *[f'sockpuppet_span_seconds_max{{{labels},span="{k}"}} {mx:.6f}' for k, (_, _, mx) in sorted(self.spans.items())],
+            "# HELP sockpuppet_events Retries, strikes, fallbacks and misses (last session).",
+            "# TYPE sockpuppet_events gauge",
+            *[f'sockpuppet_events{{{labels},event="{k}"}} {n}' for k, n in sorted(self.counters.items())],
+            "# HELP sockpuppet_session_seconds Wall time of the last session.",
+            "# TYPE sockpuppet_session_seconds gauge",
+            f"sockpuppet_session_seconds{{{labels}}} {time.perf_counter() - self.started:.3f}",
+            "# HELP sockpuppet_session_end_timestamp_seconds When the last session ended.",
+            "# TYPE sockpuppet_session_end_timestamp_seconds gauge",
+            f"sockpuppet_session_end_timestamp_seconds{{{labels}}} {time.time():.0f}",
+        ]
+        ensure_dir(prom_dir)
+        path = os.path.join(prom_dir, f"sockpuppet_{self.platform}_{self.persona}.prom")
+        tmp = path + ".tmp"  # the collector must never see a half-written file
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+        return path
+
+    def close(self):
+        summary = self.summary()
+        self._emit({"ts": ts(), "summary": summary})
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+        if self.prom_dir:
+            self.write_prom(self.prom_dir)
+        return summary
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer):
+    global _tracer
+    _tracer = tracer
+    return tracer
+
+
+@contextmanager
+def profiled(mode, out_path):
+    """Profile the block with mode "cprofile" (-> .prof) or "pyinstrument" (-> .html); None is a no-op."""
+    if not mode:
+        yield
+        return
+    ensure_dir(os.path.dirname(os.path.abspath(out_path)))
+    if mode == "pyinstrument":
+        from pyinstrument import Profiler  # optional dependency
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(out_path + ".html", "w", encoding="utf-8") as f:
+                f.write(prof.output_html())
+            print(f"Profile -> {out_path}.html")
+        return
+    import cProfile
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(out_path + ".prof")
+        print(f"Profile -> {out_path}.prof (python -m pstats {out_path}.prof)")
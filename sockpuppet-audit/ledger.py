@@ -0,0 +1,116 @@
+"""
+Durable checkpoint ledger for resumable sessions (SQLite, WAL).
+
+One row per (platform, persona, day) holds the session's progress (count,
+last video, where to continue, seed query) and a side table holds the ids
+already seen. Progress is staged per video and committed right after the log
+writer flushes, so the ledger never claims more than the logs hold (if the
+writer fails, rollback() drops what it never wrote):
+
+    ledger = Ledger()
+    log.after_flush.append(ledger.commit)
+    state = ledger.resume("youtube", persona, day)   # None if nothing to resume
+    ...
+    ledger.record("youtube", persona, day, video_id, count, cursor=page.url)
+
+A run with --days N keeps all its sessions on the same calendar date; each
+session after the first gets its own key (session_day), so starting one
+never resets the progress of an earlier one.
+
+Several processes (orchestrator workers) may share one ledger file.
+"""
+import os
+import sqlite3
+
+from clock import get_clock
+from common import ensure_dir, ts
+
+LEDGER_PATH = "data/ledger.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    platform TEXT, persona TEXT, day TEXT,
+    count INTEGER NOT NULL DEFAULT 0, last_video TEXT, cursor TEXT, seed TEXT, updated TEXT,
+    PRIMARY KEY (platform, persona, day)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    platform TEXT, persona TEXT, day TEXT, video_id TEXT,
+    PRIMARY KEY (platform, persona, day, video_id)
+) WITHOUT ROWID;
+"""
+
+
+def today():
+    return get_clock().now().date().isoformat()
+
+
+def session_day(day, session=0):
+    """Ledger key of the date's session-th session (0 = the first): '2024-05-01', '2024-05-01#2', …"""
+    return f"{day}#{session + 1}" if session else day
+
+
+class Ledger:
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.staged = {}   # key -> latest progress tuple
+        self.seen = []     # staged seen rows
+
+    def resume(self, platform, persona, day):
+        """{count, last_video, cursor, seed, seen:set} of a stopped session, or None."""
+        row = self.db.execute(
+            "SELECT count, last_video, cursor, seed FROM progress WHERE platform=? AND persona=? AND day=?",
+            (platform, persona, day)).fetchone()
+        if not row:
+            return None
+        seen = {v for (v,) in self.db.execute(
+            "SELECT video_id FROM seen WHERE platform=? AND persona=? AND day=?", (platform, persona, day))}
+        return {"count": row[0], "last_video": row[1] or "", "cursor": row[2] or "", "seed": row[3] or "",
+                "seen": seen}
+
+    def start(self, platform, persona, day, seed=""):
+        """Begin the day from scratch (a run without --resume)."""
+        self.staged.pop((platform, persona, day), None)
+        self.seen = [s for s in self.seen if s[:3] != (platform, persona, day)]
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.execute("DELETE FROM seen WHERE platform=? AND persona=? AND day=?", (platform, persona, day))
+        self.db.execute("INSERT OR REPLACE INTO progress VALUES (?,?,?,0,'','',?,?)",
+                        (platform, persona, day, seed, ts()))
+        self.db.execute("COMMIT")
+
+    def record(self, platform, persona, day, video_id, count, cursor="", seed=""):
+        """Stage one logged video; durable after the next commit()."""
+        self.staged[(platform, persona, day)] = (count, video_id, cursor, seed, ts())
+        if video_id:
+            self.seen.append((platform, persona, day, video_id))
+
+    def commit(self):
+        if not self.staged and not self.seen:
+            return
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?,?,?,?)", self.seen)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO progress VALUES (?,?,?,?,?,?,?,?)",
+            [(*key, *val) for key, val in self.staged.items()])
+        self.db.execute("COMMIT")
+        self.staged, self.seen = {}, []
+
+    def rollback(self):
+        """Drop staged progress whose rows never reached the logs (e.g. closing the log writer failed)."""
+        self.staged, self.seen = {}, []
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type:  # flushed rows were committed by after_flush already; the rest is unlogged
+            self.rollback()
+        self.close()
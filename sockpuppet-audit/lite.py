@@ -0,0 +1,107 @@
+"""
+"Audit-lite" browsing: skip the bytes and CPU we never log.
+
+- Images, fonts and ad/telemetry beacons are blocked (Playwright request
+  routing).
+- Media keeps streaming so the platform still sees a normal watch (play
+  state, watchtime pings), but every <video> is muted and YouTube's player is
+  pinned to its lowest quality, which cuts both download and decode cost.
+  TikTok's web player has no quality setting to pin, and its media is not
+  blocked: a feed item whose video never loads doesn't autoplay, reports no
+  play time and stalls the scroll, so the session would stop looking (and
+  being recommended to) like a viewer. TikTok media is muted only.
+- Watch-signal endpoints are never blocked, even when they match a tracker
+  pattern.
+
+Per-session stats count blocked requests by kind and the bytes received
+(from Content-Length; responses without one are counted as unsized). Bytes
+saved cannot be measured: an aborted request never gets a response, so it
+never reports its size. est_bytes_saved is an estimate, blocked requests x a
+typical size for their kind (EST_BYTES).
+"""
+import json
+import os
+import re
+
+from common import ensure_dir, ts
+
+CHROME_ARGS = ["--mute-audio"]
+
+BLOCK_TYPES = {"image", "font"}
+TRACKERS = re.compile(
+    r"doubleclick\.net|googlesyndication|googleadservices|google-analytics\.com|googletagmanager"
+    r"|/pagead/|/ptracking|/api/stats/ads|/api/stats/qoe|/log_event|/generate_204"
+    r"|mon(-va)?\.(tiktokv|byteoversea)\.com|analytics\.tiktok\.com|/web/report|/monitor_browser/"
+)
+WATCH_SIGNAL = re.compile(r"/api/stats/(watchtime|playback)|/youtubei/v1/|/aweme/v\d/aweme/stats|/api/(recommend/)?item_list")
+
+# Typical transfer sizes, only used to estimate what a blocked request would have cost.
+EST_BYTES = {"image": 30_000, "font": 45_000, "tracker": 1_500}
+
+MEDIA_JS = r"""
+(() => {
+  const lowest = () => {
+    const p = document.getElementById('movie_player');
+    if (p && p.setPlaybackQualityRange) { try { p.setPlaybackQualityRange('tiny', 'tiny'); } catch (e) {} }
+  };
+  document.addEventListener('play', e => { if (e.target) e.target.muted = true; lowest(); }, true);
+  document.addEventListener('loadedmetadata', lowest, true);
+})();
+"""
+
+
+def classify(url, resource_type):
+    """'tracker' / resource type to block, or None to let the request through."""
+    if WATCH_SIGNAL.search(url):
+        return None
+    if TRACKERS.search(url):
+        return "tracker"
+    if resource_type in BLOCK_TYPES:
+        return resource_type
+    return None
+
+
+class LiteStats:
+    def __init__(self):
+        self.blocked = {}
+        self.bytes_in = 0
+        self.requests = 0
+        self.unsized = 0  # responses without a Content-Length (chunked, cached, …)
+
+    def block(self, kind):
+        self.blocked[kind] = self.blocked.get(kind, 0) + 1
+
+    def summary(self):
+        return {"blocked": dict(self.blocked), "requests": self.requests, "bytes_in": self.bytes_in,
+                "unsized": self.unsized,
+                "est_bytes_saved": sum(EST_BYTES.get(k, 0) * n for k, n in self.blocked.items())}
+
+    def save(self, path, **extra):
+        """Append this session's summary as one JSON line."""
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": ts(), **extra, **self.summary()}) + "\n")
+
+
+# -------------------------- Playwright --------------------------
+def attach_playwright(target, stats):
+    """Route every request of a (sync) Page or BrowserContext through the block list."""
+    def handle(route):
+        req = route.request
+        kind = classify(req.url, req.resource_type)
+        if kind:
+            stats.block(kind)
+            route.abort()
+        else:
+            route.continue_()
+
+    def on_response(response):
+        stats.requests += 1
+        try:
+            stats.bytes_in += int(response.headers["content-length"])
+        except (KeyError, ValueError):
+            stats.unsized += 1
+
+    target.add_init_script(MEDIA_JS)
+    target.route("**/*", handle)
+    target.on("response", on_response)
@@ -0,0 +1,189 @@
+"""
+Buffered CSV log writer shared by the scrapers.
+
+write_rows() reopens the file for every call; LogWriter instead keeps one
+handle per CSV open, buffers rows in memory and writes them out as a batch
+once `flush_rows` rows are pending or `flush_secs` have passed.
+
+Crash safety comes from a small write-ahead journal: each batch is appended
+to the journal and fsync'd once, then written to the CSVs without fsync.
+After a crash the next LogWriter on the same journal truncates each CSV back
+to the offset recorded for its first journaled chunk and replays the chunks,
+so at most the one batch still in memory is lost. The journal is reset at
+every checkpoint (close, or when it grows past `checkpoint_bytes`).
+
+Rows are appended under the header already in the file, so a CSV whose header
+differs from the one it is opened with (e.g. recs.csv from before rank,
+rec_title, rec_channel and is_repeat were logged) is first rotated aside to
+<name>.<n>.csv and the rows start a new file.
+
+open_log_writer() picks the backend for a script's --output flag.
+"""
+import csv
+import io
+import json
+import os
+import time
+
+from common import ensure_dir
+
+
+class LogWriter:
+    def __init__(self, journal_path, flush_rows=100, flush_secs=30.0, checkpoint_bytes=4 << 20):
+        self.journal_path = journal_path
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.checkpoint_bytes = checkpoint_bytes
+        self.files = {}      # path -> binary handle opened for append
+        self.headers = {}    # path -> fieldnames
+        self.pending = {}    # path -> [rows]
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        self.after_flush = []  # callables run once a batch is durable (e.g. Ledger.commit)
+        self.rotated = {}      # path -> where its file with another header was moved
+        ensure_dir(os.path.dirname(os.path.abspath(journal_path)))
+        self.recover()
+        self.journal = open(journal_path, "ab")
+
+    # -------------------------- journal --------------------------
+    def recover(self):
+        """Replay a journal left behind by a crashed writer."""
+        if not os.path.exists(self.journal_path) or not os.path.getsize(self.journal_path):
+            return 0
+        chunks = []
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    chunks.append(json.loads(line))
+                except ValueError:
+                    break  # torn final write: that batch never reached the CSVs either
+        cut = {}
+        for c in chunks:
+            cut.setdefault(c["path"], c["offset"])
+        for path, offset in cut.items():
+            ensure_dir(os.path.dirname(os.path.abspath(path)))
+            with open(path, "ab") as f:
+                f.truncate(offset)
+        for c in chunks:
+            with open(c["path"], "ab") as f:
+                f.write(c["data"].encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        os.remove(self.journal_path)
+        return len(chunks)
+
+    def checkpoint(self):
+        """fsync every CSV, then reset the journal."""
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal.truncate(0)
+        self.journal.seek(0)
+
+    # -------------------------- files --------------------------
+    def open(self, path, header, truncate=False):
+        """
+        Register a CSV; truncate=True starts it over (the old "w" mode). An
+        existing file with another header is rotated aside first.
+        """
+        if path in self.files:
+            return
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        if not truncate and read_header(path) not in (None, list(header)):
+            self.rotated[path] = rotate(path)
+            print(f"⚠️  {path} was written with another header; moved it to {self.rotated[path]}")
+        f = open(path, "ab")
+        if truncate:
+            f.truncate(0)
+        self.files[path] = f
+        self.headers[path] = list(header)
+
+    def write(self, path, header, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        self.open(path, header)
+        self.pending.setdefault(path, []).extend(rows)
+        self.n_pending += len(rows)
+        if self.n_pending >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_secs:
+            self.flush()
+
+    def flush(self):
+        if not self.n_pending:
+            self.last_flush = time.monotonic()
+            for fn in self.after_flush:
+                fn()
+            return
+        chunks = []
+        for path, rows in self.pending.items():
+            f = self.files[path]
+            offset = f.seek(0, os.SEEK_END)
+            buf = io.StringIO()
+            w = csv.DictWriter(buf, fieldnames=self.headers[path])
+            if offset == 0:
+                w.writeheader()
+            w.writerows(rows)
+            chunks.append({"path": path, "offset": offset, "data": buf.getvalue()})
+
+        self.journal.write(b"".join(json.dumps(c).encode("utf-8") + b"\n" for c in chunks))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+        for c in chunks:
+            f = self.files[c["path"]]
+            f.write(c["data"].encode("utf-8"))
+            f.flush()
+        self.pending = {}
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        if self.journal.tell() >= self.checkpoint_bytes:
+            self.checkpoint()
+        for fn in self.after_flush:
+            fn()
+
+    def close(self):
+        self.flush()
+        self.checkpoint()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        self.journal.close()
+        os.remove(self.journal_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path):
+    """The first record of a CSV as a list, or None for a missing/empty file."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def rotate(path):
+    """Move path to the first free <name>.<n><ext>; returns the new path."""
+    stem, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{stem}.{n}{ext}"):
+        n += 1
+    os.replace(path, f"{stem}.{n}{ext}")
+    return f"{stem}.{n}{ext}"
+
+
+def open_log_writer(output, journal_path, flush_rows=100, flush_secs=30.0, **kw):
+    """
+    LogWriter for output="csv"; the Parquet sink (parquet_store) for "parquet";
+    the SQLite observation store (sqlite_store) for "sqlite".
+    """
+    if output == "parquet":
+        from parquet_store import ParquetWriter
+        return ParquetWriter(flush_rows=flush_rows, flush_secs=flush_secs, **kw)
+    if output == "sqlite":
+        from sqlite_store import SqliteWriter
+        return SqliteWriter(flush_rows=flush_rows, flush_secs=flush_secs, **kw)
+    return LogWriter(journal_path, flush_rows, flush_secs)
@@ -0,0 +1,221 @@
+"""
+Bulk normalization of raw CSV logs into typed Parquet.
+
+The scrapers log what the page showed, one row at a time, so historical logs
+mix formats: counts as "1.2K" / "3M" / "1,234", durations as seconds, "12:34"
+or "PT1M2S" (and 0 where YouTube's parser gave up), whole URLs where an id was
+expected, handles with or without "@" (or as profile URLs), and timestamps with
+and without microseconds or offsets. This stage rewrites every partition with
+the same rules, a whole column at a time (Arrow compute kernels; pandas for
+the ISO 8601 parse):
+
+    counts      like/comment/share counts -> int64 (K/M/B suffixes, separators)
+    durations   seconds, [h:]mm:ss, ISO 8601 -> seconds; 0/unparseable -> null
+    video ids   video_id / watching / rec_vid from ids, watch/shorts/youtu.be/
+                TikTok /video/ URLs; anything else -> null (never the whole URL)
+    handles     "@name", "name", ".../@name/..." -> "@name" (lowercase)
+    timestamps  ISO 8601 -> timestamp[us] (offsets converted to UTC)
+    flags, ints is_repeat / is_paused -> bool, rank / index / batch -> int
+
+CSV files are spread over a process pool. Output uses the Parquet store's
+schemas and layout, so parquet_store.load() reads it, with one file per CSV
+(a partition can hold the live <table>.csv and rotated <table>.<n>.csv):
+
+    data/normalized/<table>/platform=<p>/persona=<name>/day=<YYYY-MM-DD>/part-<csv name>.parquet
+
+    python normalize.py --logs data/logs --out data/normalized --workers 8
+
+CSVs whose output is newer than the CSV are skipped.
+"""
+import argparse
+import csv
+import glob
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from common import ensure_dir
+from parquet_store import partition_dir, partition_of, schema_for
+
+NORMALIZED_ROOT = "data/normalized"
+
+COUNT_RE = r"^(?P<num>\d+(?:\.\d+)?)(?P<suf>[kmb])?$"
+NUMBER_RE = r"^-?\d+(?:\.\d+)?$"
+CLOCK_RE = r"^(?:(?P<h>\d+):)?(?P<m>\d{1,2}):(?P<s>\d{2}(?:\.\d+)?)$"
+ISO_DURATION_RE = r"^pt(?:(?P<h>\d+(?:\.\d+)?)h)?(?:(?P<m>\d+(?:\.\d+)?)m)?(?:(?P<s>\d+(?:\.\d+)?)s)?$"
+ID_IN_URL_RE = r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/video/)(?P<id>[A-Za-z0-9_-]+)"
+BARE_ID_RE = r"^[A-Za-z0-9_-]+$"
+HANDLE_RE = r"@(?P<h>[A-Za-z0-9_.]+)"
+BARE_HANDLE_RE = r"^[A-Za-z0-9_.]+$"
+F64 = pa.float64()
+
+
+def _clean(a):
+    return pc.utf8_lower(pc.utf8_trim_whitespace(a))
+
+
+def _group(a, pattern, name):
+    """Named group of pattern per value (null where it doesn't match)."""
+    return pc.struct_field(pc.extract_regex(a, pattern), name)
+
+
+def _number(a):
+    """Plain decimal strings -> float64, anything else null."""
+    return pc.cast(pc.if_else(pc.match_substring_regex(a, NUMBER_RE), a, None), F64)
+
+
+def _secs(parts):
+    """Seconds from an extract_regex struct with h/m/s groups ("" for a group that didn't take part)."""
+    total = None
+    for name, mult in (("h", 3600.0), ("m", 60.0), ("s", 1.0)):
+        v = pc.struct_field(parts, name)
+        v = pc.multiply(pc.cast(pc.if_else(pc.equal(v, ""), "0", v), F64), mult)
+        total = v if total is None else pc.add(total, v)
+    return total
+
+
+def counts(a):
+    """'1.2K' / '3M' / '2.5b' / '1,234' -> int64."""
+    parts = pc.extract_regex(pc.replace_substring_regex(_clean(a), r"[,\s]", ""), COUNT_RE)
+    suf = pc.struct_field(parts, "suf")
+    mult = pc.if_else(pc.equal(suf, "k"), 1e3, pc.if_else(pc.equal(suf, "m"), 1e6,
+                                                          pc.if_else(pc.equal(suf, "b"), 1e9, 1.0)))
+    return pc.cast(pc.round(pc.multiply(pc.cast(pc.struct_field(parts, "num"), F64), mult)), pa.int64())
+
+
+def durations(a):
+    """Seconds, '[h:]mm:ss', 'PT#H#M#S' -> float64 seconds; 0 and unparseable -> null."""
+    a = _clean(a)
+    iso = pc.if_else(pc.equal(a, "pt"), None, a)
+    out = pc.coalesce(_number(a), _secs(pc.extract_regex(a, CLOCK_RE)), _secs(pc.extract_regex(iso, ISO_DURATION_RE)))
+    return pc.if_else(pc.greater(out, 0), out, None)
+
+
+def video_ids(a):
+    """Bare ids pass through; ids are pulled out of watch/shorts/youtu.be/TikTok URLs; else null."""
+    a = pc.utf8_trim_whitespace(a)
+    return pc.coalesce(_group(a, ID_IN_URL_RE, "id"), pc.if_else(pc.match_substring_regex(a, BARE_ID_RE), a, None))
+
+
+def handles(a):
+    """'@Name', 'Name', 'https://www.tiktok.com/@Name/video/1' -> '@name'."""
+    a = pc.utf8_trim_whitespace(a)
+    h = pc.coalesce(_group(a, HANDLE_RE, "h"), pc.if_else(pc.match_substring_regex(a, BARE_HANDLE_RE), a, None))
+    return pc.binary_join_element_wise("@", pc.utf8_lower(h), "")
+
+
+def flags(a):
+    a = _clean(a)
+    return pc.if_else(pc.is_in(a, pa.array(["1", "true", "yes"])), True,
+                      pc.if_else(pc.is_in(a, pa.array(["0", "false", "no"])), False, None))
+
+
+def ints(a):
+    return pc.cast(pc.round(_number(pc.utf8_trim_whitespace(a))), pa.int64())
+
+
+def timestamps(a):
+    """ISO 8601 (with or without fraction / offset) -> timestamp[us]; offsets converted to UTC."""
+    ts = pd.to_datetime(pd.Series(a.to_pandas(), dtype="string").str.strip(), format="ISO8601",
+                        errors="coerce", utc=True)
+    return pa.array(ts.dt.tz_localize(None).astype("datetime64[us]"), from_pandas=True)
+
+
+RULES = {
+    "watched": {"ts": timestamps, "video_id": video_ids, "dwell_secs": durations, "duration_secs": durations,
+                "is_repeat": flags},
+    "recs": {"ts": timestamps, "watching": video_ids, "rec_vid": video_ids, "rank": ints, "is_repeat": flags},
+    "feed": {"ts_iso": timestamps, "index": ints, "video_id": video_ids, "duration_sec": durations,
+             "author_handle": handles, "like_count": counts, "comment_count": counts, "share_count": counts,
+             "is_paused": flags, "is_repeat": flags},
+    "feed_recs": {"ts_iso": timestamps, "batch": ints, "rank": ints, "video_id": video_ids,
+                  "author_handle": handles, "is_repeat": flags},
+    "feed_preloaded": {"ts_iso": timestamps, "video_id": video_ids, "duration_sec": durations,
+                       "author_handle": handles, "like_count": counts, "comment_count": counts,
+                       "share_count": counts, "is_repeat": flags},
+}
+
+
+def normalize_table(strings, table, schema):
+    """Apply the table's rules to a table of raw string columns; returns it cast to schema."""
+    rules = RULES.get(table, {})
+    cols = {}
+    for name in strings.column_names:
+        col = strings[name].combine_chunks()
+        cols[name] = rules[name](col) if name in rules else col
+    if table == "feed" and "post_url" in cols:
+        # rows whose id was lost still carry it in the post URL
+        cols["video_id"] = pc.coalesce(cols["video_id"], video_ids(cols["post_url"]))
+    out = []
+    for field in schema:
+        if field.name not in cols:
+            out.append(pa.nulls(strings.num_rows, field.type))
+            continue
+        col = cols[field.name]
+        if pa.types.is_integer(field.type) and pa.types.is_floating(col.type):
+            col = pc.round(col)
+        out.append(pc.cast(col, field.type, safe=False))
+    return pa.table(out, schema=schema)
+
+
+def read_raw(csv_path, header):
+    strings = pacsv.read_csv(csv_path,
+                             parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                             convert_options=pacsv.ConvertOptions(column_types={h: pa.string() for h in header}))
+    return strings
+
+
+def normalize_file(csv_path, out_root=NORMALIZED_ROOT, force=False):
+    """One CSV -> <out_root>/<table>/.../part-<csv name>.parquet; returns rows written (0 if up to date)."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if not header:
+        return 0
+    table, platform, persona, day = partition_of(csv_path)
+    table, schema = schema_for(table, header)
+    part_dir = partition_dir(out_root, table, platform, persona, day)
+    out = os.path.join(part_dir, f"part-{os.path.splitext(os.path.basename(csv_path))[0]}.parquet")
+    if not force and os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(csv_path):
+        return 0
+    normalized = normalize_table(read_raw(csv_path, header), table, schema)
+    ensure_dir(part_dir)
+    fd, tmp = tempfile.mkstemp(dir=part_dir, prefix=".part-", suffix=".tmp")  # per worker
+    os.close(fd)
+    pq.write_table(normalized, tmp, compression="zstd")
+    os.replace(tmp, out)
+    try:
+        os.remove(os.path.join(part_dir, "part.parquet"))  # one output for the whole partition, before part-<name>
+    except FileNotFoundError:
+        pass
+    return normalized.num_rows
+
+
+def normalize(logs_root="data/logs", out_root=NORMALIZED_ROOT, workers=None, force=False):
+    """Normalize every CSV under logs_root over `workers` processes (default: all cores)."""
+    started = time.time()
+    paths = sorted(glob.glob(os.path.join(logs_root, "*", "*", "*", "*.csv")), key=os.path.getsize, reverse=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(normalize_file, paths, [out_root] * len(paths), [force] * len(paths)))
+    secs = time.time() - started
+    return {"files": sum(1 for n in rows if n), "rows": sum(rows), "workers": workers, "secs": secs,
+            "rows_per_sec": sum(rows) / max(secs, 1e-9)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Normalize raw CSV logs into typed Parquet.")
+    ap.add_argument("--logs", default="data/logs")
+    ap.add_argument("--out", default=NORMALIZED_ROOT)
+    ap.add_argument("--workers", type=int, default=None, help="Processes (default: all cores).")
+    ap.add_argument("--force", action="store_true", help="Rewrite outputs that are already up to date.")
+    args = ap.parse_args()
+    stats = normalize(args.logs, args.out, args.workers, args.force)
+    print(f"Normalized {stats['rows']:,} rows in {stats['files']} files with {stats['workers']} workers "
+          f"in {stats['secs']:.1f}s ({stats['rows_per_sec']:,.0f} rows/s) -> {args.out}")
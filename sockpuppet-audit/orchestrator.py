@@ -0,0 +1,216 @@
+"""
+Run every persona/platform from personas.yaml concurrently.
+
+Each (persona, platform) pair becomes one job that runs its --days sessions
+back to back. Jobs run in a process pool capped by --max-browsers, and two
+jobs that share a user_data_dir are never scheduled at the same time, so a
+Chromium profile is only ever opened by one browser.
+
+    python orchestrator.py --max-browsers 4 --days 1 --headless
+    python orchestrator.py --youtube-url http://127.0.0.1:8000 --dry-run
+"""
+import argparse
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import yaml
+
+from browsers import PlaywrightManager
+from clock import make_clock, set_clock
+from common import ensure_dir, tiktok_feed_path
+
+PLATFORMS = ("youtube", "tiktok")
+
+
+def load_personas(config_path):
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+    return cfg["personas"]
+
+
+def build_jobs(personas, days, platforms=PLATFORMS, names=None):
+    """One job per (persona, platform), in personas.yaml order."""
+    jobs = []
+    for p in personas:
+        if names and p["name"] not in names:
+            continue
+        for platform in p.get("platform", []):
+            if platform not in platforms:
+                continue
+            jobs.append({
+                "persona": p["name"],
+                "platform": platform,
+                "keywords": p["keywords"],
+                "videos_per_day": p["videos_per_day"],
+                "user_data_dir": p["user_data_dir"],
+                "days": days,
+            })
+    return jobs
+
+
+def run_job(job, opts, stop=None):
+    """
+    Worker entry point: run all days of one persona/platform job. Once the
+    `stop` event (threading.Event) is set, the session ends at its next video
+    and no further days start.
+    """
+    ensure_dir(job["user_data_dir"])
+    seed = opts.get("seed")
+    set_clock(make_clock(opts.get("clock", "real"), opts.get("speedup", 0),
+                         None if seed is None else f"{seed}/{job['persona']}/{job['platform']}"))
+    started = time.time()
+    videos, error = 0, ""
+    # one warm browser per job: only the first day pays the cold start
+    browsers = PlaywrightManager()
+    # memory watchdog settings pass straight through to either scraper
+    mem = {k: opts[k] for k in ("mem_heap_mb", "mem_rss_mb", "mem_interval", "mem_recycle") if k in opts}
+    try:
+        for d in range(job["days"]):
+            if stop is not None and stop.is_set():
+                break
+            # each session has its own ledger progress; a finished one is skipped on resume
+            resume, session = opts.get("resume", False), job.get("session", 0) + d
+            if job["platform"] == "youtube":
+                from youtube.simple_watch_YT import run_session
+                videos += run_session(job["persona"], job["keywords"], job["videos_per_day"],
+                                      job["user_data_dir"], opts["dwell_min"], opts["dwell_max"],
+                                      headless=opts["headless"], dry_run=opts["dry_run"],
+                                      base_url=opts["youtube_url"], lite_mode=opts.get("lite", False),
+                                      browsers=browsers, resume=resume, session=session,
+                                      trace=opts.get("trace", False), stop=stop,
+                                      metrics_dir=opts.get("metrics_dir"), archive_dir=opts.get("archive_dir"), **mem)
+            else:
+                from tiktok.simple_watch_TT_v4 import run
+                videos += run(mode="scrape", max_videos=job["videos_per_day"],
+                              out_csv=tiktok_feed_path(job["persona"]), headless=opts["headless"],
+                              start_url=f"{opts['tiktok_url']}/foryou",
+                              delay_min=opts["delay_min"], delay_max=opts["delay_max"],
+                              user_data_dir=job["user_data_dir"], lite_mode=opts.get("lite", False),
+                              browsers=browsers, persona=job["persona"],
+                              resume=resume, session=session, trace=opts.get("trace", False), stop=stop,
+                              metrics_dir=opts.get("metrics_dir"), archive_dir=opts.get("archive_dir"), **mem)
+    except Exception as e:
+        error = f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}"
+    finally:
+        browsers.close()
+    return {"persona": job["persona"], "platform": job["platform"], "videos": videos, "started": started,
+            "secs": time.time() - started, "error": error, "startup": browsers.report()}
+
+
+def run_all(jobs, opts, max_browsers):
+    """
+    Schedule jobs on at most max_browsers worker processes, holding back any
+    job whose profile directory is already in use. Returns per-job results.
+    """
+    pending = list(jobs)
+    busy = set()
+    running = {}
+    results = []
+    with ProcessPoolExecutor(max_workers=max_browsers) as pool:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= max_browsers:
+                    break
+                profile = os.path.abspath(job["user_data_dir"])
+                if profile in busy:
+                    continue
+                pending.remove(job)
+                busy.add(profile)
+                running[pool.submit(run_job, job, opts)] = profile
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                busy.discard(running.pop(fut))
+                res = fut.result()
+                status = f"ERROR {res['error']}" if res["error"] else "ok"
+                print(f"[{res['platform']}/{res['persona']}] {res['videos']} videos in {res['secs']:.0f}s — {status}"
+                      f" (startup: {res['startup']})")
+                results.append(res)
+    return results
+
+
+def throughput(results, wall_secs):
+    """Videos and videos/hour per platform over the whole run's wall-clock time."""
+    per = defaultdict(lambda: {"videos": 0, "session_secs": 0.0, "jobs": 0, "errors": 0})
+    for r in results:
+        agg = per[r["platform"]]
+        agg["videos"] += r["videos"]
+        agg["session_secs"] += r["secs"]
+        agg["jobs"] += 1
+        agg["errors"] += 1 if r["error"] else 0
+    hours = max(wall_secs, 1e-9) / 3600
+    for agg in per.values():
+        agg["videos_per_hour"] = agg["videos"] / hours
+    return dict(per)
+
+
+def add_session_args(ap):
+    """Per-session flags shared by the orchestrator and the work queue (workqueue.py)."""
+    ap.add_argument("--dwell-min", type=int, default=20)
+    ap.add_argument("--dwell-max", type=int, default=90)
+    ap.add_argument("--delay-min", type=float, default=1.5, help="TikTok delay between videos.")
+    ap.add_argument("--delay-max", type=float, default=3.0)
+    ap.add_argument("--headless", action="store_true")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--youtube-url", default="https://www.youtube.com")
+    ap.add_argument("--tiktok-url", default="https://www.tiktok.com")
+    ap.add_argument("--clock", choices=["real", "virtual"], default="real",
+                    help="virtual: skip dwell/sleeps but log timestamps as if they happened.")
+    ap.add_argument("--speedup", type=float, default=0)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--lite", action="store_true", help="Audit-lite browsing (see lite.py).")
+    ap.add_argument("--resume", action="store_true", help="Continue today's interrupted sessions from the ledger.")
+    ap.add_argument("--trace", action="store_true", help="Per-phase timing spans next to each session's logs.")
+    ap.add_argument("--metrics-dir", default=None,
+                    help="Prometheus textfile dir (one .prom per platform/persona, e.g. for node_exporter).")
+    ap.add_argument("--archive", nargs="?", const="data/archive", default=None, metavar="DIR",
+                    help="Shared raw-data archive for offline re-extraction (see archive.py).")
+    ap.add_argument("--mem-interval", type=float, default=30.0,
+                    help="Sample JS heap/DOM/RSS into each session's memory log every N seconds (0 = off).")
+    ap.add_argument("--mem-heap-mb", type=float, default=None, help="Recycle a session's page past this JS heap.")
+    ap.add_argument("--mem-rss-mb", type=float, default=None, help="…or past this browser RSS (per job).")
+    ap.add_argument("--mem-recycle", choices=["page", "context"], default="page",
+                    help="Recycle the tab or the whole browser context (see watchdog.py).")
+
+
+def session_opts(args):
+    """The opts dict run_job() reads, from add_session_args() flags."""
+    return {
+        "dwell_min": args.dwell_min, "dwell_max": args.dwell_max,
+        "delay_min": args.delay_min, "delay_max": max(args.delay_min, args.delay_max),
+        "headless": args.headless, "dry_run": args.dry_run,
+        "youtube_url": args.youtube_url.rstrip("/"), "tiktok_url": args.tiktok_url.rstrip("/"),
+        "clock": args.clock, "speedup": args.speedup, "seed": args.seed,
+        "lite": args.lite, "resume": args.resume,
+        "trace": args.trace, "metrics_dir": args.metrics_dir, "archive_dir": args.archive,
+        "mem_heap_mb": args.mem_heap_mb, "mem_rss_mb": args.mem_rss_mb,
+        "mem_interval": args.mem_interval, "mem_recycle": args.mem_recycle,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run all personas/platforms in parallel.")
+    ap.add_argument("--config", default="personas/personas.yaml")
+    ap.add_argument("--max-browsers", type=int, default=2)
+    ap.add_argument("--days", type=int, default=1)
+    ap.add_argument("--persona", action="append", help="Limit to these personas (repeatable).")
+    ap.add_argument("--platform", action="append", choices=PLATFORMS, help="Limit to these platforms.")
+    add_session_args(ap)
+    args = ap.parse_args()
+
+    jobs = build_jobs(load_personas(args.config), args.days,
+                      platforms=args.platform or PLATFORMS, names=args.persona)
+    if not jobs:
+        raise SystemExit("No persona/platform jobs selected.")
+
+    opts = session_opts(args)
+    print(f"Running {len(jobs)} jobs on up to {args.max_browsers} browsers…")
+    t0 = time.time()
+    results = run_all(jobs, opts, max(1, args.max_browsers))
+    wall = time.time() - t0
+
+    print(f"\nWall-clock: {wall/60:.1f} min")
+    for platform, agg in sorted(throughput(results, wall).items()):
+        print(f"  {platform:8s} {agg['videos']:6d} videos  {agg['videos_per_hour']:8.1f} videos/hour"
+              f"  ({agg['jobs']} jobs, {agg['errors']} errors)")
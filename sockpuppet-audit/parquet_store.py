@@ -0,0 +1,243 @@
+"""
+Columnar (Parquet) log backend.
+
+Same tables as the CSV logs, typed and hive-partitioned per table:
+
+    data/parquet/<table>/platform=<p>/persona=<name>/day=<YYYY-MM-DD>/*.parquet
+
+ParquetWriter is a drop-in for LogWriter (open/write/flush/close): rows are
+buffered and each flush writes one new part file per partition. `compact`
+converts existing CSV trees (one csv-<name>.parquet per CSV file) and merges the
+part files of each partition into one.
+
+    python parquet_store.py compact --logs data/logs --out data/parquet
+"""
+import argparse
+import csv
+import datetime as dt
+import glob
+import os
+import re
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+from common import ensure_dir
+
+TS = pa.timestamp("us")
+SCHEMAS = {
+    "watched": pa.schema([("ts", TS), ("persona", pa.string()), ("seed_query", pa.string()),
+                          ("video_id", pa.string()), ("title", pa.string()),
+                          ("dwell_secs", pa.int32()), ("duration_secs", pa.int32()), ("is_repeat", pa.bool_())]),
+    "recs": pa.schema([("ts", TS), ("persona", pa.string()), ("seed_query", pa.string()),
+                       ("watching", pa.string()), ("rec_vid", pa.string()), ("rank", pa.int16()),
+                       ("rec_title", pa.string()), ("rec_channel", pa.string()), ("is_repeat", pa.bool_())]),
+    "feed": pa.schema([("ts_iso", TS), ("index", pa.int32()), ("video_id", pa.string()),
+                       ("post_url", pa.string()), ("video_src", pa.string()),
+                       ("duration_sec", pa.float64()), ("author_handle", pa.string()),
+                       ("caption", pa.string()), ("like_count", pa.int64()),
+                       ("comment_count", pa.int64()), ("share_count", pa.int64()),
+                       ("music_title", pa.string()), ("is_paused", pa.bool_()), ("is_repeat", pa.bool_())]),
+    "feed_recs": pa.schema([("ts_iso", TS), ("batch", pa.int32()), ("rank", pa.int16()),
+                            ("video_id", pa.string()), ("author_handle", pa.string()),
+                            ("caption", pa.string()), ("is_repeat", pa.bool_())]),
+    "feed_preloaded": pa.schema([("ts_iso", TS), ("video_id", pa.string()), ("post_url", pa.string()),
+                                 ("duration_sec", pa.float64()), ("author_handle", pa.string()),
+                                 ("caption", pa.string()), ("like_count", pa.int64()),
+                                 ("comment_count", pa.int64()), ("share_count", pa.int64()),
+                                 ("music_title", pa.string()), ("is_repeat", pa.bool_())]),
+}
+
+
+def schema_for(table, header):
+    """
+    (table, schema): known schema by table name, else the table whose columns
+    match header (e.g. a TikTok --out_csv with any file name; logs from before
+    is_repeat existed lack that last column), else all strings.
+    """
+    if table in SCHEMAS:
+        return table, SCHEMAS[table]
+    for name, schema in SCHEMAS.items():
+        if list(header) in (schema.names, schema.names[:-1]):
+            return name, schema
+    return table, pa.schema([(h, pa.string()) for h in header])
+
+
+def partition_of(path, platform=None, persona=None):
+    """
+    data/logs/<platform>/<persona>/<day>/<table>.csv -> (table, platform, persona, day).
+    A file LogWriter rotated aside (<table>.<n>.csv) belongs to the same table.
+    Paths outside that layout fall back to the given platform/persona and today.
+    """
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    table = re.sub(r"\.\d+$", "", os.path.splitext(parts[-1])[0])
+    if len(parts) >= 4:
+        try:
+            dt.date.fromisoformat(parts[-2])
+            return table, parts[-4], parts[-3], parts[-2]
+        except ValueError:
+            pass
+    return table, platform or "unknown", persona or "default", dt.date.today().isoformat()
+
+
+def typed(strings, schema):
+    """Cast a table of string columns to schema; "" becomes null."""
+    cols = []
+    for field in schema:
+        if field.name not in strings.column_names:
+            cols.append(pa.nulls(strings.num_rows, field.type))
+            continue
+        col = strings[field.name]
+        if pa.types.is_string(field.type):
+            cols.append(col)
+            continue
+        col = pc.if_else(pc.equal(col, ""), pa.scalar(None, pa.string()), col)
+        if pa.types.is_boolean(field.type):
+            col = pc.utf8_lower(col)
+        if pa.types.is_integer(field.type):
+            col = pc.cast(pc.cast(col, pa.float64()), field.type, safe=False)
+        else:
+            col = pc.cast(col, field.type)
+        cols.append(col)
+    return pa.table(cols, schema=schema)
+
+
+def _write_atomic(table, path):
+    ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def partition_dir(root, table, platform, persona, day):
+    return os.path.join(root, table, f"platform={platform}", f"persona={persona}", f"day={day}")
+
+
+class ParquetWriter:
+    """Buffered sink with the LogWriter interface; one part file per flush and partition."""
+
+    def __init__(self, root="data/parquet", flush_rows=1000, flush_secs=300.0, platform=None, persona=None):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.platform = platform
+        self.persona = persona
+        self.headers = {}
+        self.pending = {}
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        self.after_flush = []
+
+    def open(self, path, header, truncate=False):
+        self.headers.setdefault(path, list(header))
+
+    def write(self, path, header, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        self.open(path, header)
+        self.pending.setdefault(path, []).extend(rows)
+        self.n_pending += len(rows)
+        if self.n_pending >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_secs:
+            self.flush()
+
+    def flush(self):
+        for path, rows in self.pending.items():
+            header = self.headers[path]
+            table, platform, persona, day = partition_of(path, self.platform, self.persona)
+            table, schema = schema_for(table, header)
+            strings = pa.table({h: [("" if r.get(h) is None else str(r.get(h))) for r in rows] for h in header})
+            out = partition_dir(self.root, table, platform, persona, day)
+            _write_atomic(typed(strings, schema), os.path.join(out, f"part-{uuid.uuid4().hex}.parquet"))
+        self.pending = {}
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        for fn in self.after_flush:
+            fn()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------- reading --------------------------
+def load(table, root="data/parquet", columns=None, filter=None):
+    """
+    Read one table as a pyarrow Table. Partition keys (platform, persona, day)
+    are columns, so filters on them prune whole directories, e.g.
+    load("recs", filter=(pc.field("persona") == "fitness_01") & (pc.field("day") >= "2024-05-01")).
+    """
+    ds = pads.dataset(os.path.join(root, table), format="parquet", partitioning="hive")
+    return ds.to_table(columns=columns, filter=filter)
+
+
+# -------------------------- compaction --------------------------
+def convert_csv(csv_path, root):
+    """
+    CSV log -> <partition>/csv-<file name>.parquet, one output per CSV (a
+    partition can hold a live and rotated files); skipped when up to date.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if not header:
+        return 0
+    table, platform, persona, day = partition_of(csv_path)
+    table, schema = schema_for(table, header)
+    part_dir = partition_dir(root, table, platform, persona, day)
+    out = os.path.join(part_dir, f"csv-{os.path.splitext(os.path.basename(csv_path))[0]}.parquet")
+    if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(csv_path):
+        return 0
+    strings = pacsv.read_csv(csv_path,
+                             parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                             convert_options=pacsv.ConvertOptions(column_types={h: pa.string() for h in header}))
+    _write_atomic(typed(strings, schema), out)
+    if os.path.exists(os.path.join(part_dir, "csv.parquet")):
+        os.remove(os.path.join(part_dir, "csv.parquet"))  # one output for the whole partition, before csv-<name>
+    return strings.num_rows
+
+
+def merge_parts(part_dir):
+    """Merge part-*.parquet in one partition into a single file."""
+    parts = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+    if len(parts) < 2:
+        return 0
+    merged = pa.concat_tables([pq.read_table(p, partitioning=None) for p in parts])
+    _write_atomic(merged, os.path.join(part_dir, f"part-{uuid.uuid4().hex}.parquet"))
+    for p in parts:
+        os.remove(p)
+    return len(parts)
+
+
+def compact(logs_root, root):
+    started = time.time()
+    rows = files = merged = 0
+    for csv_path in glob.glob(os.path.join(logs_root, "*", "*", "*", "*.csv")):
+        n = convert_csv(csv_path, root)
+        rows += n
+        files += 1 if n else 0
+    for part_dir in glob.glob(os.path.join(root, "*", "platform=*", "persona=*", "day=*")):
+        merged += merge_parts(part_dir)
+    return {"csv_files": files, "csv_rows": rows, "merged_parts": merged, "secs": time.time() - started}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Parquet log store utilities.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compact", help="Convert CSV log trees and merge small part files.")
+    c.add_argument("--logs", default="data/logs")
+    c.add_argument("--out", default="data/parquet")
+    args = ap.parse_args()
+
+    stats = compact(args.logs, args.out)
+    print(f"Converted {stats['csv_files']} CSV files ({stats['csv_rows']} rows), "
+          f"merged {stats['merged_parts']} part files in {stats['secs']:.1f}s")
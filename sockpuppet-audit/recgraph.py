@@ -0,0 +1,423 @@
+"""
+Recommendation graph (watching -> rec_vid) over recs.csv logs, as CSR arrays.
+
+Video ids are interned to int32 node ids and edges are stored sorted by
+(src, dst, persona) with a repeat count, so months of recs across all personas
+fit in a few bytes per edge and every file is opened with np.memmap:
+
+    data/graph/<platform>/CURRENT          name of the live generation
+    data/graph/<platform>/g<N>/
+        indptr.i8   [n_nodes + 1]  edges of node u are indptr[u]:indptr[u+1]
+        indices.i4  [n_edges]      dst node
+        persona.u2  [n_edges]      persona code (meta.json "personas")
+        count.u4    [n_edges]      times this persona was shown src -> dst
+        indeg.u8    [n_nodes]      in-degree weighted by count, all personas
+        hashes.u8 / order.i4       sorted id hashes and the node id of each
+        names.bin / names_off.u8   the id strings
+        meta.json, offsets.json, seeds.json
+
+build() reads only rows appended since the last build (byte offsets per
+file, as analytics.py does), merges them into the previous generation and
+writes a new one; switching CURRENT is the commit, so an interrupted build
+leaves the old graph intact. Only the new edges and the rows (source nodes)
+they touch are sorted; every other row is copied over as it is, so a build
+costs O(E) copying plus O(k log k) for the k edges it sorts. Readers keep working on the generation they
+opened. Queries:
+
+    g = RecGraph.open("youtube")
+    nodes, hops = g.khop(g.lookup(["dQw4w9WgXcQ"]), k=3, persona="fitness_01")
+    g.top_in_degree(20)
+    sub = g.subgraph("fitness_01")
+
+    python recgraph.py build
+    python recgraph.py hops --persona fitness_01 --k 3   # from the persona's session seeds
+    python recgraph.py top --n 20 [--persona P]
+    python recgraph.py subgraph --persona P --out edges.csv
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import Offsets
+from common import ensure_dir, write_rows
+
+GRAPH_ROOT = "data/graph"
+
+FILES = {"indptr": "<i8", "indices": "<i4", "persona": "<u2", "count": "<u4", "indeg": "<u8",
+         "hashes": "<u8", "order": "<i4", "names_off": "<u8"}
+
+
+def id_hashes(ids):
+    """64-bit hash per id string (vectorized)."""
+    return pd.util.hash_array(np.asarray(ids, dtype=object)).astype("<u8")
+
+
+def _read(path, dtype):
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _ranges(starts, ends):
+    """Concatenation of arange(s, e) for each pair (vectorized)."""
+    lens = ends - starts
+    total = int(lens.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+    return shift + np.arange(total)
+
+
+class RecGraph:
+    def __init__(self, arrays, names, personas, path=None):
+        self.path = path
+        self.personas = list(personas)
+        self.codes = {p: i for i, p in enumerate(self.personas)}
+        self.names_bin = names
+        for k in FILES:
+            setattr(self, k, arrays.get(k, np.empty(0, dtype=FILES[k])))
+        if not len(self.indptr):
+            self.indptr = np.zeros(1, dtype="<i8")
+
+    @classmethod
+    def open(cls, platform="youtube", root=GRAPH_ROOT):
+        gen = current_generation(os.path.join(root, platform))
+        if not gen:
+            return cls({}, b"", [])
+        with open(os.path.join(gen, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {k: _read(os.path.join(gen, f"{k}.{dt[1:]}"), dt) for k, dt in FILES.items()}
+        return cls(arrays, _read(os.path.join(gen, "names.bin"), "u1"), meta["personas"], gen)
+
+    @property
+    def n_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    # -------------------------- ids --------------------------
+    def lookup(self, ids):
+        """Node id per video id string, -1 if unknown."""
+        if not len(ids):
+            return np.empty(0, dtype=np.int64)
+        h = id_hashes(ids)
+        if not len(self.order):
+            return np.full(len(h), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.hashes, h), len(self.hashes) - 1)
+        return np.where(self.hashes[pos] == h, self.order[pos], -1).astype(np.int64)
+
+    def names(self, nodes):
+        off = self.names_off
+        return [bytes(self.names_bin[off[n]:off[n + 1]]).decode("utf-8") for n in np.asarray(nodes).tolist()]
+
+    def _persona_code(self, persona):
+        if persona is None:
+            return None
+        if persona not in self.codes:
+            raise KeyError(f"Unknown persona {persona!r} (have: {', '.join(self.personas)})")
+        return self.codes[persona]
+
+    # -------------------------- queries --------------------------
+    def neighbors(self, nodes, persona=None):
+        """Distinct rec targets of `nodes` (optionally only as shown to one persona)."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        edges = _ranges(self.indptr[nodes], self.indptr[nodes + 1])
+        code = self._persona_code(persona)
+        if code is not None:
+            edges = edges[self.persona[edges] == code]
+        return np.unique(self.indices[edges])
+
+    def khop(self, seeds, k=2, persona=None):
+        """
+        Nodes reachable from seeds in at most k rec hops, breadth first.
+        Returns (nodes, hops), seeds included at hop 0.
+        """
+        seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+        seeds = seeds[(seeds >= 0) & (seeds < self.n_nodes)]
+        visited = np.zeros(self.n_nodes, dtype=bool)
+        visited[seeds] = True
+        out_nodes, out_hops = [seeds], [np.zeros(len(seeds), dtype=np.int8)]
+        frontier = seeds
+        for hop in range(1, k + 1):
+            if not len(frontier):
+                break
+            nxt = self.neighbors(frontier, persona)
+            frontier = nxt[~visited[nxt]]
+            visited[frontier] = True
+            out_nodes.append(frontier)
+            out_hops.append(np.full(len(frontier), hop, dtype=np.int8))
+        return np.concatenate(out_nodes), np.concatenate(out_hops)
+
+    def in_degree(self, persona=None, weighted=True):
+        """Times each node was recommended (weighted) or by how many (src, persona) edges."""
+        code = self._persona_code(persona)
+        if code is None and weighted and len(self.indeg):
+            return self.indeg
+        mask = slice(None) if code is None else self.persona == code
+        weights = np.asarray(self.count[mask], dtype=np.float64) if weighted else None
+        return np.bincount(self.indices[mask], weights=weights, minlength=self.n_nodes).astype(np.int64)
+
+    def top_in_degree(self, n=20, persona=None, weighted=True):
+        """[(video_id, in_degree)] for the n most recommended videos."""
+        deg = np.asarray(self.in_degree(persona, weighted), dtype=np.int64)
+        n = min(n, len(deg))
+        if not n:
+            return []
+        top = np.argpartition(-deg, n - 1)[:n]
+        top = top[np.argsort(-deg[top], kind="stable")]
+        return list(zip(self.names(top), deg[top].tolist()))
+
+    def subgraph(self, persona):
+        """The edges shown to one persona as a RecGraph on the same node ids (in memory)."""
+        code = self._persona_code(persona)
+        keep = np.flatnonzero(self.persona == code)
+        src = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))[keep]
+        arrays = {k: getattr(self, k) for k in ("hashes", "order", "names_off")}
+        arrays.update(indices=np.asarray(self.indices[keep]), persona=np.zeros(len(keep), dtype="<u2"),
+                      count=np.asarray(self.count[keep]),
+                      indptr=np.concatenate(([0], np.cumsum(np.bincount(src, minlength=self.n_nodes)))))
+        return RecGraph(arrays, self.names_bin, [persona])
+
+    def edges(self):
+        """(src, dst, persona code, count) arrays, sorted by src."""
+        src = np.repeat(np.arange(self.n_nodes, dtype=np.int64), np.diff(self.indptr))
+        return src, np.asarray(self.indices), np.asarray(self.persona), np.asarray(self.count)
+
+
+# -------------------------- build --------------------------
+def current_generation(platform_root):
+    try:
+        with open(os.path.join(platform_root, "CURRENT"), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(platform_root, name) if name else None
+
+
+def merge_edges(n_nodes, src, dst, persona, count):
+    """Sort edges by (src, dst, persona), sum the counts of duplicates and build the CSR arrays."""
+    order = np.lexsort((persona, dst, src))
+    src, dst, persona, count = src[order], dst[order], persona[order], count[order]
+    if len(src):
+        new = np.concatenate(([True], (src[1:] != src[:-1]) | (dst[1:] != dst[:-1]) | (persona[1:] != persona[:-1])))
+        starts = np.flatnonzero(new)
+        count = np.add.reduceat(count.astype(np.uint64), starts)
+        src, dst, persona = src[starts], dst[starts], persona[starts]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n_nodes))))
+    return {"indptr": indptr.astype("<i8"), "indices": dst.astype("<i4"), "persona": persona.astype("<u2"),
+            "count": np.minimum(count, np.iinfo(np.uint32).max).astype("<u4"),
+            "indeg": np.bincount(dst, weights=count.astype(np.float64), minlength=n_nodes).astype("<u8")}
+
+
+def fold_edges(graph, n_nodes, src, dst, persona, count):
+    """
+    The graph's CSR arrays with new edges merged in. The old edges are already
+    sorted and deduplicated: only the rows the new edges touch are re-merged
+    (merge_edges over those rows), the rest are copied to their shifted offsets.
+    """
+    new = merge_edges(n_nodes, src, dst, persona, count)
+    if not graph.n_edges:
+        return new
+    old_ptr = np.concatenate([np.asarray(graph.indptr, dtype=np.int64),
+                              np.full(n_nodes - graph.n_nodes, graph.n_edges, dtype=np.int64)])
+    old_deg, new_deg = np.diff(old_ptr), np.diff(new["indptr"])
+    touched = np.flatnonzero(new_deg)
+    old_sel = _ranges(old_ptr[touched], old_ptr[touched + 1])
+    merged = merge_edges(n_nodes,
+                         np.concatenate([np.repeat(touched, old_deg[touched]), np.repeat(touched, new_deg[touched])]),
+                         np.concatenate([np.asarray(graph.indices)[old_sel], new["indices"]]).astype(np.int64),
+                         np.concatenate([np.asarray(graph.persona)[old_sel], new["persona"]]),
+                         np.concatenate([np.asarray(graph.count)[old_sel], new["count"]]).astype(np.uint64))
+    deg = old_deg.copy()
+    deg[touched] = np.diff(merged["indptr"])[touched]
+    indptr = np.concatenate(([0], np.cumsum(deg)))
+    out = {"indptr": indptr.astype("<i8"), "indices": np.empty(indptr[-1], dtype="<i4"),
+           "persona": np.empty(indptr[-1], dtype="<u2"), "count": np.empty(indptr[-1], dtype="<u4")}
+    kept = np.flatnonzero((old_deg > 0) & (new_deg == 0))
+    src_pos = _ranges(old_ptr[kept], old_ptr[kept + 1])
+    dst_pos = _ranges(indptr[kept], indptr[kept] + old_deg[kept])
+    into = _ranges(indptr[touched], indptr[touched + 1])
+    for k in ("indices", "persona", "count"):
+        out[k][dst_pos] = np.asarray(getattr(graph, k))[src_pos]
+        out[k][into] = merged[k]
+    indeg = np.zeros(n_nodes, dtype=np.uint64)
+    indeg[:len(graph.indeg)] = graph.indeg
+    out["indeg"] = (indeg + new["indeg"]).astype("<u8")
+    return out
+
+
+def _intern(graph, ids):
+    """
+    Node id per id string, appending unknown ids after the existing nodes.
+    Returns (node ids, new names in node order, their hashes).
+    """
+    codes, uniq = pd.factorize(np.asarray(ids, dtype=object))
+    nodes = graph.lookup(uniq)
+    unknown = np.flatnonzero(nodes < 0)
+    nodes[unknown] = graph.n_nodes + np.arange(len(unknown))
+    new_names = [str(uniq[i]) for i in unknown]
+    return nodes[codes], new_names, id_hashes(new_names)
+
+
+def _new_rows(offsets, logs_root, platform):
+    frames = []
+    for path in sorted(glob.glob(os.path.join(logs_root, platform, "*", "*", "recs.csv"))):
+        df = offsets.read_new(path)
+        if df is None or df.empty:
+            continue
+        df = df[(df["watching"] != "") & (df["rec_vid"] != "")][["watching", "rec_vid"]]
+        df["persona"] = path.split(os.sep)[-3]
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["watching", "rec_vid", "persona"])
+
+
+def _session_seeds(logs_root, platform, seeds):
+    """First watched video per persona/day (the session's seed), for days not recorded yet."""
+    for path in glob.glob(os.path.join(logs_root, platform, "*", "*", "watched.csv")):
+        persona, day = path.split(os.sep)[-3:-1]
+        if day in seeds.get(persona, {}):
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            first = next(csv.DictReader(f), None)
+        if first and first.get("video_id"):
+            seeds.setdefault(persona, {})[day] = first["video_id"]
+    return seeds
+
+
+def build(logs_root="data/logs", platform="youtube", root=GRAPH_ROOT):
+    """Fold rows appended since the last build into a new generation; returns stats."""
+    t0 = time.perf_counter()
+    platform_root = os.path.join(root, platform)
+    ensure_dir(platform_root)
+    prev = current_generation(platform_root)
+    graph = RecGraph.open(platform, root)
+    offsets = Offsets(os.path.join(prev, "offsets.json") if prev else os.path.join(platform_root, ".offsets"))
+    seeds = {}
+    if prev and os.path.exists(os.path.join(prev, "seeds.json")):
+        with open(os.path.join(prev, "seeds.json"), encoding="utf-8") as f:
+            seeds = json.load(f)
+    known_seeds = json.dumps(seeds, sort_keys=True)
+    seeds = _session_seeds(logs_root, platform, seeds)
+
+    rows = _new_rows(offsets, logs_root, platform)
+    if prev and not len(rows) and json.dumps(seeds, sort_keys=True) == known_seeds:
+        return {"platform": platform, "generation": int(os.path.basename(prev)[1:]), "nodes": graph.n_nodes,
+                "edges": graph.n_edges, "new_rows": 0, "new_nodes": 0, "personas": graph.personas,
+                "secs": round(time.perf_counter() - t0, 3)}
+    personas = graph.personas + sorted(set(rows["persona"]) - set(graph.personas))
+    codes = {p: i for i, p in enumerate(personas)}
+    nodes, new_names, new_hashes = _intern(graph, np.concatenate([rows["watching"].to_numpy(),
+                                                                  rows["rec_vid"].to_numpy()]))
+    n_nodes = graph.n_nodes + len(new_names)
+    arrays = fold_edges(graph, n_nodes, nodes[:len(rows)], nodes[len(rows):],
+                        rows["persona"].map(codes).to_numpy(dtype="<u2"), np.ones(len(rows), dtype="<u4"))
+    node_hashes = np.empty(n_nodes, dtype="<u8")
+    node_hashes[np.asarray(graph.order)] = graph.hashes
+    node_hashes[graph.n_nodes:] = new_hashes
+    arrays["order"] = np.argsort(node_hashes, kind="stable").astype("<i4")
+    arrays["hashes"] = node_hashes[arrays["order"]]
+    encoded = [n.encode("utf-8") for n in new_names]
+    lens = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    base_off = np.asarray(graph.names_off) if len(graph.names_off) else np.zeros(1, dtype="<u8")
+    arrays["names_off"] = np.concatenate([base_off, int(base_off[-1]) + np.cumsum(lens)]).astype("<u8")
+
+    gen_no = int(os.path.basename(prev)[1:]) + 1 if prev else 1
+    gen = os.path.join(platform_root, f"g{gen_no:06d}")
+    shutil.rmtree(gen, ignore_errors=True)  # left by an interrupted build
+    ensure_dir(gen)
+    for k, dt in FILES.items():
+        arrays[k].astype(dt).tofile(os.path.join(gen, f"{k}.{dt[1:]}"))
+    with open(os.path.join(gen, "names.bin"), "wb") as f:
+        if len(graph.names_bin):
+            f.write(bytes(graph.names_bin))
+        f.write(b"".join(encoded))
+    with open(os.path.join(gen, "seeds.json"), "w", encoding="utf-8") as f:
+        json.dump(seeds, f)
+    stats = {"platform": platform, "generation": gen_no, "nodes": n_nodes, "edges": len(arrays["indices"]),
+             "new_rows": len(rows), "new_nodes": len(new_names), "personas": personas}
+    with open(os.path.join(gen, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({**stats, "built": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    offsets.path = os.path.join(gen, "offsets.json")
+    offsets.save()
+
+    # switching CURRENT is the commit
+    tmp = os.path.join(platform_root, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(gen))
+    os.replace(tmp, os.path.join(platform_root, "CURRENT"))
+    del graph
+    if prev:
+        shutil.rmtree(prev, ignore_errors=True)  # open memmaps of it stay valid until closed
+    stats["secs"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def session_seeds(platform="youtube", persona=None, root=GRAPH_ROOT):
+    """Seed video ids recorded at build time (first watched video per session)."""
+    gen = current_generation(os.path.join(root, platform))
+    if not gen or not os.path.exists(os.path.join(gen, "seeds.json")):
+        return []
+    with open(os.path.join(gen, "seeds.json"), encoding="utf-8") as f:
+        seeds = json.load(f)
+    return sorted({v for p, days in seeds.items() if persona in (None, p) for v in days.values()})
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Recommendation graph: incremental build and queries.")
+    ap.add_argument("--graph", default=GRAPH_ROOT)
+    ap.add_argument("--platform", default="youtube")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Fold new recs.csv rows into the graph.")
+    b.add_argument("--logs", default="data/logs")
+    h = sub.add_parser("hops", help="Videos reachable within k rec hops of the seeds.")
+    h.add_argument("--seed", action="append", default=[], help="Video id (repeatable; default: session seeds).")
+    h.add_argument("--k", type=int, default=2)
+    h.add_argument("--persona")
+    t = sub.add_parser("top", help="Most recommended videos (in-degree).")
+    t.add_argument("--n", type=int, default=20)
+    t.add_argument("--persona")
+    t.add_argument("--distinct", action="store_true", help="Count distinct (source, persona) edges, not shows.")
+    s = sub.add_parser("subgraph", help="One persona's edges as a CSV edge list.")
+    s.add_argument("--persona", required=True)
+    s.add_argument("--out", required=True)
+    sub.add_parser("info")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        print(build(args.logs, args.platform, args.graph))
+        raise SystemExit(0)
+
+    g = RecGraph.open(args.platform, args.graph)
+    t0 = time.perf_counter()
+    if args.cmd == "info":
+        print(f"{g.path}: {g.n_nodes} nodes, {g.n_edges} edges, personas: {', '.join(g.personas)}")
+    elif args.cmd == "hops":
+        seeds = args.seed or session_seeds(args.platform, args.persona, args.graph)
+        nodes, hops = g.khop(g.lookup(seeds), args.k, args.persona)
+        ms = (time.perf_counter() - t0) * 1000
+        for hop in range(args.k + 1):
+            print(f"hop {hop}: {int((hops == hop).sum())}")
+        print(f"{len(nodes)} videos within {args.k} hops of {len(seeds)} seeds ({ms:.1f} ms)")
+    elif args.cmd == "top":
+        for vid, deg in g.top_in_degree(args.n, args.persona, weighted=not args.distinct):
+            print(f"{vid}\t{deg}")
+        print(f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    else:
+        sg = g.subgraph(args.persona)
+        src, dst, _, cnt = sg.edges()
+        if os.path.exists(args.out):
+            os.remove(args.out)
+        ensure_dir(os.path.dirname(os.path.abspath(args.out)))
+        write_rows(args.out, ["watching", "rec_vid", "count"],
+                   [{"watching": a, "rec_vid": b, "count": c}
+                    for a, b, c in zip(g.names(src), g.names(dst), cnt.tolist())])
+        print(f"{sg.n_edges} edges -> {args.out} ({(time.perf_counter() - t0) * 1000:.1f} ms)")
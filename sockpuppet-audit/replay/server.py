@@ -0,0 +1,277 @@
+"""
+Offline replay server standing in for youtube.com and tiktok.com.
+
+Serves watch/search/home pages with the same selectors the scrapers use,
+a TikTok For You feed with #SIGI_STATE and infinite scroll, and the JSON
+APIs the capture mode listens to, all built from the fixture files in
+replay/fixtures/. A recorded page saved as replay/fixtures/pages/<path>.html
+(e.g. pages/watch_v=abc.html, pages/foryou.html) is served verbatim instead
+of the generated one.
+
+    python -m replay.server --port 8000
+    python -m youtube.simple_watch_YT --persona neutral_01 --base-url http://127.0.0.1:8000 --clock virtual
+    python -m tiktok.simple_watch_TT_v4 --start_url http://127.0.0.1:8000/foryou --user_data_dir ./profiles/replay
+
+Routes: / (YouTube home), /results, /watch, /youtubei/v1/next, /youtubei/v1/player,
+        /foryou, /login, /api/recommend/item_list/, /@<user>/video/<id>
+"""
+import argparse
+import html
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FEED_PAGE = 8  # TikTok items per feed request
+
+
+def load_fixtures(root=FIXTURES):
+    with open(os.path.join(root, "youtube.json"), "r", encoding="utf-8") as f:
+        yt = json.load(f)
+    with open(os.path.join(root, "tiktok.json"), "r", encoding="utf-8") as f:
+        tt = json.load(f)
+    return {v["id"]: v for v in yt["videos"]}, tt["items"]
+
+
+def fmt_duration(secs):
+    h, rem = divmod(int(secs), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+# -------------------------- YouTube --------------------------
+def yt_card(tag, v):
+    return (f'<{tag}><a id="thumbnail" href="/watch?v={v["id"]}">thumb</a>'
+            f'<span id="video-title" title="{html.escape(v["title"])}">{html.escape(v["title"])}</span>'
+            f'<ytd-channel-name><span id="text">{html.escape(v["channel"])}</span></ytd-channel-name></{tag}>')
+
+
+def yt_page(title, body, script=""):
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>"
+            f"<body>{body}<script>{script}</script></body></html>")
+
+
+def yt_next_json(videos, vid):
+    v = videos[vid]
+    recs = [{"compactVideoRenderer": {
+        "videoId": r, "title": {"simpleText": videos[r]["title"]},
+        "longBylineText": {"runs": [{"text": videos[r]["channel"]}]},
+        "lengthText": {"simpleText": fmt_duration(videos[r]["duration"])}}} for r in v["recs"]]
+    return {"currentVideoEndpoint": {"watchEndpoint": {"videoId": vid}},
+            "contents": {"twoColumnWatchNextResults": {"secondaryResults": {"secondaryResults": {"results": recs}}}}}
+
+
+def yt_player_json(videos, vid):
+    v = videos[vid]
+    return {"videoDetails": {"videoId": vid, "title": v["title"], "author": v["channel"],
+                             "lengthSeconds": str(v["duration"]), "viewCount": str(v.get("views", 0))}}
+
+
+WATCH_JS = """
+const vid = new URLSearchParams(location.search).get('v');
+for (const ep of ['next', 'player'])
+  fetch('/youtubei/v1/' + ep, {method: 'POST', headers: {'content-type': 'application/json'},
+                               body: JSON.stringify({videoId: vid})});
+document.addEventListener('keydown', e => { if (e.key === 'k') document.body.dataset.playing = '1'; });
+"""
+
+
+def yt_route(videos, path, qs):
+    ids = list(videos)
+    if path == "/":
+        return yt_page("YouTube", "".join(yt_card("ytd-rich-item-renderer", videos[i]) for i in ids[:12]))
+    if path == "/results":
+        q = (qs.get("search_query") or [""])[0].lower()
+        words = set(re.findall(r"\w+", q))
+        hits = [i for i in ids if words & set(re.findall(r"\w+", videos[i]["title"].lower()))] or ids
+        return yt_page(f"{q} - YouTube", "".join(yt_card("ytd-video-renderer", videos[i]) for i in hits[:10]))
+    if path == "/watch":
+        vid = (qs.get("v") or [""])[0]
+        if vid not in videos:
+            return None
+        v = videos[vid]
+        side = "".join(yt_card("ytd-compact-video-renderer", videos[r]) for r in v["recs"])
+        body = (f'<div class="html5-video-player"><span class="ytp-time-duration">{fmt_duration(v["duration"])}</span></div>'
+                f'<ytd-watch-next-secondary-results-renderer><div id="contents">{side}</div>'
+                f'</ytd-watch-next-secondary-results-renderer>')
+        return yt_page(f'{v["title"]} - YouTube', body, WATCH_JS)
+    return None
+
+
+# -------------------------- TikTok --------------------------
+def tt_api_item(itm):
+    return {"id": itm["id"], "desc": itm["desc"], "author": {"uniqueId": itm["author"]},
+            "stats": {"diggCount": itm["likes"], "commentCount": itm["comments"], "shareCount": itm["shares"]},
+            "music": {"title": itm["music"]}, "video": {"duration": itm["duration"], "playAddr": ""}}
+
+
+def tt_sigi_item(itm):
+    out = tt_api_item(itm)
+    out["author"] = itm["author"]
+    return out
+
+
+def tt_item_html(itm):
+    return (f'<div data-e2e="video-feed-item" data-aweme-id="{itm["id"]}" class="item">'
+            f'<video muted playsinline></video>'
+            f'<a data-e2e="video-author-uniqueid" href="/@{itm["author"]}">{html.escape(itm["author"])}</a>'
+            f'<a href="/@{itm["author"]}/video/{itm["id"]}">post</a>'
+            f'<div data-e2e="video-desc">{html.escape(itm["desc"])}</div>'
+            f'<a data-e2e="browse-music" href="/music/{itm["id"]}">{html.escape(itm["music"])}</a></div>')
+
+
+FEED_JS = """
+const list = document.querySelector('[data-e2e="scroll-list"]');
+let cursor = %d, loading = false;
+async function more() {
+  if (loading) return; loading = true;
+  // the stand-in API ships each item's markup in _html so the feed can grow
+  const r = await fetch('/api/recommend/item_list/?count=%d&cursor=' + cursor);
+  const data = await r.json();
+  cursor += data.itemList.length;
+  const sigiEl = document.getElementById('SIGI_STATE');
+  const sigi = JSON.parse(sigiEl.textContent);
+  for (const it of data.itemList) {
+    list.insertAdjacentHTML('beforeend', it._html);
+    delete it._html;
+    sigi.ItemModule[it.id] = Object.assign({}, it, {author: it.author.uniqueId});
+  }
+  sigiEl.textContent = JSON.stringify(sigi);
+  loading = false;
+}
+list.addEventListener('scroll', () => {
+  if (list.scrollTop + list.clientHeight * 2 >= list.scrollHeight) more();
+});
+"""
+
+FEED_CSS = """
+html,body{margin:0;height:100%}
+[data-e2e="scroll-list"]{height:100vh;overflow-y:scroll}
+.item{height:100vh;position:relative}
+.item video{width:100%;height:80vh;display:block;background:#000}
+"""
+
+
+def tt_feed_page(items):
+    first = items[:FEED_PAGE]
+    sigi = json.dumps({"ItemModule": {i["id"]: tt_sigi_item(i) for i in first}}).replace("</", "<\\/")
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>TikTok</title><style>{FEED_CSS}</style>"
+            f"<script id='SIGI_STATE' type='application/json'>{sigi}</script>"
+            f"</head><body><div data-e2e='scroll-list'>{''.join(tt_item_html(i) for i in first)}</div>"
+            f"<script>{FEED_JS % (len(first), FEED_PAGE)}</script></body></html>")
+
+
+def tt_route(items, path, qs):
+    if path == "/foryou":
+        return tt_feed_page(items)
+    if path == "/login":
+        return "<!doctype html><html><body><form>login</form></body></html>"
+    if path.rstrip("/") in ("/api/recommend/item_list", "/api/item_list", "/api/preload/item_list"):
+        cursor = int((qs.get("cursor") or ["0"])[0])
+        count = int((qs.get("count") or [str(FEED_PAGE)])[0])
+        batch = [items[(cursor + k) % len(items)] for k in range(count)]
+        out = []
+        for itm in batch:
+            api = tt_api_item(itm)
+            api["_html"] = tt_item_html(itm)
+            out.append(api)
+        return {"itemList": out, "cursor": cursor + count, "hasMore": True}
+    m = re.match(r"^/@([^/]+)/video/(\d+)$", path)
+    if m:
+        itm = next((i for i in items if i["id"] == m.group(2)), None)
+        return tt_feed_page([itm] + [i for i in items if i is not itm]) if itm else None
+    return None
+
+
+# -------------------------- server --------------------------
+class Handler(BaseHTTPRequestHandler):
+    videos = {}
+    items = []
+    pages_dir = os.path.join(FIXTURES, "pages")
+    counts = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _recorded(self, url):
+        name = (url.path.strip("/") or "index").replace("/", "_")
+        if url.query:
+            name += "_" + url.query.replace("&", "_")
+        path = os.path.join(self.pages_dir, re.sub(r"[^\w=.@-]", "_", name) + ".html")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def _send(self, status, body, ctype):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, body=None):
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        with self.lock:
+            self.counts[url.path] = self.counts.get(url.path, 0) + 1
+        if url.path in ("/youtubei/v1/next", "/youtubei/v1/player"):
+            vid = (body or {}).get("videoId", "")
+            if vid not in self.videos:
+                return self._send(404, "{}", "application/json")
+            fn = yt_next_json if url.path.endswith("next") else yt_player_json
+            return self._send(200, json.dumps(fn(self.videos, vid)), "application/json")
+        recorded = self._recorded(url)
+        if recorded is not None:
+            return self._send(200, recorded, "text/html; charset=utf-8")
+        out = yt_route(self.videos, url.path, qs)
+        if out is None:
+            out = tt_route(self.items, url.path, qs)
+        if out is None:
+            return self._send(404, "not found", "text/plain")
+        if isinstance(out, dict):
+            return self._send(200, json.dumps(out), "application/json")
+        return self._send(200, out, "text/html; charset=utf-8")
+
+    def do_GET(self):
+        self._route()
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            body = {}
+        self._route(body)
+
+
+def serve(port=0, fixtures=FIXTURES, host="127.0.0.1"):
+    """Start the replay server on a background thread; returns (server, base_url)."""
+    videos, items = load_fixtures(fixtures)
+    handler = type("ReplayHandler", (Handler,), {"videos": videos, "items": items, "counts": {},
+                                                 "pages_dir": os.path.join(fixtures, "pages")})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Offline replay server for YouTube/TikTok fixtures.")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--fixtures", default=FIXTURES)
+    args = ap.parse_args()
+
+    server, base = serve(args.port, args.fixtures, args.host)
+    print(f"Replay server on {base} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,121 @@
+"""
+Persistent per-persona seen-index: has this persona seen video X before?
+
+Each index is a sorted file of 64-bit id hashes (8 bytes per id, so a million
+ids is 8 MB), opened with np.memmap: loading costs nothing and lookups are
+a binary search that only touches the pages it needs. Ids added in a session
+sit in a small in-memory set and are appended to a .delta file and fsync'd on
+every flush (the scrapers flush once per log batch, after the rows are
+durable); close() merges them into the sorted file. A torn final delta write
+is dropped on open.
+
+    data/seen/<platform>/<persona>/<kind>.u64   (+ <kind>.u64.delta)
+
+kind separates what "seen" means: "watched" (the persona watched it) vs
+"recs" (it was recommended to the persona). One writer per index at a time,
+which the orchestrator's per-profile scheduling already guarantees.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from common import ensure_dir
+
+ROOT = "data/seen"
+
+
+def id_hash(video_id):
+    return int.from_bytes(hashlib.blake2b(str(video_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _read(path):
+    n = os.path.getsize(path) // 8 if os.path.exists(path) else 0  # whole ids only
+    if not n:
+        return np.empty(0, dtype="<u8")
+    return np.memmap(path, dtype="<u8", mode="r", shape=(n,))
+
+
+class SeenIndex:
+    def __init__(self, path):
+        self.path = path
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        self.base = _read(path)
+        self.new = set(int(h) for h in _read(path + ".delta"))  # left by a crashed session
+        self.unflushed = []
+
+    @classmethod
+    def open(cls, platform, persona, kind, root=ROOT):
+        return cls(os.path.join(root, platform, persona, f"{kind}.u64"))
+
+    def __len__(self):
+        return len(self.base) + len(self.new)
+
+    def __contains__(self, video_id):
+        h = id_hash(video_id)
+        if h in self.new:
+            return True
+        i = int(np.searchsorted(self.base, np.uint64(h)))
+        return i < len(self.base) and int(self.base[i]) == h
+
+    def check(self, video_ids):
+        """First-seen flag per id (repeats within the list count too); records them all."""
+        hashes = np.fromiter((id_hash(v) for v in video_ids), dtype="<u8")
+        if len(self.base):
+            pos = np.minimum(np.searchsorted(self.base, hashes), len(self.base) - 1)
+            in_base = self.base[pos] == hashes
+        else:
+            in_base = np.zeros(len(hashes), dtype=bool)
+        out = []
+        for h, old in zip(hashes.tolist(), in_base.tolist()):
+            first = not old and h not in self.new
+            if first:
+                self.new.add(h)
+                self.unflushed.append(h)
+            out.append(first)
+        return out
+
+    def flush(self):
+        """Append this session's new ids to the delta file and fsync it."""
+        if not self.unflushed:
+            return
+        with open(self.path + ".delta", "ab") as f:
+            f.write(np.asarray(self.unflushed, dtype="<u8").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.unflushed = []
+
+    def close(self):
+        """Merge the delta into the sorted file (atomic replace)."""
+        self.flush()
+        if self.new:
+            new = np.sort(np.fromiter(self.new, dtype="<u8", count=len(self.new)))
+            # new ids are disjoint from base: one linear insert keeps the file sorted
+            merged = np.insert(np.asarray(self.base), np.searchsorted(self.base, new), new)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(merged.astype("<u8").tobytes())
+                f.flush()
+                os.fsync(f.fileno())  # durable before the delta it replaces is removed
+            del self.base
+            os.replace(tmp, self.path)
+            self.base = _read(self.path)
+            self.new = set()
+        if os.path.exists(self.path + ".delta"):
+            os.remove(self.path + ".delta")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tag(rows, index, id_key):
+    """Set is_repeat (0/1, "" without an id) on each row dict, in order; returns rows."""
+    known = [r for r in rows if r.get(id_key)]
+    for r in rows:
+        r["is_repeat"] = ""
+    for r, first in zip(known, index.check([r[id_key] for r in known])):
+        r["is_repeat"] = 0 if first else 1
+    return rows
@@ -0,0 +1,111 @@
+"""
+Per-persona session store (cookies + localStorage) for the TikTok sampler.
+
+Snapshots live at data/sessions/<platform>/<persona>.json and are written
+atomically (temp file, fsync, rename), so a crash mid-save never leaves a
+persona with a half-written login and two personas never share one file.
+
+Restore is bulk and needs no navigation of its own:
+- every cookie in one context.add_cookies call (works before the page is on
+  the cookie's domain, httpOnly cookies included);
+- localStorage via one page init script that fills each saved origin the
+  first time a page of that origin loads.
+The caller's own page.goto(start_url) is then the only navigation.
+
+Snapshot format (Playwright and Chrome DevTools cookies share their fields):
+    {"saved": iso-ts, "cookies": [cookie], "local_storage": {origin: {key: value}}}
+"""
+import json
+import os
+
+from common import ensure_dir, ts
+
+ROOT = "data/sessions"
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+RESTORE_JS = """
+(() => {
+  const saved = %s;
+  const items = saved[location.origin];
+  if (!items || sessionStorage.getItem('__session_restored')) return;
+  for (const [k, v] of Object.entries(items)) { try { localStorage.setItem(k, v); } catch (e) {} }
+  sessionStorage.setItem('__session_restored', '1');
+})();
+"""
+LOCAL_STORAGE_JS = "() => { const s={}; for (let i=0;i<localStorage.length;i++){const k=localStorage.key(i); s[k]=localStorage.getItem(k);} return s; }"
+
+
+def session_path(persona, platform="tiktok", root=ROOT):
+    return os.path.join(root, platform, f"{persona}.json")
+
+
+def load(persona, platform="tiktok", root=ROOT):
+    path = session_path(persona, platform, root)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(persona, snap, platform="tiktok", root=ROOT):
+    path = session_path(persona, platform, root)
+    ensure_dir(os.path.dirname(path))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snap, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def from_legacy(cookies_path, lstorage_path, origin="https://www.tiktok.com"):
+    """Build a snapshot from the old shared cookies.json/localstorage.json pair."""
+    snap = {"saved": "", "cookies": [], "local_storage": {}}
+    if os.path.exists(cookies_path):
+        with open(cookies_path, "r", encoding="utf-8") as f:
+            for c in json.load(f):
+                c = dict(c)
+                if "expiry" in c:
+                    c["expires"] = c.pop("expiry")
+                snap["cookies"].append(c)
+    if os.path.exists(lstorage_path):
+        with open(lstorage_path, "r", encoding="utf-8") as f:
+            snap["local_storage"][origin] = json.load(f)
+    return snap
+
+
+# -------------------------- Playwright --------------------------
+def snapshot(page, previous=None):
+    """All cookies of the page's context plus the current origin's localStorage (other saved origins are kept)."""
+    cookies = page.context.cookies()
+    storage = dict((previous or {}).get("local_storage") or {})
+    try:
+        origin = page.evaluate("location.origin")
+        if origin and origin != "null":
+            storage[origin] = page.evaluate(LOCAL_STORAGE_JS) or {}
+    except Exception:
+        pass
+    return {"saved": ts(), "cookies": cookies, "local_storage": storage}
+
+
+def restore(page, snap):
+    """Install a snapshot into the page's context before the page's next navigation."""
+    cookies = []
+    for c in snap.get("cookies") or []:
+        if not c.get("name") or not c.get("domain"):
+            continue  # add_cookies rejects the whole batch for one of these
+        # an empty value is a valid cookie (and add_cookies requires the field)
+        c = {"value": "", "path": "/", **{k: c[k] for k in COOKIE_FIELDS if c.get(k) is not None}}
+        if c.get("expires", 0) < 0:
+            c.pop("expires")  # session cookie
+        if c.get("sameSite") not in ("Strict", "Lax", "None"):
+            c.pop("sameSite", None)
+        cookies.append(c)
+    if cookies:
+        page.context.add_cookies(cookies)
+    storage = snap.get("local_storage") or {}
+    if storage:
+        # page-level, so a warm context reused for the next session doesn't stack scripts
+        page.add_init_script(RESTORE_JS % json.dumps(storage))
+    return len(cookies)
@@ -0,0 +1,440 @@
+"""
+Indexed SQLite observation store.
+
+The watched / recs / feed / feed_recs / feed_preloaded logs as tables in one database, each
+row tagged with platform, persona and day and indexed on video id, persona,
+platform and day, so lookups like "which personas were recommended X, and
+when" are an index probe instead of a grep over every recs.csv.
+
+- SqliteWriter is a drop-in for LogWriter (--output sqlite): buffered rows
+  go in as one WAL transaction per flush.
+- ingest() bulk-loads existing CSV trees. It remembers a byte offset and a
+  fingerprint (inode + hash of the ingested head) per file, committed with the
+  rows, so reruns only read what was appended; a file that was rewritten
+  since has its rows deleted (each row keeps its source file id) and is loaded
+  again from the start. Files whose columns match no table are skipped and
+  listed in the summary.
+- rec_frequency / recommended / first_seen / co_recommended cover the common
+  questions; the CLI wraps them.
+
+    python sqlite_store.py ingest --logs data/logs
+    python sqlite_store.py who <video_id>
+    python sqlite_store.py freq --platform youtube --since 2024-05-01 --top 20
+    python sqlite_store.py first-seen <video_id>
+    python sqlite_store.py co-recs <video_id>
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import itertools
+import os
+import sqlite3
+import time
+
+from common import ensure_dir
+from parquet_store import partition_of
+
+DB_PATH = "data/observations.sqlite"
+BATCH = 50_000
+
+# Every table: where the row came from; src is the _ingested rowid of its CSV, LIVE_SRC for
+# SqliteWriter rows (NULL: ingested before rows kept their source).
+LIVE_SRC = 0
+BASE_COLUMNS = [("platform", "TEXT"), ("persona", "TEXT"), ("day", "TEXT"), ("src", "INTEGER")]
+# Log columns per table (SQLite affinity).
+COLUMNS = {
+    "watched": [("ts", "TEXT"), ("seed_query", "TEXT"), ("video_id", "TEXT"), ("title", "TEXT"),
+                ("dwell_secs", "INTEGER"), ("duration_secs", "INTEGER"), ("is_repeat", "INTEGER")],
+    "recs": [("ts", "TEXT"), ("seed_query", "TEXT"), ("watching", "TEXT"), ("rec_vid", "TEXT"),
+             ("rank", "INTEGER"), ("rec_title", "TEXT"), ("rec_channel", "TEXT"), ("is_repeat", "INTEGER")],
+    "feed": [("ts_iso", "TEXT"), ("index", "INTEGER"), ("video_id", "TEXT"), ("post_url", "TEXT"),
+             ("video_src", "TEXT"), ("duration_sec", "REAL"), ("author_handle", "TEXT"), ("caption", "TEXT"),
+             ("like_count", "INTEGER"), ("comment_count", "INTEGER"), ("share_count", "INTEGER"),
+             ("music_title", "TEXT"), ("is_paused", "TEXT"), ("is_repeat", "INTEGER")],
+    "feed_recs": [("ts_iso", "TEXT"), ("batch", "INTEGER"), ("rank", "INTEGER"), ("video_id", "TEXT"),
+                  ("author_handle", "TEXT"), ("caption", "TEXT"), ("is_repeat", "INTEGER")],
+    "feed_preloaded": [("ts_iso", "TEXT"), ("video_id", "TEXT"), ("post_url", "TEXT"), ("duration_sec", "REAL"),
+                       ("author_handle", "TEXT"), ("caption", "TEXT"), ("like_count", "INTEGER"),
+                       ("comment_count", "INTEGER"), ("share_count", "INTEGER"), ("music_title", "TEXT"),
+                       ("is_repeat", "INTEGER")],
+}
+# table -> (video id column, timestamp column, columns identifying one rec list besides persona).
+# A YouTube list is the sidebar of one watched video in a session (older recs.csv
+# rows each carry their own ts, so ts can't key it); a TikTok batch shares its ts.
+REC_TABLES = {"recs": ("rec_vid", "ts", ("day", "seed_query", "watching")),
+              "feed_recs": ("video_id", "ts_iso", ("day", "ts_iso", "batch"))}
+VIDEO_COLUMN = {"watched": "video_id", "recs": "rec_vid", "feed": "video_id", "feed_recs": "video_id",
+                "feed_preloaded": "video_id"}
+TS_COLUMN = {"watched": "ts", "recs": "ts", "feed": "ts_iso", "feed_recs": "ts_iso", "feed_preloaded": "ts_iso"}
+HEAD_BYTES = 4096  # how much of a file's start its fingerprint covers
+
+
+def _q(name):
+    return '"' + name + '"'
+
+
+def _indexes(table):
+    vid = VIDEO_COLUMN[table]
+    out = [(f"{table}_video", f"{_q(vid)}, persona, day"), (f"{table}_persona", "persona, day"),
+           (f"{table}_platform", "platform, day"), (f"{table}_day", "day"), (f"{table}_src", "src")]
+    if table in REC_TABLES:
+        _, _, list_cols = REC_TABLES[table]
+        out.append((f"{table}_list", ", ".join(["persona", *map(_q, list_cols)])))
+    return out
+
+
+def table_for(table, header):
+    """
+    Known table by name, else the one whose columns match header (any --out_csv
+    name; logs from before is_repeat existed lack that last column).
+    """
+    if table in COLUMNS:
+        return table
+    cols = [h for h in header if h != "persona"]
+    for name, spec in COLUMNS.items():
+        names = [c for c, _ in spec]
+        if cols in (names, names[:-1]):
+            return name
+    return None
+
+
+def connect(path=DB_PATH):
+    ensure_dir(os.path.dirname(os.path.abspath(path)))
+    db = sqlite3.connect(path, timeout=60, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    for table, spec in COLUMNS.items():
+        spec = BASE_COLUMNS + spec
+        db.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{_q(c)} {t}' for c, t in spec)})")
+        have = {r[1] for r in db.execute(f"PRAGMA table_info({table})")}
+        for c, t in spec:  # columns added since the database was created
+            if c not in have:
+                db.execute(f"ALTER TABLE {table} ADD COLUMN {_q(c)} {t}")
+    db.execute("CREATE TABLE IF NOT EXISTS _ingested (path TEXT PRIMARY KEY, offset INTEGER, header TEXT)")
+    have = {r[1] for r in db.execute("PRAGMA table_info(_ingested)")}
+    if "fingerprint" not in have:
+        db.execute("ALTER TABLE _ingested ADD COLUMN fingerprint TEXT")
+    create_indexes(db)
+    return db
+
+
+def create_indexes(db):
+    for table in COLUMNS:
+        for name, cols in _indexes(table):
+            db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+
+
+def drop_indexes(db):
+    for table in COLUMNS:
+        for name, _ in _indexes(table):
+            db.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _insert_sql(table):
+    cols = [c for c, _ in BASE_COLUMNS + COLUMNS[table]]
+    return f"INSERT INTO {table} ({', '.join(map(_q, cols))}) VALUES ({', '.join('?' * len(cols))})"
+
+
+def _tuples(rows, header, table, platform, persona, day, src=None):
+    """CSV rows (lists in header order) -> insert tuples; "" becomes NULL."""
+    pos = {h: i for i, h in enumerate(header)}
+    idx = [pos.get(c) for c, _ in COLUMNS[table]]
+    p_idx = pos.get("persona")
+    for r in rows:
+        if len(r) < len(header):
+            continue
+        yield (platform, r[p_idx] if p_idx is not None and r[p_idx] else persona, day, src,
+               *[(r[i] or None) if i is not None else None for i in idx])
+
+
+# -------------------------- live writer --------------------------
+class SqliteWriter:
+    """Buffered sink with the LogWriter interface; one transaction per flush."""
+
+    def __init__(self, path=DB_PATH, flush_rows=100, flush_secs=30.0, platform=None, persona=None):
+        self.db = connect(path)
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.platform = platform
+        self.persona = persona
+        self.headers = {}
+        self.pending = {}
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        self.after_flush = []
+
+    def open(self, path, header, truncate=False):
+        self.headers.setdefault(path, list(header))
+
+    def write(self, path, header, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        self.open(path, header)
+        self.pending.setdefault(path, []).extend(rows)
+        self.n_pending += len(rows)
+        if self.n_pending >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_secs:
+            self.flush()
+
+    def flush(self):
+        batches = []
+        for path, rows in self.pending.items():
+            header = self.headers[path]
+            name, platform, persona, day = partition_of(path, self.platform, self.persona)
+            table = table_for(name, header)
+            if table is None:
+                raise ValueError(f"{path}: no table matches columns {header}")
+            lists = [["" if r.get(h) is None else str(r.get(h)) for h in header] for r in rows]
+            batches.append((_insert_sql(table), list(_tuples(lists, header, table, platform, persona, day,
+                                                             LIVE_SRC))))
+        if batches:
+            self.db.execute("BEGIN IMMEDIATE")
+            for sql, tuples in batches:
+                self.db.executemany(sql, tuples)
+            self.db.execute("COMMIT")
+        self.pending = {}
+        self.n_pending = 0
+        self.last_flush = time.monotonic()
+        for fn in self.after_flush:
+            fn()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------- bulk ingest --------------------------
+def _lines(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            pos += len(line)
+            if pos > end:
+                break
+            yield line.decode("utf-8")
+
+
+def fingerprint(path, length):
+    """'<inode>:<sha256 of the first `length` bytes>'; changes when the file is replaced or rewritten."""
+    with open(path, "rb") as f:
+        head = f.read(length)
+    return f"{os.stat(path).st_ino}:{length}:{hashlib.sha256(head).hexdigest()}"
+
+
+def _unchanged(path, offset, stored):
+    """Does the file still start with what was ingested from it?"""
+    if os.path.getsize(path) < offset:
+        return False
+    if not stored:  # ingested before fingerprints were kept: only shrinking is detectable
+        return True
+    length = int(stored.split(":")[1])
+    return fingerprint(path, length) == stored
+
+
+def _forget(db, src, table, platform, persona, day, legacy=False):
+    """
+    Delete what was ingested from a file that has since been rewritten. A
+    legacy file (ingested before rows kept their source) left untagged rows:
+    those of its partition go too, never the live writer's (src = LIVE_SRC).
+    """
+    db.execute(f"DELETE FROM {table} WHERE src = ?", (src,))
+    if legacy:
+        db.execute(f"DELETE FROM {table} WHERE src IS NULL AND platform = ? AND persona = ? AND day = ?",
+                   (platform, persona, day))
+
+
+def ingest_file(db, csv_path):
+    """
+    Append the complete rows added to csv_path since the last ingest; returns
+    the row count, or None if its columns match no table (nothing is loaded).
+    """
+    path = os.path.abspath(csv_path)
+    row = db.execute("SELECT rowid, offset, header, fingerprint FROM _ingested WHERE path=?", (path,)).fetchone()
+    src, offset, header, stored = (row[0], row[1], row[2].split("\x1f"), row[3]) if row else (None, 0, None, None)
+    rewritten = row is not None and not _unchanged(path, offset, stored)
+    if rewritten:  # e.g. a truncated TikTok run: drop its old rows and start over
+        offset = 0
+    size = os.path.getsize(path)
+    if size == offset:
+        return 0
+    with open(path, "rb") as f:  # never read a half-written final row
+        f.seek(size - 1)
+        if f.read(1) != b"\n":
+            return 0
+    reader = csv.reader(_lines(path, offset, size))
+    if header is None or rewritten:
+        header = next(reader, None)
+        if not header:
+            return 0
+    name, platform, persona, day = partition_of(path)
+    table = table_for(name, header)
+    if table is None:
+        return None
+    db.execute("BEGIN IMMEDIATE")
+    if rewritten:
+        old_table = table_for(name, row[2].split("\x1f"))
+        if old_table:
+            _forget(db, src, old_table, platform, persona, day, legacy=not stored)
+    if src is None:
+        src = db.execute("INSERT INTO _ingested (path, offset, header) VALUES (?, 0, '')", (path,)).lastrowid
+    sql = _insert_sql(table)
+    n = 0
+    rows = _tuples(reader, header, table, platform, persona, day, src)
+    while True:
+        chunk = list(itertools.islice(rows, BATCH))
+        if not chunk:
+            break
+        db.executemany(sql, chunk)
+        n += len(chunk)
+    db.execute("UPDATE _ingested SET offset = ?, header = ?, fingerprint = ? WHERE rowid = ?",
+               (size, "\x1f".join(header), fingerprint(path, min(size, HEAD_BYTES)), src))
+    db.execute("COMMIT")
+    return n
+
+
+def ingest(logs_root="data/logs", path=DB_PATH):
+    """
+    Bulk-load every data/logs/<platform>/<persona>/<day>/*.csv. Into an empty
+    database the indexes are dropped during the load and built once at the end.
+    "skipped" lists the files whose columns match no table.
+    """
+    started = time.time()
+    db = connect(path)
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute("PRAGMA cache_size=-262144")
+    db.execute("PRAGMA temp_store=MEMORY")
+    empty = not db.execute("SELECT 1 FROM _ingested LIMIT 1").fetchone()
+    if empty:
+        drop_indexes(db)
+    rows = files = 0
+    skipped = []
+    for csv_path in sorted(glob.glob(os.path.join(logs_root, "*", "*", "*", "*.csv"))):
+        n = ingest_file(db, csv_path)
+        if n is None:
+            skipped.append(csv_path)
+            continue
+        rows += n
+        files += 1 if n else 0
+    t_load = time.time() - started
+    create_indexes(db)
+    db.execute("ANALYZE")
+    db.close()
+    return {"files": files, "rows": rows, "skipped": skipped, "load_secs": t_load, "secs": time.time() - started}
+
+
+# -------------------------- queries --------------------------
+def _where(video_col=None, video_id=None, persona=None, platform=None, since=None, until=None, alias=""):
+    conds, args = [], []
+    for cond, val in ((f"{_q(video_col or '')} = ?", video_id), ("persona = ?", persona),
+                      ("platform = ?", platform), ("day >= ?", since), ("day <= ?", until)):
+        if val is not None:
+            conds.append(alias + cond)
+            args.append(val)
+    return (" WHERE " + " AND ".join(conds)) if conds else "", args
+
+
+def recommended(db, video_id, **filters):
+    """Who was recommended video_id and when: [(platform, persona, n, first_ts, last_ts)]."""
+    out = {}
+    for table, (vid, ts_col, _) in REC_TABLES.items():
+        where, args = _where(vid, video_id, **filters)
+        for platform, persona, n, first, last in db.execute(
+                f"SELECT platform, persona, COUNT(*), MIN({_q(ts_col)}), MAX({_q(ts_col)}) FROM {table}"
+                f"{where} GROUP BY platform, persona", args):
+            first, last = first or "", last or ""
+            o = out.setdefault((platform, persona), [0, first, last])
+            o[0] += n
+            o[1], o[2] = min(o[1], first), max(o[2], last)
+    return sorted(((p, s, n, f, l) for (p, s), (n, f, l) in out.items()), key=lambda r: r[3])
+
+
+def rec_frequency(db, top=20, **filters):
+    """Most recommended videos: [(video_id, n, personas)]."""
+    counts = {}
+    for table, (vid, _, _) in REC_TABLES.items():
+        where, args = _where(**filters)
+        for v, n, personas in db.execute(
+                f"SELECT {_q(vid)}, COUNT(*), COUNT(DISTINCT persona) FROM {table}{where} GROUP BY {_q(vid)}", args):
+            c = counts.setdefault(v, [0, 0])
+            c[0] += n
+            c[1] += personas
+    return sorted(((v, n, p) for v, (n, p) in counts.items()), key=lambda r: -r[1])[:top]
+
+
+def first_seen(db, video_id, **filters):
+    """Earliest sighting per persona in any table: [(platform, persona, first_ts, table)]."""
+    best = {}
+    for table, vid in VIDEO_COLUMN.items():
+        where, args = _where(vid, video_id, **filters)
+        for platform, persona, first in db.execute(
+                f"SELECT platform, persona, MIN({_q(TS_COLUMN[table])}) FROM {table}{where} "
+                f"GROUP BY platform, persona", args):
+            key, first = (platform, persona), first or ""
+            if key not in best or first < best[key][0]:
+                best[key] = (first, table)
+    return sorted(((p, s, f, t) for (p, s), (f, t) in best.items()), key=lambda r: r[2])
+
+
+def co_recommended(db, video_id, top=20, **filters):
+    """Videos most often in the same rec list as video_id: [(video_id, n)]."""
+    counts = {}
+    for table, (vid, _, list_cols) in REC_TABLES.items():
+        where, args = _where(vid, video_id, alias="a.", **filters)
+        same_list = "".join(f" AND b.{_q(c)} IS a.{_q(c)}" for c in list_cols)
+        sql = (f"SELECT b.{_q(vid)}, COUNT(*) FROM {table} a JOIN {table} b"
+               f" ON b.persona = a.persona{same_list} AND b.{_q(vid)} <> a.{_q(vid)}"
+               f"{where} GROUP BY b.{_q(vid)}")
+        for v, n in db.execute(sql, args):
+            counts[v] = counts.get(v, 0) + n
+    return sorted(counts.items(), key=lambda r: -r[1])[:top]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="SQLite observation store: bulk ingest and lookups.")
+    ap.add_argument("--db", default=DB_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("ingest", help="Bulk-load (or top up from) CSV log trees.")
+    i.add_argument("--logs", default="data/logs")
+    for name, help_ in (("who", "Personas recommended VIDEO, with first/last time."),
+                        ("first-seen", "First sighting of VIDEO per persona."),
+                        ("co-recs", "Videos recommended alongside VIDEO."),
+                        ("freq", "Most recommended videos.")):
+        q = sub.add_parser(name, help=help_)
+        if name != "freq":
+            q.add_argument("video_id")
+        q.add_argument("--persona")
+        q.add_argument("--platform")
+        q.add_argument("--since", help="First day (YYYY-MM-DD).")
+        q.add_argument("--until", help="Last day (YYYY-MM-DD).")
+        if name in ("freq", "co-recs"):
+            q.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+
+    if args.cmd == "ingest":
+        stats = ingest(args.logs, args.db)
+        print(f"Ingested {stats['rows']} rows from {stats['files']} files in {stats['secs']:.1f}s "
+              f"(load {stats['load_secs']:.1f}s, {stats['rows'] / max(stats['load_secs'], 1e-9):,.0f} rows/s)")
+        for path in stats["skipped"]:
+            print(f"⚠️  Skipped {path}: its columns match no table")
+        raise SystemExit(0)
+
+    db = connect(args.db)
+    filters = {"persona": args.persona, "platform": args.platform, "since": args.since, "until": args.until}
+    if args.cmd == "who":
+        rows = recommended(db, args.video_id, **filters)
+    elif args.cmd == "first-seen":
+        rows = first_seen(db, args.video_id, **filters)
+    elif args.cmd == "co-recs":
+        rows = co_recommended(db, args.video_id, args.top, **filters)
+    else:
+        rows = rec_frequency(db, args.top, **filters)
+    for r in rows:
+        print("\t".join(str(v) for v in r))
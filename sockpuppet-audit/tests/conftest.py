@@ -0,0 +1,31 @@
+"""
+The scrapers import the shared modules as top-level names (run from the repo
+root), so the tests do the same. Every test runs in its own temporary working
+directory: data/… paths (logs, ledger, seen indexes) never touch the real ones.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from clock import RealClock, make_clock, set_clock  # noqa: E402
+from instrument import NullTracer, set_tracer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    set_clock(RealClock())
+    set_tracer(NullTracer())
+
+
+@pytest.fixture
+def virtual_clock():
+    clock = make_clock("virtual", seed=1)
+    set_clock(clock)
+    return clock
@@ -0,0 +1,99 @@
+import csv
+import os
+
+import pytest
+
+import analytics
+from analytics import Offsets, update
+from youtube.simple_watch_YT import RECS_HEADER, WATCHED_HEADER
+
+DAY = "data/logs/youtube/p/2024-05-01"
+
+
+def write(name, header, rows, mode="w"):
+    os.makedirs(DAY, exist_ok=True)
+    with open(os.path.join(DAY, name), mode, newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=header, extrasaction="ignore", restval="")
+        if mode == "w":
+            w.writeheader()
+        w.writerows(rows)
+
+
+def rec(watching, vid, title=""):
+    return {"ts": "2024-05-01T10:00:00", "persona": "p", "seed_query": "home workouts", "watching": watching,
+            "rec_vid": vid, "rank": 1, "rec_title": title, "is_repeat": 0}
+
+
+def n_recs(results):
+    return int(results["2024-05-01"].loc[("youtube", "p"), "n_recs"])
+
+
+def test_offsets_split_on_complete_records(workdir):
+    path = os.path.join(DAY, "recs.csv")
+    write("recs.csv", RECS_HEADER, [rec("w1", "a", "line one\nline two")])
+    with open(path, "ab") as f:
+        f.write(b'2024-05-01T10:00:01,p,q,w1,b,2,"half of a\n')  # quoted field still being written
+    offsets = Offsets("offsets.json")
+    df = offsets.read_new(path)
+    assert list(df["rec_vid"]) == ["a"] and df["rec_title"][0] == "line one\nline two"
+    with open(path, "ab") as f:
+        f.write(b'title",,0\n')
+    df = offsets.read_new(path)
+    assert list(df["rec_vid"]) == ["b"] and df["rec_title"][0] == "half of a\ntitle"
+    assert offsets.read_new(path) is None
+
+
+
+def test_offsets_restart_a_replaced_file(workdir):
+    path = os.path.join(DAY, "recs.csv")
+    write("recs.csv", RECS_HEADER, [rec("w1", "a")])
+    offsets = Offsets("offsets.json")
+    assert list(offsets.read_new(path)["rec_vid"]) == ["a"]
+    os.replace(path, os.path.join(DAY, "recs.1.csv"))  # rotated aside; the new file outgrows the old offset
+    write("recs.csv", RECS_HEADER[:-1], [rec("w2", "b"), rec("w2", "c"), rec("w2", "d")])
+    df = offsets.read_new(path)
+    assert list(df.columns) == RECS_HEADER[:-1] and list(df["rec_vid"]) == ["b", "c", "d"]
+
+def test_update_reads_only_new_rows(workdir):
+    write("recs.csv", RECS_HEADER, [rec("w1", "a"), rec("w1", "b")])
+    write("watched.csv", WATCHED_HEADER, [])
+    assert n_recs(update()) == 2
+    assert update() == {}
+    write("recs.csv", RECS_HEADER, [rec("w2", "c")], mode="a")
+    assert n_recs(update()) == 3
+
+
+def test_crash_before_commit_does_not_double_count(workdir, monkeypatch):
+    write("recs.csv", RECS_HEADER, [rec("w1", "a"), rec("w1", "b")])
+    update()
+    write("recs.csv", RECS_HEADER, [rec("w2", "c")], mode="a")
+
+    def crash(state_root, staged):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m, pytest.raises(KeyboardInterrupt):
+        m.setattr(analytics, "commit", crash)
+        update()
+    assert n_recs(update()) == 3
+
+
+def test_interrupted_commit_is_replayed(workdir, monkeypatch):
+    write("recs.csv", RECS_HEADER, [rec("w1", "a"), rec("w1", "b")])
+    update()
+    write("recs.csv", RECS_HEADER, [rec("w2", "c")], mode="a")
+    replaced = []
+    real_replace = os.replace
+
+    def die_after_first_state_file(src, dst):
+        if dst.endswith(".pkl") and replaced:
+            raise KeyboardInterrupt
+        real_replace(src, dst)
+        replaced.append(dst)
+
+    with monkeypatch.context() as m, pytest.raises(KeyboardInterrupt):
+        m.setattr(analytics.os, "replace", die_after_first_state_file)
+        update()
+    assert os.path.exists("data/analytics/.state/commit.json")
+    assert update() == {}  # the journal finished the commit, offsets included
+    write("recs.csv", RECS_HEADER, [rec("w3", "d")], mode="a")
+    assert n_recs(update()) == 4
@@ -0,0 +1,60 @@
+import csv
+import os
+
+from archive import Archive, archive_stats, reextract
+from replay.server import load_fixtures, tt_api_item, tt_sigi_item, yt_next_json, yt_player_json
+
+
+def rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_put_stores_each_blob_once(workdir):
+    with Archive() as arc:
+        a = arc.put_json({"x": 1, "y": [1, 2]})
+        assert arc.put_json({"y": [1, 2], "x": 1}) == a  # canonical JSON: key order doesn't matter
+        assert arc.get_json(a) == {"x": 1, "y": [1, 2]}
+        b = arc.put("some markup")
+        assert arc.get(b) == b"some markup"
+        assert (arc.stats["puts"], arc.stats["new_blobs"]) == (3, 2)
+        arc.record("youtube", "p", "2024-05-01", {"kind": "watch", "blobs": {"page": a, "sidebar_html": b}})
+    with Archive() as again:  # another persona's process: the blob is already on disk
+        again.put("some markup")
+        again.record("youtube", "q", "2024-05-01", {"kind": "watch", "blobs": {"page": a}})
+        assert again.stats["new_blobs"] == 0
+    stats = archive_stats()
+    assert (stats["records"], stats["blobs"], stats["refs"]) == (2, 2, 3)
+    assert stats["dedup_ratio"] > 1
+
+
+def test_reextract_rebuilds_logged_rows(workdir):
+    videos, items = load_fixtures()
+    vid = next(iter(videos))
+    with Archive() as arc:
+        page = arc.put_json({"title": videos[vid]["title"], "url": f"https://www.youtube.com/watch?v={vid}",
+                             "duration": ""})
+        responses = [["next", arc.put_json(yt_next_json(videos, vid))],
+                     ["player", arc.put_json(yt_player_json(videos, vid))]]
+        arc.record("youtube", "p", "2024-05-01", {
+            "kind": "watch", "ts": "2024-05-01T10:00:00", "video_id": vid, "seed_query": "q", "dwell_secs": 30,
+            "is_repeat": 0, "capture": True, "blobs": {"page": page, "responses": responses}})
+        batch = {"itemList": [tt_api_item(i) for i in items[:2]]}
+        arc.record("tiktok", "p", "2024-05-01", {"kind": "response", "ts": "2024-05-01T10:00:00", "batch": 1,
+                                                 "blobs": {"response": arc.put_json(batch)}})
+        for n, itm in enumerate(items[:2], 1):
+            arc.record("tiktok", "p", "2024-05-01", {"kind": "item", "ts": "2024-05-01T10:00:01",
+                                                     "video_id": itm["id"], "index": n, "is_repeat": 0,
+                                                     "blobs": {"sigi": arc.put_json(tt_sigi_item(itm))}})
+
+    for _ in range(2):  # a rebuild replaces the CSVs
+        assert reextract(workers=1)["partitions"] == 2
+    watched = rows("data/reextract/youtube/p/2024-05-01/watched.csv")
+    assert [(r["video_id"], r["title"], r["duration_secs"], r["dwell_secs"]) for r in watched] == \
+        [(vid, videos[vid]["title"], str(videos[vid]["duration"]), "30")]
+    recs = rows("data/reextract/youtube/p/2024-05-01/recs.csv")
+    assert [r["rec_vid"] for r in recs] == videos[vid]["recs"] and {r["watching"] for r in recs} == {vid}
+    feed = rows("data/reextract/tiktok/p/2024-05-01/feed.csv")
+    assert [(r["video_id"], r["index"], r["author_handle"]) for r in feed] == \
+        [(i["id"], str(n), "@" + i["author"]) for n, i in enumerate(items[:2], 1)]
+    assert len(rows("data/reextract/tiktok/p/2024-05-01/feed_recs.csv")) == 2
@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+import pytest
+
+from youtube.async_engine import run_session_async, state_path
+
+
+class FailingPage:
+    async def goto(self, url, **kw):
+        raise RuntimeError("navigation failed")
+
+
+class FakeContext:
+    def __init__(self):
+        self.saved = None
+        self.closed = False
+
+    async def new_page(self):
+        return FailingPage()
+
+    async def storage_state(self, path):
+        self.saved = path
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"cookies": [], "origins": []}, f)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.context = FakeContext()
+
+    async def new_context(self, storage_state=None):
+        return self.context
+
+
+def test_storage_state_is_saved_when_the_session_fails(workdir):
+    browser = FakeBrowser()
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_session_async(browser, "p", ["q"], 3, "profiles/p"))
+    assert browser.context.saved == state_path("profiles/p") and browser.context.closed
@@ -0,0 +1,30 @@
+from capture import YT_PLAYER, FeedCapture, ResponseCapture
+
+
+def player(vid):
+    return {"videoDetails": {"videoId": vid, "title": f"t{vid}", "lengthSeconds": "10", "author": "c"}}
+
+
+def feed(*ids):
+    return {"itemList": [{"id": i, "author": {"uniqueId": "u"}, "desc": f"d{i}"} for i in ids]}
+
+
+def test_untaken_youtube_entries_are_bounded(workdir):
+    cap = ResponseCapture(max_videos=3)
+    for vid in "abcde":
+        cap.feed("https://x" + YT_PLAYER, player(vid))
+    assert list(cap.videos) == ["c", "d", "e"]
+    assert cap.take("e")["meta"]["video_id"] == "e" and cap.take("a") is None
+
+
+def test_feed_batches_are_dropped_once_polled(workdir):
+    cap = FeedCapture(keep_raw=True, max_items=3)
+    cap.feed(feed("1", "2"))
+    cap.feed(feed("3"))
+    polled = cap.poll()
+    assert [(n, [i["video_id"] for i in b]) for n, b, _ in polled] == [(1, ["1", "2"]), (2, ["3"])]
+    assert polled[1][2] == feed("3") and cap.poll() == []
+    cap.get("1")  # recently used: kept over "2"
+    cap.feed(feed("4"))
+    assert cap.poll()[0][0] == 3
+    assert list(cap.items) == ["3", "1", "4"]
@@ -0,0 +1,57 @@
+import asyncio
+import datetime as dt
+
+from clock import RealClock, VirtualClock, get_clock, make_clock, set_clock
+from common import out_paths
+from ledger import today
+
+
+def test_virtual_sleep_advances_time_without_waiting():
+    clock = VirtualClock()
+    before = clock.now()
+    clock.sleep(3600)
+    clock.sleep(-5)
+    assert 3600 <= (clock.now() - before).total_seconds() < 3601
+
+
+def test_concurrent_sleepers_each_advance_their_own_time():
+    clock = VirtualClock()
+
+    async def persona(secs):
+        before = clock.now()
+        await clock.async_sleep(secs)
+        await asyncio.sleep(0)  # let the other persona sleep in between
+        return (clock.now() - before).total_seconds()
+
+    async def both():
+        return await asyncio.gather(persona(60), persona(60), persona(90))
+
+    advanced = asyncio.run(both())
+    assert [round(a) for a in advanced] == [60, 60, 90]
+    assert clock.skipped == 0  # the tasks' sleeps don't leak into the caller
+
+
+def test_tasks_start_from_the_creators_offset():
+    clock = VirtualClock()
+    clock.sleep(100)
+
+    async def child():
+        await clock.async_sleep(10)
+        return clock.skipped
+
+    assert asyncio.run(child()) == 110
+    assert clock.skipped == 100
+
+
+def test_seeded_draws_are_reproducible():
+    a, b = make_clock("virtual", seed=7), make_clock("virtual", seed=7)
+    assert [a.random.randint(0, 100) for _ in range(5)] == [b.random.randint(0, 100) for _ in range(5)]
+    assert isinstance(make_clock("real"), RealClock)
+
+
+def test_log_day_follows_the_session_clock(workdir):
+    set_clock(VirtualClock(start=dt.datetime(2024, 5, 1, 23, 59, 30)))
+    assert today() == "2024-05-01"
+    get_clock().sleep(60)  # a virtual day rolls over with the clock, not the host
+    assert today() == "2024-05-02"
+    assert out_paths("youtube", "p")[0] == "data/logs/youtube/p/2024-05-02/watched.csv"
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import footprint
+
+
+def profile(root="profiles/p"):
+    files = {"Default/Cookies": b"cookie jar", "Default/Preferences": b"{}", "Local State": b"{\"x\": 1}",
+             "Default/Cache/Cache_Data/data_0": b"c" * 1000, "Default/Code Cache/js/index": b"v8" * 100,
+             "ShaderCache/data_1": b"s" * 50}
+    for rel, data in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, rel)), exist_ok=True)
+        with open(os.path.join(root, rel), "wb") as f:
+            f.write(data)
+    return root
+
+
+def test_prune_keeps_identity_and_refuses_a_locked_profile(workdir):
+    udd = profile()
+    os.symlink("host-1234", os.path.join(udd, "SingletonLock"))
+    with pytest.raises(RuntimeError):
+        footprint.prune(udd)
+    assert os.path.exists(os.path.join(udd, "Default/Cache/Cache_Data/data_0"))
+    os.remove(os.path.join(udd, "SingletonLock"))
+    m = footprint.measure(udd)
+    assert m["cache"] == 1250 and m["identity"] == m["total"] - 1250
+    assert footprint.prune(udd, dry_run=True) == 1250 and footprint.measure(udd)["cache"] == 1250
+    assert footprint.prune(udd) == 1250
+    assert footprint.cache_dirs(udd) == [] and footprint.measure(udd)["total"] == m["identity"]
+
+
+def test_snapshot_restore_round_trip(workdir):
+    udd = profile()
+    first = footprint.snapshot("p", udd)
+    assert sorted(first["files"]) == ["Default/Cookies", "Default/Preferences", "Local State"]
+    with open(os.path.join(udd, "Default/Cookies"), "wb") as f:
+        f.write(b"new cookie jar")
+    os.utime(os.path.join(udd, "Default/Cookies"), ns=(1, 1))
+    second = footprint.snapshot("p", udd)
+    assert second["stats"]["read_bytes"] == len(b"new cookie jar")  # unchanged files are not re-read
+    assert second["files"]["Local State"] == first["files"]["Local State"]
+
+    os.makedirs("elsewhere/p/Default")
+    with open("elsewhere/p/Default/stale", "wb") as f:
+        f.write(b"replaced")
+    assert footprint.restore(footprint.load_manifest("p"), "elsewhere/p") == second["bytes"]
+    with open("elsewhere/p/Default/Cookies", "rb") as f:
+        assert f.read() == b"new cookie jar"
+    assert os.stat("elsewhere/p/Default/Cookies").st_mtime_ns == 1
+    assert not os.path.exists("elsewhere/p/Default/stale") and not os.path.exists("elsewhere/p/Default/Cache")
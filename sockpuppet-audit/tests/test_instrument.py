@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from instrument import NullTracer, Tracer, get_tracer, session_tracer
+
+
+def test_null_tracer_without_exports(workdir):
+    tracer = session_tracer("youtube", "p")
+    assert isinstance(tracer, NullTracer) and not isinstance(tracer, Tracer) and get_tracer() is tracer
+    with tracer.span("goto"):
+        tracer.count("retry")
+    assert tracer.close() == {}
+
+
+def test_spans_counters_and_prometheus_text(workdir):
+    with session_tracer("youtube", "p", "trace.jsonl", "metrics") as tracer:
+        assert get_tracer() is tracer
+        for _ in range(2):
+            with tracer.span("goto", url="u"):
+                pass
+        with pytest.raises(ValueError):
+            with tracer.span("extract"):
+                raise ValueError("missing")
+        tracer.count("retry")
+        tracer.count("retry", 2, reason="timeout")
+        summary = tracer.summary()
+    assert isinstance(get_tracer(), NullTracer)
+    assert summary["counters"] == {"retry": 3}
+    assert (summary["spans"]["goto"]["n"], summary["spans"]["extract"]["n"]) == (2, 1)
+
+    with open("trace.jsonl", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    assert [e.get("span") or e.get("count") for e in events[:-1]] == ["goto", "goto", "extract", "retry", "retry"]
+    assert events[0]["url"] == "u" and events[2]["ok"] is False and events[4]["reason"] == "timeout"
+    assert events[-1]["summary"]["counters"] == {"retry": 3}
+
+    assert os.listdir("metrics") == ["sockpuppet_youtube_p.prom"]
+    with open("metrics/sockpuppet_youtube_p.prom", encoding="utf-8") as f:
+        prom = f.read().splitlines()
+    assert 'sockpuppet_span_count{platform="youtube",persona="p",span="goto"} 2' in prom
+    assert 'sockpuppet_events{platform="youtube",persona="p",event="retry"} 3' in prom
+    samples = [line for line in prom if not line.startswith("#")]
+    assert all(len(line.rsplit(" ", 1)) == 2 and float(line.rsplit(" ", 1)[1]) >= 0 for line in samples)
+    typed = {line.split()[2] for line in prom if line.startswith("# TYPE")}
+    assert {line.split("{")[0] for line in samples} <= typed
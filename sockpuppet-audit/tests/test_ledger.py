@@ -0,0 +1,40 @@
+import pytest
+
+from ledger import Ledger, session_day
+
+
+def test_progress_is_durable_only_after_commit(workdir):
+    with Ledger() as ledger:
+        ledger.start("youtube", "p", "2024-05-01", seed="q")
+        ledger.record("youtube", "p", "2024-05-01", "a", 1, cursor="u1", seed="q")
+        ledger.record("youtube", "p", "2024-05-01", "b", 2, cursor="u2", seed="q")
+        assert Ledger().resume("youtube", "p", "2024-05-01")["count"] == 0
+        ledger.commit()
+    state = Ledger().resume("youtube", "p", "2024-05-01")
+    assert (state["count"], state["last_video"], state["cursor"], state["seed"]) == (2, "b", "u2", "q")
+    assert state["seen"] == {"a", "b"}
+
+
+def test_sessions_and_restarts_keep_their_own_keys(workdir):
+    with Ledger() as ledger:
+        for session in (0, 1):
+            ledger.start("tiktok", "p", session_day("2024-05-01", session))
+            ledger.record("tiktok", "p", session_day("2024-05-01", session), "a", 1)
+        ledger.commit()
+        assert ledger.resume("tiktok", "p", "2024-05-01#2")["count"] == 1
+        ledger.start("tiktok", "p", "2024-05-01")
+        assert ledger.resume("tiktok", "p", "2024-05-01")["seen"] == set()
+        assert ledger.resume("tiktok", "p", "2024-05-01#2")["seen"] == {"a"}
+        assert ledger.resume("tiktok", "p", "2024-05-02") is None
+
+
+def test_failure_drops_uncommitted_progress(workdir):
+    with pytest.raises(OSError):
+        with Ledger() as ledger:
+            ledger.start("youtube", "p", "2024-05-01")
+            ledger.record("youtube", "p", "2024-05-01", "a", 1)
+            ledger.commit()
+            ledger.record("youtube", "p", "2024-05-01", "b", 2)
+            raise OSError("log writer failed")
+    state = Ledger().resume("youtube", "p", "2024-05-01")
+    assert state["count"] == 1 and state["seen"] == {"a"}
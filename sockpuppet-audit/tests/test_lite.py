@@ -0,0 +1,73 @@
+import json
+
+import lite
+from lite import LiteStats, attach_playwright, classify
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "abort"
+
+    def continue_(self):
+        self.outcome = "continue"
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeTarget:
+    def __init__(self):
+        self.scripts, self.handlers = [], {}
+
+    def add_init_script(self, script):
+        self.scripts.append(script)
+
+    def route(self, pattern, fn):
+        self.handlers["route"] = fn
+
+    def on(self, event, fn):
+        self.handlers[event] = fn
+
+
+def test_classify_never_blocks_watch_signals():
+    assert classify("https://i.ytimg.com/vi/x/hq.jpg", "image") == "image"
+    assert classify("https://www.youtube.com/api/stats/qoe?x=1", "xhr") == "tracker"
+    assert classify("https://www.youtube.com/api/stats/watchtime?x=1", "xhr") is None
+    assert classify("https://www.youtube.com/youtubei/v1/log_event", "fetch") is None
+    assert classify("https://www.tiktok.com/api/recommend/item_list/?count=8", "fetch") is None
+    assert classify("https://v16-webapp.tiktok.com/video.mp4", "media") is None  # media keeps streaming
+
+
+def test_stats_count_blocked_and_received(workdir):
+    stats, target = LiteStats(), FakeTarget()
+    attach_playwright(target, stats)
+    assert target.scripts == [lite.MEDIA_JS]
+    routes = [FakeRoute(u, t) for u, t in (("https://x/a.png", "image"), ("https://x/b.png", "image"),
+                                           ("https://x/f.woff2", "font"), ("https://doubleclick.net/x", "script"),
+                                           ("https://x/watch?v=1", "document"))]
+    for r in routes:
+        target.handlers["route"](r)
+    assert [r.outcome for r in routes] == ["abort"] * 4 + ["continue"]
+    for headers in ({"content-length": "1000"}, {"content-length": "24"}, {}, {"content-length": "n/a"}):
+        target.handlers["response"](FakeResponse(headers))
+
+    s = stats.summary()
+    assert s["blocked"] == {"image": 2, "font": 1, "tracker": 1}
+    assert (s["requests"], s["bytes_in"], s["unsized"]) == (4, 1024, 2)
+    assert s["est_bytes_saved"] == 2 * lite.EST_BYTES["image"] + lite.EST_BYTES["font"] + lite.EST_BYTES["tracker"]
+    stats.save("data/lite.jsonl", videos=3)
+    with open("data/lite.jsonl", encoding="utf-8") as f:
+        line = json.loads(f.read())
+    assert line["videos"] == 3 and line["bytes_in"] == 1024
@@ -0,0 +1,56 @@
+import csv
+import os
+
+from logwriter import LogWriter
+
+OLD = ["ts", "persona", "seed_query", "watching", "rec_vid"]
+NEW = OLD + ["rank", "rec_title", "rec_channel", "is_repeat"]
+
+
+def rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def rec(vid):
+    return {"ts": "t", "persona": "p", "seed_query": "q", "watching": "w", "rec_vid": vid, "rank": 1,
+            "rec_title": "", "rec_channel": "", "is_repeat": 0}
+
+
+def test_appends_under_a_matching_header(workdir):
+    for vid in ("a", "b"):
+        with LogWriter("j") as log:
+            log.write("recs.csv", NEW, [rec(vid)])
+    assert [r[4] for r in rows("recs.csv")] == ["rec_vid", "a", "b"]
+
+
+def test_file_with_another_header_is_rotated(workdir):
+    with open("recs.csv", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([OLD, ["t", "p", "q", "w", "old"]])
+    with LogWriter("j") as log:
+        log.write("recs.csv", NEW, [rec("new")])
+        assert log.rotated == {"recs.csv": "recs.1.csv"}
+    assert rows("recs.1.csv") == [OLD, ["t", "p", "q", "w", "old"]]
+    assert rows("recs.csv")[0] == NEW and rows("recs.csv")[1][4] == "new"
+
+
+def test_crashed_batches_are_replayed(workdir):
+    log = LogWriter("j", flush_rows=1)
+    log.write("recs.csv", NEW, [rec("a")])
+    size = os.path.getsize("recs.csv")
+    log.write("recs.csv", NEW, [rec("b")])
+    with open("recs.csv", "ab") as f:
+        f.truncate(size + 5)  # the CSV write was torn; its journal entry is intact
+    log.journal.close()  # crash: no close(), the journal stays behind
+    with LogWriter("j") as again:
+        assert not again.n_pending
+    assert [r[4] for r in rows("recs.csv")] == ["rec_vid", "a", "b"]
+
+
+def test_torn_journal_tail_is_ignored(workdir):
+    log = LogWriter("j", flush_rows=1)
+    log.write("recs.csv", NEW, [rec("a")])
+    log.journal.write(b'{"path": "recs.csv", "offs')  # died mid-append of the next batch
+    log.journal.close()
+    assert LogWriter("j").recover() == 0  # __init__ already replayed the one whole chunk
+    assert [r[4] for r in rows("recs.csv")] == ["rec_vid", "a"]
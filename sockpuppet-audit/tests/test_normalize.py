@@ -0,0 +1,71 @@
+import csv
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import normalize
+
+
+def col(fn, values):
+    return fn(pa.array(values, type=pa.string())).to_pylist()
+
+
+def test_counts():
+    assert col(normalize.counts, ["1.2K", "3M", "2.5b", "1,234", " 7 ", "", "n/a"]) == \
+        [1200, 3000000, 2500000000, 1234, 7, None, None]
+
+
+def test_durations():
+    assert col(normalize.durations, ["12:34", "1:02:03", "PT1H2M3S", "PT45S", "90", "0", "", "PT"]) == \
+        [754.0, 3723.0, 3723.0, 45.0, 90.0, None, None, None]
+
+
+def test_video_ids():
+    assert col(normalize.video_ids, ["dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1",
+                                     "https://youtu.be/abc_-1", "https://www.youtube.com/shorts/xyz",
+                                     "https://www.tiktok.com/@u/video/7001", "not an id!"]) == \
+        ["dQw4w9WgXcQ", "dQw4w9WgXcQ", "abc_-1", "xyz", "7001", None]
+
+
+def test_handles_flags_ints():
+    assert col(normalize.handles, ["@Name", "name", "https://www.tiktok.com/@Na.me/video/1", ""]) == \
+        ["@name", "@name", "@na.me", None]
+    assert col(normalize.flags, ["1", "True", "no", "", "maybe"]) == [True, True, False, None, None]
+    assert col(normalize.ints, ["3", " 4.0 ", "x"]) == [3, 4, None]
+
+
+def test_normalize_file_types_a_partition(workdir):
+    path = "data/logs/tiktok/p/2024-05-01/feed.csv"
+    os.makedirs(os.path.dirname(path))
+    header = ["ts_iso", "index", "video_id", "post_url", "video_src", "duration_sec", "author_handle", "caption",
+              "like_count", "comment_count", "share_count", "music_title", "is_paused", "is_repeat"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerow(["2024-05-01T10:00:00+02:00", "1", "https://www.tiktok.com/@U/video/7001", "", "", "0:15",
+                    "U", "c", "1.2K", "3", "", "m", "false", "0"])
+    assert normalize.normalize_file(path) == 1
+    assert normalize.normalize_file(path) == 0  # up to date
+    out = pq.read_table("data/normalized/feed/platform=tiktok/persona=p/day=2024-05-01/part-feed.parquet")
+    row = out.to_pylist()[0]
+    assert (row["video_id"], row["author_handle"], row["duration_sec"], row["like_count"]) == \
+        ("7001", "@u", 15.0, 1200)
+    assert row["ts_iso"].hour == 8 and row["is_repeat"] is False
+
+
+def test_normalize_keeps_rotated_files_apart(workdir):
+    day = "data/logs/tiktok/p/2024-05-01"
+    os.makedirs(day)
+    header = ["ts_iso", "index", "video_id", "post_url", "video_src", "duration_sec", "author_handle", "caption",
+              "like_count", "comment_count", "share_count", "music_title", "is_paused", "is_repeat"]
+    for name, ids in (("feed.1.csv", ["1", "2"]), ("feed.csv", ["3"])):
+        with open(os.path.join(day, name), "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(["2024-05-01T10:00:00", "1", vid, "", "", "5", "u", "", "", "", "", "", "", ""] for vid in ids)
+    stats = normalize.normalize("data/logs", workers=2)
+    assert (stats["files"], stats["rows"]) == (2, 3)
+    part = "data/normalized/feed/platform=tiktok/persona=p/day=2024-05-01"
+    assert sorted(os.listdir(part)) == ["part-feed.1.parquet", "part-feed.parquet"]
+    assert normalize.normalize("data/logs", workers=2)["files"] == 0
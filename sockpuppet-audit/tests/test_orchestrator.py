@@ -0,0 +1,69 @@
+import csv
+import glob
+import time
+
+import pytest
+
+import orchestrator
+from replay.server import serve
+
+
+def job(persona, platform, profile=None, videos=2):
+    return {"persona": persona, "platform": platform, "keywords": ["home workouts"], "videos_per_day": videos,
+            "user_data_dir": f"profiles/{profile or persona}", "days": 1}
+
+
+def overlaps(results, jobs):
+    """Pairs of jobs on the same profile whose run times intersect."""
+    profile = {(j["persona"], j["platform"]): j["user_data_dir"] for j in jobs}
+    spans = [(profile[(r["persona"], r["platform"])], r["started"], r["started"] + r["secs"]) for r in results]
+    return [(a, b) for i, a in enumerate(spans) for b in spans[i + 1:]
+            if a[0] == b[0] and a[1] < b[2] and b[1] < a[2]]
+
+
+def fake_run_job(job, opts, stop=None):
+    started = time.time()
+    time.sleep(0.2)
+    return {"persona": job["persona"], "platform": job["platform"], "videos": 1, "started": started,
+            "secs": time.time() - started, "error": "", "startup": ""}
+
+
+def test_jobs_sharing_a_profile_never_overlap(workdir, monkeypatch):
+    monkeypatch.setattr(orchestrator, "run_job", fake_run_job)
+    jobs = [job("a", "youtube"), job("a", "tiktok"), job("b", "youtube"), job("c", "tiktok", profile="a")]
+    results = orchestrator.run_all(jobs, {}, max_browsers=3)
+    assert len(results) == 4 and not overlaps(results, jobs)
+    b = next(r for r in results if r["persona"] == "b")
+    assert any(r["started"] < b["started"] + b["secs"] and b["started"] < r["started"] + r["secs"]
+               for r in results if r is not b)  # other profiles do run side by side
+
+
+@pytest.fixture
+def chromium():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    try:
+        with sync_api.sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+    except Exception as e:
+        pytest.skip(f"no Chromium to run against the replay server: {(str(e).splitlines() or [''])[0]}")
+
+
+def test_two_personas_against_the_replay_server(workdir, chromium):
+    server, base = serve()
+    try:
+        jobs = [job("a", "youtube"), job("b", "youtube"), job("b", "tiktok")]
+        opts = {"dwell_min": 1, "dwell_max": 2, "delay_min": 0, "delay_max": 0, "headless": True,
+                "dry_run": False, "youtube_url": base, "tiktok_url": base, "clock": "virtual", "speedup": 0,
+                "seed": 1, "mem_interval": 0}
+        results = orchestrator.run_all(jobs, opts, max_browsers=2)
+    finally:
+        server.shutdown()
+    assert [r["error"] for r in results] == ["", "", ""]
+    assert not overlaps(results, jobs)
+    for persona in ("a", "b"):
+        with open(glob.glob(f"data/logs/youtube/{persona}/*/watched.csv")[0], newline="", encoding="utf-8") as f:
+            watched = list(csv.DictReader(f))
+        assert len(watched) == 2 and {r["persona"] for r in watched} == {persona}
+        assert glob.glob(f"data/logs/youtube/{persona}/*/recs.csv")
+    with open(glob.glob("data/logs/tiktok/b/*/feed.csv")[0], newline="", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 2
@@ -0,0 +1,25 @@
+import os
+
+import parquet_store
+from logwriter import LogWriter
+from tiktok.simple_watch_TT_v4 import FEED_HEADER
+
+DAY = "data/logs/tiktok/p/2024-05-01"
+
+
+def feed_row(i, **kw):
+    return {"ts_iso": "2024-05-01T10:00:00", "index": i, "video_id": f"70{i}", **kw}
+
+
+def test_compact_keeps_rotated_and_live_files(workdir):
+    os.makedirs(DAY)
+    with LogWriter("j") as log:
+        log.write(f"{DAY}/feed.csv", FEED_HEADER[:-1], [feed_row(1), feed_row(2)])  # before is_repeat
+    with LogWriter("j") as log:
+        log.write(f"{DAY}/feed.csv", FEED_HEADER, [feed_row(3, is_repeat=0)])
+        assert log.rotated == {f"{DAY}/feed.csv": f"{DAY}/feed.1.csv"}
+
+    stats = parquet_store.compact("data/logs", "data/parquet")
+    assert (stats["csv_files"], stats["csv_rows"]) == (2, 3)
+    assert sorted(parquet_store.load("feed")["video_id"].to_pylist()) == ["701", "702", "703"]
+    assert parquet_store.compact("data/logs", "data/parquet")["csv_files"] == 0  # both up to date
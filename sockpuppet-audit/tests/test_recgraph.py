@@ -0,0 +1,55 @@
+import csv
+import os
+
+import numpy as np
+
+import recgraph
+from youtube.simple_watch_YT import RECS_HEADER
+
+
+def write_recs(persona, day, pairs):
+    path = f"data/logs/youtube/{persona}/{day}/recs.csv"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    new = not os.path.exists(path)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=RECS_HEADER, restval="")
+        if new:
+            w.writeheader()
+        w.writerows({"persona": persona, "watching": a, "rec_vid": b} for a, b in pairs)
+
+
+def edge_set(g):
+    src, dst, pers, cnt = g.edges()
+    names = g.names(np.arange(g.n_nodes))
+    return sorted((names[s], names[d], g.personas[p], int(c)) for s, d, p, c in zip(src, dst, pers, cnt))
+
+
+def test_incremental_builds_match_a_full_build(workdir):
+    rng = np.random.default_rng(0)
+    batches = [[(f"v{a}", f"v{b}") for a, b in rng.integers(0, 40, size=(300, 2))] for _ in range(3)]
+    for i, batch in enumerate(batches):
+        write_recs("p" if i % 2 else "q", "2024-05-01", batch[:150])
+        write_recs("q", "2024-05-02", batch[150:])
+        recgraph.build("data/logs", root="data/graph")
+    write_recs("r", "2024-05-03", [("new1", "v1"), ("v1", "new2")])
+    stats = recgraph.build("data/logs", root="data/graph")
+    assert stats["new_rows"] == 2 and stats["new_nodes"] == 2
+    g = recgraph.RecGraph.open(root="data/graph")
+    assert np.all(np.diff(g.indptr) >= 0)
+
+    os.rename("data/graph", "data/graph_incremental")
+    recgraph.build("data/logs", root="data/graph")
+    full = recgraph.RecGraph.open(root="data/graph")
+    assert edge_set(g) == edge_set(full)
+    assert sorted(g.top_in_degree(g.n_nodes)) == sorted(full.top_in_degree(full.n_nodes))
+
+
+def test_build_restarts_a_rotated_recs_file(workdir):
+    write_recs("p", "2024-05-01", [("a", "b")])
+    recgraph.build("data/logs", root="data/graph")
+    day = "data/logs/youtube/p/2024-05-01"
+    os.replace(f"{day}/recs.csv", f"{day}/recs.1.csv")  # rotated by LogWriter; the new file outgrows the offset
+    write_recs("p", "2024-05-01", [("c", "d"), ("c", "e"), ("d", "e")])
+    assert recgraph.build("data/logs", root="data/graph")["new_rows"] == 3
+    g = recgraph.RecGraph.open(root="data/graph")
+    assert edge_set(g) == [("a", "b", "p", 1), ("c", "d", "p", 1), ("c", "e", "p", 1), ("d", "e", "p", 1)]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from seenindex import SeenIndex, tag
+
+
+def test_repeats_across_sessions(workdir):
+    with SeenIndex.open("youtube", "p", "watched") as idx:
+        assert idx.check(["a", "b", "a"]) == [True, True, False]
+    with SeenIndex.open("youtube", "p", "watched") as idx:
+        assert "a" in idx and "c" not in idx
+        rows = tag([{"video_id": "c"}, {"video_id": "b"}, {"video_id": ""}], idx, "video_id")
+        assert [r["is_repeat"] for r in rows] == [0, 1, ""]
+        assert len(idx) == 3
+
+
+def test_flushed_ids_survive_a_crash(workdir):
+    idx = SeenIndex.open("youtube", "p", "recs")
+    idx.check(["a", "b"])
+    idx.flush()  # then the process dies without close()
+    with open(idx.path + ".delta", "ab") as f:
+        f.write(b"\x01\x02\x03")  # torn final write
+    again = SeenIndex.open("youtube", "p", "recs")
+    assert again.check(["a", "b", "c"]) == [False, False, True]
+    again.close()
+    assert len(np.fromfile(again.path, dtype="<u8")) == 3
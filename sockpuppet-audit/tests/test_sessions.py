@@ -0,0 +1,43 @@
+import sessions
+
+
+class FakeContext:
+    def __init__(self):
+        self.cookies = []
+
+    def add_cookies(self, cookies):
+        for c in cookies:  # what Playwright insists on
+            assert {"name", "value"} <= set(c) and ("url" in c or {"domain", "path"} <= set(c))
+        self.cookies.extend(cookies)
+
+
+class FakePage:
+    def __init__(self):
+        self.context = FakeContext()
+        self.scripts = []
+
+    def add_init_script(self, script):
+        self.scripts.append(script)
+
+
+def test_restore_keeps_empty_cookie_values(workdir):
+    snap = {"cookies": [
+        {"name": "sid", "value": "abc", "domain": ".tiktok.com", "path": "/", "expires": 2e9, "sameSite": "Lax"},
+        {"name": "consent", "value": "", "domain": ".tiktok.com", "path": "/", "expires": -1, "sameSite": ""},
+        {"name": "no_path", "value": "1", "domain": ".tiktok.com", "httpOnly": None},
+        {"name": "", "value": "x", "domain": ".tiktok.com"},
+    ], "local_storage": {"https://www.tiktok.com": {"k": "v"}}}
+    page = FakePage()
+    assert sessions.restore(page, snap) == 3
+    by_name = {c["name"]: c for c in page.context.cookies}
+    assert by_name["consent"]["value"] == "" and "expires" not in by_name["consent"]
+    assert "sameSite" not in by_name["consent"] and by_name["sid"]["sameSite"] == "Lax"
+    assert by_name["no_path"]["path"] == "/" and "httpOnly" not in by_name["no_path"]
+    assert len(page.scripts) == 1
+
+
+def test_save_and_load_round_trip(workdir):
+    snap = {"saved": "t", "cookies": [{"name": "a", "value": ""}], "local_storage": {}}
+    sessions.save("p", snap)
+    assert sessions.load("p") == snap
+    assert sessions.load("missing") is None
@@ -0,0 +1,102 @@
+import csv
+import os
+
+import sqlite_store
+from youtube.simple_watch_YT import RECS_HEADER
+
+
+def write(path, rows, mode="w"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode, newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=RECS_HEADER)
+        if mode == "w":
+            w.writeheader()
+        w.writerows(rows)
+
+
+def recs(watching, vids, persona="p", ts=None):
+    return [{"ts": ts or f"2024-05-01T10:00:0{i}", "persona": persona, "seed_query": "q", "watching": watching,
+             "rec_vid": v, "rank": i + 1, "rec_title": "", "rec_channel": "", "is_repeat": 0}
+            for i, v in enumerate(vids)]
+
+
+def count(db, table="recs"):
+    return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+PATH = "data/logs/youtube/p/2024-05-01/recs.csv"
+
+
+def test_ingest_reads_only_appended_rows(workdir):
+    write(PATH, recs("w1", ["a", "b"]))
+    db = sqlite_store.connect()
+    assert sqlite_store.ingest_file(db, PATH) == 2
+    assert sqlite_store.ingest_file(db, PATH) == 0
+    write(PATH, recs("w2", ["c"]), mode="a")
+    assert sqlite_store.ingest_file(db, PATH) == 1
+    assert count(db) == 3
+
+
+def test_rewritten_file_replaces_its_rows(workdir):
+    write(PATH, recs("w1", ["a", "b", "c"]))
+    db = sqlite_store.connect()
+    sqlite_store.ingest_file(db, PATH)
+    write(PATH, recs("w9", ["x"]))  # shorter than the stored offset
+    assert sqlite_store.ingest_file(db, PATH) == 1
+    assert [r[0] for r in db.execute("SELECT rec_vid FROM recs")] == ["x"]
+    write(PATH, recs("w8", ["m", "n", "o", "p", "q", "r"]))  # longer, different content
+    assert sqlite_store.ingest_file(db, PATH) == 6
+    assert count(db) == 6
+
+
+def test_rewrite_keeps_other_files_rows(workdir):
+    other = "data/logs/youtube/p/2024-05-02/recs.csv"
+    write(PATH, recs("w1", ["a", "b"]))
+    write(other, recs("w2", ["c"]))
+    db = sqlite_store.connect()
+    for p in (PATH, other):
+        sqlite_store.ingest_file(db, p)
+    write(PATH, recs("w3", ["d"]))
+    sqlite_store.ingest_file(db, PATH)
+    assert sorted(r[0] for r in db.execute("SELECT rec_vid FROM recs")) == ["c", "d"]
+
+
+def test_co_recommended_without_shared_timestamps(workdir):
+    # one row per rec, each with its own ts (as recs.csv has always been written)
+    write(PATH, recs("w1", ["a", "b", "c"]) + recs("w2", ["a", "b"]) + recs("w3", ["c"]))
+    db = sqlite_store.connect()
+    sqlite_store.ingest_file(db, PATH)
+    assert sqlite_store.co_recommended(db, "a") == [("b", 2), ("c", 1)]
+
+
+def test_rewrite_keeps_live_writer_rows(workdir):
+    with sqlite_store.SqliteWriter(flush_rows=1) as live:  # --output sqlite, same partition
+        live.write(os.path.abspath(PATH), RECS_HEADER, recs("live", ["l"]))
+    write(PATH, recs("w1", ["a", "b"]))
+    db = sqlite_store.connect()
+    sqlite_store.ingest_file(db, PATH)
+    write(PATH, recs("w3", ["d"]))
+    sqlite_store.ingest_file(db, PATH)
+    assert sorted(r[0] for r in db.execute("SELECT rec_vid FROM recs")) == ["d", "l"]
+
+
+def test_rewrite_of_a_legacy_file_drops_its_untagged_rows(workdir):
+    write(PATH, recs("w1", ["a", "b", "c"]))
+    db = sqlite_store.connect()
+    sqlite_store.ingest_file(db, PATH)
+    # as ingested before rows kept their source and files their fingerprint
+    db.execute("UPDATE recs SET src = NULL")
+    db.execute("UPDATE _ingested SET fingerprint = NULL")
+    write(PATH, recs("w9", ["x"]))
+    sqlite_store.ingest_file(db, PATH)
+    assert [r[0] for r in db.execute("SELECT rec_vid FROM recs")] == ["x"]
+
+
+def test_ingest_reports_unmatched_files(workdir):
+    write(PATH, recs("w1", ["a"]))
+    write("data/logs/youtube/p/2024-05-01/recs.1.csv", recs("w0", ["z"]))  # rotated: still recs
+    with open("data/logs/youtube/p/2024-05-01/notes.csv", "w", encoding="utf-8") as f:
+        f.write("what,when\nx,y\n")
+    stats = sqlite_store.ingest()
+    assert (stats["files"], stats["rows"]) == (2, 2)
+    assert stats["skipped"] == ["data/logs/youtube/p/2024-05-01/notes.csv"]
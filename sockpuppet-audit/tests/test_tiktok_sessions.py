@@ -0,0 +1,109 @@
+import csv
+
+from harvest import DRAIN_JS
+from ledger import Ledger, session_day, today
+from logwriter import LogWriter
+from tiktok.simple_watch_TT_v4 import run
+
+
+class FakeFeedPage:
+    """Just enough of a Playwright page for run(): every drain yields the next feed item."""
+
+    def __init__(self, feed, ahead=0):
+        self.feed = feed
+        self.ahead = ahead
+        self.queued = []  # ids hydrated but not visible yet
+        self.url = "about:blank"
+
+    def drain(self):
+        """The next video becomes visible; `ahead` more are hydrated past it."""
+        new = []
+        while len(self.queued) < self.ahead + 1:
+            self.queued.append(next(self.feed))
+            new.append(self.queued[-1])
+        return {"items": [{"video_id": v, "sigi": {"author": "creator", "desc": f"clip {v}"}} for v in new],
+                "current": self.queued.pop(0), "total": 1}
+
+    def evaluate(self, js, arg=None):
+        return self.drain() if js == DRAIN_JS else 0
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        return True
+
+    def goto(self, url, **kw):
+        self.url = url
+
+    def on(self, event, fn):
+        pass
+
+    def add_init_script(self, script):
+        pass
+
+    def set_default_navigation_timeout(self, ms):
+        pass
+
+
+class FakeBrowsers:
+    def __init__(self, ahead=0):
+        self.feed = iter(str(7000000000000000000 + i) for i in range(10000))
+        self.ahead = ahead
+
+    def page(self, user_data_dir, headless=False, args=None):
+        return FakeFeedPage(self.feed, self.ahead)
+
+    def recycle(self, user_data_dir):
+        pass
+
+    def close(self):
+        pass
+
+
+def sample(out_csv, session, ahead=0, flush_rows=1, **kw):
+    return run(mode="scrape", max_videos=3, out_csv=out_csv, headless=True, start_url="https://x/foryou",
+               delay_min=0, delay_max=0, user_data_dir="profiles/p", browsers=FakeBrowsers(ahead),
+               flush_rows=flush_rows, mem_interval=0, session=session, **kw)
+
+
+def rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_two_sessions_on_one_date_keep_both(workdir, virtual_clock):
+    out = str(workdir / "data/logs/tiktok/p/feed.csv")
+    assert sample(out, session=0) == 3
+    assert sample(out, session=1) == 3
+    assert len(rows(out)) == 6
+
+    with Ledger() as ledger:
+        first = ledger.resume("tiktok", out, session_day(today(), 0))
+        second = ledger.resume("tiktok", out, session_day(today(), 1))
+    assert first["count"] == 3 and second["count"] == 3
+
+
+def test_resume_skips_a_finished_session(workdir, virtual_clock):
+    out = str(workdir / "data/logs/tiktok/p/feed.csv")
+    sample(out, session=0)
+    assert sample(out, session=0, resume=True) == 0
+    assert len(rows(out)) == 3
+
+
+def test_only_watched_items_count(workdir, virtual_clock):
+    out = str(workdir / "data/logs/tiktok/p/feed.csv")
+    assert sample(out, session=0, ahead=2) == 3
+    watched = rows(out)
+    assert [r["index"] for r in watched] == ["1", "2", "3"]
+    assert [r["video_id"][-1] for r in watched] == ["0", "1", "2"]
+    preloaded = rows(str(workdir / "data/logs/tiktok/p/feed_preloaded.csv"))
+    assert [r["video_id"][-1] for r in preloaded] == ["1", "2", "3", "4"]  # each once, when it loaded
+
+
+def test_failed_log_close_does_not_checkpoint(workdir, virtual_clock, monkeypatch):
+    def broken_close(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(LogWriter, "close", broken_close)
+    out = str(workdir / "data/logs/tiktok/p/feed.csv")
+    sample(out, session=0, flush_rows=100)
+    with Ledger() as ledger:
+        assert ledger.resume("tiktok", out, session_day(today(), 0))["count"] == 0
@@ -0,0 +1,70 @@
+import json
+
+import watchdog
+from instrument import Tracer, set_tracer
+from watchdog import MB, MemoryWatchdog
+
+
+class FakeCDP:
+    def __init__(self, page):
+        self.page = page
+
+    def send(self, method):
+        return {"metrics": [{"name": "JSHeapUsedSize", "value": self.page.heap_mb * MB},
+                            {"name": "Nodes", "value": 10}]}
+
+
+class FakePage:
+    """A page with a settable JS heap and a crash event."""
+
+    def __init__(self, heap_mb=100):
+        self.heap_mb = heap_mb
+        self.handlers = {}
+        self.context = self
+
+    def new_cdp_session(self, page):
+        return FakeCDP(page)
+
+    def on(self, event, fn):
+        self.handlers[event] = fn
+
+
+def watch(monkeypatch, **kw):
+    monkeypatch.setattr(watchdog, "browser_rss", lambda root_pid=None: (500.0, 200.0))
+    wd = MemoryWatchdog("memory.jsonl", interval=1e-9, **kw)
+    reopened = []
+
+    def reopen(level):
+        reopened.append(level)
+        return FakePage()
+
+    return wd, reopened, reopen
+
+
+def test_recycles_past_a_watermark(workdir, monkeypatch):
+    wd, reopened, reopen = watch(monkeypatch, heap_mb=800, level="context")
+    page = FakePage(heap_mb=100)
+    wd.attach(page)
+    assert wd.check(page, reopen) is page and reopened == []
+    page.heap_mb = 900
+    new = wd.check(page, reopen)
+    assert new is not page and reopened == ["context"] and wd.recycles == 1
+    wd.close()
+    with open("memory.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line.get("heap_used_mb") for line in lines] == [100.0, 900.0, None, 100.0]  # last: new baseline
+    assert lines[2]["event"] == "recycle" and lines[2]["reason"] == "heap" and lines[0]["rss_mb"] == 500.0
+
+
+def test_rss_watermark_and_crash(workdir, monkeypatch):
+    tracer = set_tracer(Tracer("youtube", "p"))
+    wd, reopened, reopen = watch(monkeypatch, rss_mb=400)
+    page = FakePage()
+    wd.attach(page)
+    assert wd.over(wd.sample()) == "rss"
+    wd.rss_mb, wd.interval = None, 0  # no sampling: only a crash recycles
+    assert wd.check(page, reopen) is page
+    page.handlers["crash"]()
+    wd.check(page, reopen)
+    assert reopened == ["page"] and tracer.counters == {"recycle": 1}
+    wd.close()
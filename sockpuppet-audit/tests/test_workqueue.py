@@ -0,0 +1,100 @@
+import datetime as dt
+import time
+
+import workqueue
+from workqueue import WorkQueue
+
+
+def job(persona, platform, profile=None):
+    return {"persona": persona, "platform": platform, "keywords": [], "videos_per_day": 3,
+            "user_data_dir": f"profiles/{profile or persona}", "days": 1}
+
+
+def leased(lease):
+    return lease and (lease[1]["persona"], lease[1]["platform"], lease[1]["day"])
+
+
+def test_enqueue_is_idempotent(workdir):
+    with WorkQueue() as q:
+        assert q.enqueue("r", [job("a", "youtube")], 3, {}) == 3
+        assert q.enqueue("r", [job("a", "youtube")], 3, {}) == 0
+
+
+def test_shared_profile_and_later_days_wait(workdir):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube"), job("a", "tiktok"), job("b", "youtube")], 2, {}, back_to_back=True)
+        first, second, third = q.lease("w1"), q.lease("w2"), q.lease("w3")
+        assert leased(first) == ("a", "youtube", 1)
+        assert leased(second) == ("b", "youtube", 1)
+        assert third is None  # a/tiktok shares a's profile; day 2s wait for day 1
+        assert q.complete(first[0], "w1", {"videos": 3, "secs": 1.0, "error": ""}, first[3]) == "done"
+        assert leased(q.lease("w3")) == ("a", "tiktok", 1)
+
+
+def test_days_are_scheduled_on_their_dates(workdir):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube")], 2, {}, start=dt.date.today() - dt.timedelta(days=1))
+        first = q.lease("w1")
+        assert first[1]["session"] == 0
+        q.complete(first[0], "w1", {"videos": 3, "secs": 1.0, "error": ""}, first[3])
+        assert leased(q.lease("w1")) == ("a", "youtube", 2)
+        q.enqueue("later", [job("c", "youtube")], 1, {}, start=dt.date.today() + dt.timedelta(days=1))
+        assert q.lease("w2") is None
+
+
+def test_back_to_back_days_are_separate_sessions(workdir):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube")], 2, {"x": 1}, back_to_back=True)
+        first = q.lease("w1")
+        q.complete(first[0], "w1", {"videos": 3, "secs": 1.0, "error": ""}, first[3])
+        second = q.lease("w1")
+        assert (first[1]["session"], second[1]["session"]) == (0, 1)
+        assert second[2] == {"x": 1}
+
+
+def test_expired_lease_is_requeued_and_late_completion_is_lost(workdir):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube")], 1, {}, back_to_back=True)
+        for w in ("w1", "w2"):
+            q.register(w)
+        dead = q.lease("w1", lease_secs=0.05)
+        time.sleep(0.1)
+        again = q.lease("w2")
+        assert again[0] == dead[0] and again[3] == 2
+        assert not q.heartbeat(dead[0], "w1")
+        assert q.complete(dead[0], "w1", {"videos": 3, "secs": 1.0, "error": ""}, dead[3]) == "lease lost"
+        assert q.complete(again[0], "w2", {"videos": 2, "secs": 1.0, "error": ""}, again[3]) == "done"
+        workers = {w: (jobs, videos) for w, _, jobs, videos, _ in q.status()["workers"]}
+        assert workers == {"w1": (0, 0), "w2": (1, 2)}
+
+
+def test_failed_attempts_retry_then_fail(workdir):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube")], 1, {}, back_to_back=True)
+        for attempt in (1, 2):
+            lease = q.lease("w1")
+            assert lease[3] == attempt
+            expected = "queued" if attempt < 2 else "failed"
+            assert q.complete(lease[0], "w1", {"videos": 0, "error": "Boom"}, attempt, max_attempts=2) == expected
+        assert q.lease("w1") is None
+
+
+def test_worker_stops_the_session_when_its_lease_is_taken(workdir, monkeypatch):
+    with WorkQueue() as q:
+        q.enqueue("r", [job("a", "youtube")], 1, {}, back_to_back=True)
+    seen = {}
+
+    def fake_run_job(spec, opts, stop=None):
+        with WorkQueue() as other:  # as if w1 had stalled past its lease: w2 takes the job over
+            other.requeue_expired(now=time.time() + 60)
+            seen["w2"] = other.lease("w2")
+        seen["stopped"] = stop.wait(5)
+        return {"persona": spec["persona"], "platform": spec["platform"], "videos": 1, "secs": 0.5,
+                "error": "", "startup": ""}
+
+    monkeypatch.setattr(workqueue, "run_job", fake_run_job)
+    totals = workqueue.work(worker="w1", lease_secs=0.3, max_jobs=1, idle_secs=0)
+    assert seen["w2"] is not None and seen["stopped"]
+    assert totals == {"jobs": 1, "videos": 0, "errors": 1}
+    with WorkQueue() as q:
+        assert q.status()["states"] == {"leased": 1}
@@ -1,66 +1,70 @@
 import argparse
-import csv
 import json
 import os
-import random
 import re
-import sys
-import time
-from datetime import datetime
+from collections import OrderedDict
 from pathlib import Path
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import WebDriverException, TimeoutException, JavascriptException
+from archive import Archive
+from browsers import PlaywrightManager
+from capture import FeedCapture
+from clock import get_clock, set_clock, make_clock
+from common import ensure_dir, tiktok_feed_path, ts
+from harvest import FeedHarvester
+from instrument import NullTracer, get_tracer, profiled, session_tracer, set_tracer
+from ledger import Ledger, session_day, today
+from logwriter import open_log_writer
+from seenindex import SeenIndex, tag
+from watchdog import MemoryWatchdog
+import lite
+import sessions
 
 COOKIES_PATH = "cookies.json"
 LSTORAGE_PATH = "localstorage.json"
 
+CHROME_ARGS = [
+    "--lang=en-US,en;q=0.9",
+    "--disable-blink-features=AutomationControlled",
+    "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36",
+]
+
 
 # -------------------------- utils --------------------------
 def human_sleep(a=0.8, b=1.6):
-    time.sleep(random.uniform(a, b))
+    clock = get_clock()
+    clock.sleep(clock.random.uniform(a, b))
 
 
 def ensure_parent(path):
     Path(path).parent.mkdir(parents=True, exist_ok=True)
 
 
-def start_driver(headless: bool):
-    from selenium.webdriver.chrome.options import Options
-
-    options = Options()
-    if headless:
-        options.add_argument("--headless=new")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--window-size=1440,1000")
-    options.add_argument("--lang=en-US,en;q=0.9")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-features=IsolateOrigins,site-per-process")
-    options.add_argument(
-        "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    )
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.set_page_load_timeout(60)
-    return driver
-
-
-def save_cookies_and_storage(driver, cookies_path=COOKIES_PATH, lstorage_path=LSTORAGE_PATH):
+def open_page(browsers, headless, user_data_dir=None, lite_mode=False):
+    """
+    Fresh page in the persistent context of user_data_dir (kept warm by the
+    PlaywrightManager); without a user_data_dir the profile is a throwaway one.
+    """
+    args = CHROME_ARGS + (lite.CHROME_ARGS if lite_mode else [])
+    page = browsers.page(user_data_dir or "", headless, args)
+    page.set_default_navigation_timeout(60000)
+    return page
+
+
+def save_cookies_and_storage(page, cookies_path=COOKIES_PATH, lstorage_path=LSTORAGE_PATH, persona=None):
+    if persona:
+        path = sessions.save(persona, sessions.snapshot(page, sessions.load(persona)))
+        print(f"✅ Saved session for {persona} -> {os.path.abspath(path)}")
+        return
+
     ensure_parent(cookies_path)
     with open(cookies_path, "w", encoding="utf-8") as f:
-        json.dump(driver.get_cookies(), f, indent=2)
+        json.dump(page.context.cookies(), f, indent=2)
 
     try:
-        ls = driver.execute_script(
-            "var s={}; for (var i=0;i<localStorage.length;i++){var k=localStorage.key(i); s[k]=localStorage.getItem(k);} return s;"
-        )
-    except JavascriptException:
+        ls = page.evaluate(sessions.LOCAL_STORAGE_JS)
+    except Exception:
         ls = {}
     ensure_parent(lstorage_path)
     with open(lstorage_path, "w", encoding="utf-8") as f:
@@ -68,109 +72,151 @@ def save_cookies_and_storage(driver, cookies_path=COOKIES_PATH, lstorage_path=LS
     print(f"✅ Saved cookies -> {os.path.abspath(cookies_path)} and localStorage -> {os.path.abspath(lstorage_path)}")
 
 
-def load_cookies_and_storage(driver, cookies_path=COOKIES_PATH, lstorage_path=LSTORAGE_PATH):
-    driver.get("https://www.tiktok.com/")
-    human_sleep(1.0, 1.6)
-
-    if os.path.exists(lstorage_path):
-        with open(lstorage_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        for k, v in data.items():
-            try:
-                driver.execute_script("localStorage.setItem(arguments[0], arguments[1]);", k, v)
-            except JavascriptException:
-                pass
-
-    if os.path.exists(cookies_path):
-        with open(cookies_path, "r", encoding="utf-8") as f:
-            cookies = json.load(f)
-        for c in cookies:
-            c = {k: v for k, v in c.items() if k in {"name", "value", "domain", "path", "expiry", "httpOnly", "secure", "sameSite"}}
-            try:
-                driver.add_cookie(c)
-            except WebDriverException:
-                try:
-                    c.pop("domain", None)
-                    driver.add_cookie(c)
-                except WebDriverException:
-                    pass
-
-    driver.get("https://www.tiktok.com/foryou")
-    human_sleep(1.2, 2.0)
-
-
-def dismiss_banners(driver):
+def load_cookies_and_storage(page, cookies_path=COOKIES_PATH, lstorage_path=LSTORAGE_PATH, persona=None):
+    """
+    Bulk-restore the persona's saved session (or the shared cookies.json /
+    localstorage.json without a persona). Does not navigate: the restored state
+    applies to the caller's next page.goto(). Returns False if nothing was saved.
+    """
+    snap = sessions.load(persona) if persona else sessions.from_legacy(cookies_path, lstorage_path)
+    if not snap or not (snap.get("cookies") or snap.get("local_storage")):
+        return False
+    sessions.restore(page, snap)
+    return True
+
+
+def dismiss_banners(page):
     try:
-        driver.execute_script(
+        page.evaluate(
             """
-          const btns=[...document.querySelectorAll('button')];
-          const targets=['accept all','accept','ok','agree','allow'];
-          for (const b of btns){
-            const t=(b.textContent||'').trim().toLowerCase();
-            if (targets.some(x=>t.includes(x))) { try{ b.click(); }catch(e){} }
+          () => {
+            const btns=[...document.querySelectorAll('button')];
+            const targets=['accept all','accept','ok','agree','allow'];
+            for (const b of btns){
+              const t=(b.textContent||'').trim().toLowerCase();
+              if (targets.some(x=>t.includes(x))) { try{ b.click(); }catch(e){} }
+            }
           }
         """
         )
-    except JavascriptException:
+    except Exception:
         pass
 
 
 # -------------------------- JSON helpers --------------------------
-def _read_sigi_json(driver):
-    """Return TikTok's JSON from <script id="SIGI_STATE"> as dict, or None."""
-    try:
-        js = "var el=document.querySelector('#SIGI_STATE'); return el?el.textContent:'';"
-        txt = driver.execute_script(js) or ""
-        if not txt.strip():
-            return None
-        return json.loads(txt)
-    except Exception:
-        return None
+class ItemCache:
+    """
+    Parsed SIGI_STATE ItemModule entries keyed by aweme id, bounded LRU.
+    The page only sends entries that are new or changed since its last read
+    (see EXTRACT_JS), so keeping them here costs O(new items) per extraction
+    instead of re-parsing the whole, ever-growing SIGI_STATE blob.
+    """
 
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
 
-def _pick_visible_video_id(driver):
-    """Best-effort: aweme id of the currently visible video."""
-    try:
-        js = r"""
-        (() => {
-          const vids = Array.from(document.querySelectorAll('video'));
-          if (!vids.length) return "";
-          const area = v => { const r=v.getBoundingClientRect();
-            const vw=Math.max(document.documentElement.clientWidth,window.innerWidth||0);
-            const vh=Math.max(document.documentElement.clientHeight,window.innerHeight||0);
-            const ix=Math.max(0,Math.min(r.right,vw)-Math.max(r.left,0));
-            const iy=Math.max(0,Math.min(r.bottom,vh)-Math.max(r.top,0));
-            return ix*iy; };
-          let active = document.querySelector("[data-e2e='feed-active-video']");
-          if (!active) active = vids.map(v=>[v,area(v)]).sort((a,b)=>b[1]-a[1]).map(x=>x[0])[0];
-          if (!active) return "";
-          const item = active.closest("[data-e2e='video-feed-item']") || active.closest("article") || active.parentElement;
-          if (item && item.dataset){
-            if (item.dataset.awemeId) return item.dataset.awemeId;
-            if (item.dataset.videoId) return item.dataset.videoId;
-          }
-          const a = (item && item.querySelector("a[href*='/video/']")) || document.querySelector("a[href*='/video/']");
-          if (a && a.href){
-            const m = a.href.match(/\/video\/(\d+)/);
-            if (m) return m[1];
-          }
-          const m2 = (location.href||"").match(/\/video\/(\d+)/);
-          return m2 ? m2[1] : "";
-        })();
-        """
-        return driver.execute_script(js) or ""
-    except Exception:
-        return ""
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, vid_id):
+        itm = self.items.get(vid_id)
+        if itm is not None:
+            self.items.move_to_end(vid_id)
+        return itm
+
+    def update(self, entries):
+        for vid_id, itm in (entries or {}).items():
+            if not itm:
+                continue
+            self.items[vid_id] = itm
+            self.items.move_to_end(vid_id)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+
+# One in-page evaluation returns the visible item's id, the ItemModule entries
+# that are new or changed since the last call (plus the visible item's own
+# entry) and the DOM fields used to fill gaps. SIGI_STATE is parsed in the
+# page, and only when its text changed.
+EXTRACT_JS = r"""
+() => {
+  const out = {video_id: "", sigi: {}, first_id: "", current: null, dom: {}};
+  const st = window.__sigiDelta || (window.__sigiDelta = {txt: null, mod: {}, hashes: {}});
+  const sigiEl = document.querySelector('#SIGI_STATE');
+  const txt = sigiEl ? sigiEl.textContent : "";
+  if (txt !== st.txt) {
+    st.txt = txt;
+    try { st.mod = (JSON.parse(txt) || {}).ItemModule || {}; } catch (e) { st.mod = {}; }
+    const fnv = s => { let h = 0x811c9dc5; for (let i = 0; i < s.length; i++) { h ^= s.charCodeAt(i); h = Math.imul(h, 0x01000193); } return h >>> 0; };
+    for (const [id, itm] of Object.entries(st.mod)) {
+      const h = fnv(JSON.stringify(itm));
+      if (st.hashes[id] !== h) { st.hashes[id] = h; out.sigi[id] = itm; }
+    }
+  }
+  out.first_id = Object.keys(st.mod)[0] || "";
+  const done = () => { out.current = st.mod[out.video_id || out.first_id] || null; return out; };
+
+  function pick(root, sels){
+    for (const s of sels){
+      const el = root ? root.querySelector(s) : document.querySelector(s);
+      if (el) return el;
+    }
+    return null;
+  }
+  const vids = Array.from(document.querySelectorAll('video'));
+  if (!vids.length) return done();
+  const area = v => { const r=v.getBoundingClientRect();
+    const vw=Math.max(document.documentElement.clientWidth,window.innerWidth||0);
+    const vh=Math.max(document.documentElement.clientHeight,window.innerHeight||0);
+    const ix=Math.max(0,Math.min(r.right,vw)-Math.max(r.left,0));
+    const iy=Math.max(0,Math.min(r.bottom,vh)-Math.max(r.top,0));
+    return ix*iy; };
+  let active = document.querySelector("[data-e2e='feed-active-video']");
+  if (!active) active = vids.map(v=>[v,area(v)]).sort((a,b)=>b[1]-a[1]).map(x=>x[0])[0];
+  if (!active) return done();
+  const item = active.closest("[data-e2e='video-feed-item']") || active.closest("article") || active.parentElement;
+  const a = (item && item.querySelector("a[href*='/video/']")) || document.querySelector("a[href*='/video/']");
+
+  // best-effort aweme id of the visible video
+  if (item && item.dataset && (item.dataset.awemeId || item.dataset.videoId)) {
+    out.video_id = item.dataset.awemeId || item.dataset.videoId;
+  } else {
+    const m = ((a && a.href) || "").match(/\/video\/(\d+)/) || (location.href||"").match(/\/video\/(\d+)/);
+    out.video_id = m ? m[1] : "";
+  }
+
+  const dom = out.dom;
+  dom.video_src = active.currentSrc || active.src || "";
+  dom.is_paused = !!active.paused;
+  dom.post_url = a ? a.href : "";
+
+  let author = (item && pick(item, ["[data-e2e='video-author-uniqueid']"])) || pick(document, ["[data-e2e='video-author-uniqueid']"]);
+  if (!author) {
+    author = (item && Array.from(item.querySelectorAll('a')).find(x => (x.getAttribute('href')||'').startsWith('/@'))) ||
+             Array.from(document.querySelectorAll('a')).find(x => (x.getAttribute('href')||'').startsWith('/@'));
+  }
+  dom.author_handle = author ? (author.textContent||"").trim() : "";
+
+  let cap = (item && pick(item, ["[data-e2e='browse-video-desc']","[data-e2e='video-desc']","h1","p"])) ||
+            pick(document, ["[data-e2e='browse-video-desc']","[data-e2e='video-desc']"]);
+  dom.caption = cap ? (cap.textContent||"").trim() : "";
+
+  let mus = (item && pick(item, ["[data-e2e='browse-music']","[data-e2e='music-title']","a[href*='/music/']"])) ||
+            pick(document, ["[data-e2e='browse-music']","[data-e2e='music-title']","a[href*='/music/']"]);
+  dom.music_title = mus ? (mus.textContent||"").trim() : "";
+
+  dom.duration_sec = Number.isFinite(active.duration) ? String(active.duration) : "";
+  return done();
+}
+"""
 
 
 # -------------------------- extractor --------------------------
-def extract_current_video(driver):
+def item_fields(vid_id, itm=None, dom=None, netcap=None):
     """
-    JSON-first extractor via SIGI_STATE, with DOM fallback.
-
-    Fills:
-      video_id, post_url, video_src, duration_sec, author_handle, caption,
-      like_count, comment_count, share_count, music_title, is_paused
+    Logged fields for one feed item: its SIGI_STATE ItemModule entry first,
+    then captured feed responses (netcap), then the DOM fields to fill gaps.
     """
 
     def norm_count(s):
@@ -189,7 +235,7 @@ def extract_current_video(driver):
         return str(int(round(n)))
 
     data = {
-        "video_id": "",
+        "video_id": vid_id or "",
         "post_url": "",
         "video_src": "",
         "duration_sec": "",
@@ -203,91 +249,42 @@ def extract_current_video(driver):
     }
 
     # 1) SIGI_STATE JSON (stable metadata)
-    state = _read_sigi_json(driver)
-    vid_id = _pick_visible_video_id(driver)
-
-    if state:
-        item_module = state.get("ItemModule") or {}
-        if not vid_id and item_module:
-            vid_id = next(iter(item_module.keys()), "")
+    if itm:
+        author = itm.get("author") or itm.get("authorUniqueId") or ""
+        if author and not author.startswith("@"):
+            author = "@" + author
+        data["author_handle"] = author or data["author_handle"]
 
-        if vid_id and vid_id in item_module:
-            itm = item_module[vid_id] or {}
-            data["video_id"] = vid_id
+        data["caption"] = itm.get("desc") or data["caption"]
 
-            author = itm.get("author") or itm.get("authorUniqueId") or ""
-            if author and not author.startswith("@"):
-                author = "@" + author
-            data["author_handle"] = author or data["author_handle"]
+        stats = itm.get("stats") or {}
+        data["like_count"] = norm_count(stats.get("diggCount"))
+        data["comment_count"] = norm_count(stats.get("commentCount"))
+        data["share_count"] = norm_count(stats.get("shareCount"))
 
-            data["caption"] = itm.get("desc") or data["caption"]
+        music = itm.get("music") or {}
+        data["music_title"] = music.get("title") or data["music_title"]
 
-            stats = itm.get("stats") or {}
-            data["like_count"] = norm_count(stats.get("diggCount"))
-            data["comment_count"] = norm_count(stats.get("commentCount"))
-            data["share_count"] = norm_count(stats.get("shareCount"))
+        video_obj = itm.get("video") or {}
+        if video_obj.get("duration"):
+            data["duration_sec"] = str(video_obj.get("duration"))
 
-            music = itm.get("music") or {}
-            data["music_title"] = music.get("title") or data["music_title"]
+        if itm.get("author") and vid_id:
+            data["post_url"] = f"https://www.tiktok.com/@{itm['author']}/video/{vid_id}"
 
-            video_obj = itm.get("video") or {}
-            if video_obj.get("duration"):
-                data["duration_sec"] = str(video_obj.get("duration"))
-
-            if itm.get("author") and vid_id:
-                data["post_url"] = f"https://www.tiktok.com/@{itm['author']}/video/{vid_id}"
+    # 1b) captured item_list/recommend JSON
+    if netcap and vid_id:
+        cap = netcap.get(vid_id)
+        if cap:
+            for k, v in cap.items():
+                if not data.get(k) and v:
+                    data[k] = norm_count(v) if k.endswith("_count") else v
 
     # 2) DOM fallback to fill gaps
-    try:
-        dom_js = r"""
-        (() => {
-          const out = {};
-          function pick(root, sels){
-            for (const s of sels){
-              const el = root ? root.querySelector(s) : document.querySelector(s);
-              if (el) return el;
-            }
-            return null;
-          }
-          const vids = Array.from(document.querySelectorAll('video'));
-          if (!vids.length) return out;
-          let active = document.querySelector("[data-e2e='feed-active-video']");
-          const area = v => { const r=v.getBoundingClientRect(); const vw=Math.max(document.documentElement.clientWidth,window.innerWidth||0); const vh=Math.max(document.documentElement.clientHeight,window.innerHeight||0); const ix=Math.max(0,Math.min(r.right,vw)-Math.max(r.left,0)); const iy=Math.max(0,Math.min(r.bottom,vh)-Math.max(r.top,0)); return ix*iy; };
-          if (!active) active = vids.map(v=>[v,area(v)]).sort((a,b)=>b[1]-a[1]).map(x=>x[0])[0];
-          if (!active) return out;
-          const item = active.closest("[data-e2e='video-feed-item']") || active.closest("article") || active.parentElement;
-
-          out.video_src = active.currentSrc || active.src || "";
-          out.is_paused = !!active.paused;
-
-          const a = (item && item.querySelector("a[href*='/video/']")) || document.querySelector("a[href*='/video/']");
-          out.post_url = a ? a.href : "";
-
-          let author = (item && pick(item, ["[data-e2e='video-author-uniqueid']"])) || pick(document, ["[data-e2e='video-author-uniqueid']"]);
-          if (!author) {
-            author = (item && Array.from(item.querySelectorAll('a')).find(x => (x.getAttribute('href')||'').startsWith('/@'))) ||
-                     Array.from(document.querySelectorAll('a')).find x => (x.getAttribute('href')||'').startsWith('/@'));
-          }
-          out.author_handle = author ? (author.textContent||"").trim() : "";
-
-          let cap = (item && pick(item, ["[data-e2e='browse-video-desc']","[data-e2e='video-desc']","h1","p"])) ||
-                    pick(document, ["[data-e2e='browse-video-desc']","[data-e2e='video-desc']"]);
-          out.caption = cap ? (cap.textContent||"").trim() : "";
-
-          let mus = (item && pick(item, ["[data-e2e='browse-music']","[data-e2e='music-title']","a[href*='/music/']"])) ||
-                    pick(document, ["[data-e2e='browse-music']","[data-e2e='music-title']","a[href*='/music/']"]);
-          out.music_title = mus ? (mus.textContent||"").trim() : "";
-
-          out.duration_sec = Number.isFinite(active.duration) ? String(active.duration) : "";
-          return out;
-        })();
-        """
-        dom = driver.execute_script(dom_js) or {}
-        for k in ["video_src", "is_paused", "post_url", "author_handle", "caption", "music_title", "duration_sec"]:
-            if not data.get(k) and dom.get(k) not in (None, ""):
-                data[k] = dom.get(k)
-    except Exception:
-        pass
+    dom = dom or {}
+    for k in ["video_src", "is_paused", "post_url", "author_handle", "caption", "music_title", "duration_sec"]:
+        if not data.get(k) and dom.get(k) not in (None, ""):
+            data[k] = dom.get(k)
 
     if not data["post_url"] and data["author_handle"] and data["video_id"]:
         handle = data["author_handle"]
@@ -301,218 +298,527 @@ def extract_current_video(driver):
     return data
 
 
+def extract_current_video(page, netcap=None, cache=None):
+    """
+    JSON-first extractor for the visible video via SIGI_STATE (or captured
+    feed responses when netcap is given), with DOM fallback; one page round
+    trip. The harvester (harvest.py) is the main path; this covers markup it
+    doesn't recognize. Pass the session's ItemCache as `cache` so entries
+    already sent by the page are not sent again.
+
+    Fills:
+      video_id, post_url, video_src, duration_sec, author_handle, caption,
+      like_count, comment_count, share_count, music_title, is_paused
+    """
+    try:
+        raw = page.evaluate(EXTRACT_JS) or {}
+    except Exception:
+        raw = {}
+
+    cache = cache if cache is not None else ItemCache()
+    cache.update(raw.get("sigi"))
+    vid_id = raw.get("video_id") or raw.get("first_id") or ""
+    itm = (cache.get(vid_id) or raw.get("current")) if vid_id else None
+    return item_fields(vid_id, itm, raw.get("dom"), netcap)
+
+
+# markup of the visible feed item, for the archive when the harvester missed it
+VISIBLE_ITEM_HTML_JS = r"""
+() => {
+  const v = document.querySelector("[data-e2e='feed-active-video']") || document.querySelector('video');
+  const item = v && (v.closest("[data-e2e='video-feed-item']") || v.closest('article') || v.parentElement);
+  return item ? item.outerHTML : "";
+}
+"""
+
+
 # -------------------------- scrolling --------------------------
-def scroll_next(driver, attempts=5):
+SCROLL_JS = r"""
+() => {
+  const feed=document.querySelector('[data-e2e="scroll-list"]')
+           ||document.querySelector('[data-e2e="browse-feed"]');
+  if (feed){
+    const b=feed.scrollTop;
+    feed.scrollBy(0, Math.max(600, feed.clientHeight*0.9));
+    return b;
+  }
+  const b=window.pageYOffset || document.documentElement.scrollTop;
+  window.scrollBy(0, 900);
+  return b;
+}
+"""
+MOVED_JS = r"""
+(prev) => {
+  const feed=document.querySelector('[data-e2e="scroll-list"]')
+           ||document.querySelector('[data-e2e="browse-feed"]');
+  const now = feed ? feed.scrollTop : (window.pageYOffset || document.documentElement.scrollTop);
+  return now - prev > 40;
+}
+"""
+
+
+def scroll_next(page, attempts=5, wait_ms=1500):
     """
     Scroll the TikTok feed container if present; else window/END key.
-    Returns True if scroll position changed meaningfully.
+    Returns True if scroll position changed meaningfully. Each attempt waits
+    in the page for the position to move (returns as soon as it does).
     """
-    # Try container scroll
-    before = driver.execute_script(
-        """
-        const feed=document.querySelector('[data-e2e="scroll-list"]')
-                 ||document.querySelector('[data-e2e="browse-feed"]');
-        if (feed){
-          const b=feed.scrollTop;
-          feed.scrollBy(0, Math.max(600, feed.clientHeight*0.9));
-          return ['container', b];
-        } else {
-          const b=window.pageYOffset || document.documentElement.scrollTop;
-          window.scrollBy(0, 900);
-          return ['window', b];
-        }
-        """
-    )
-    mode, prev = before[0], before[1]
+    prev = page.evaluate(SCROLL_JS)
 
     for _ in range(attempts):
-        human_sleep(1.0, 1.8)
-        after = driver.execute_script(
-            """
-            const feed=document.querySelector('[data-e2e="scroll-list"]')
-                     ||document.querySelector('[data-e2e="browse-feed"]');
-            if (feed){
-              return ['container', feed.scrollTop];
-            } else {
-              return ['window', window.pageYOffset || document.documentElement.scrollTop];
-            }
-            """
-        )
-        now_mode, now_val = after[0], after[1]
-        if now_val - prev > 40:
+        try:
+            page.wait_for_function(MOVED_JS, arg=prev, timeout=wait_ms)
             return True
+        except Exception:
+            pass
 
         # gentle fallback nudges
+        get_tracer().count("scroll_nudge")
         try:
-            driver.find_element(By.TAG_NAME, "body").send_keys(Keys.END)
+            page.keyboard.press("End")
         except Exception:
             pass
         try:
-            driver.execute_script("window.scrollBy(0, 800);")
+            page.evaluate("window.scrollBy(0, 800)")
         except Exception:
             pass
 
+    get_tracer().count("scroll_fail")
     return False
 
 
 # -------------------------- IO helpers --------------------------
-def open_csv_writer(out_csv):
-    ensure_parent(out_csv)
-    file_obj = open(out_csv, "w", newline="", encoding="utf-8")
-    fieldnames = [
-        "ts_iso",
-        "index",
-        "video_id",
-        "post_url",
-        "video_src",
-        "duration_sec",
-        "author_handle",
-        "caption",
-        "like_count",
-        "comment_count",
-        "share_count",
-        "music_title",
-        "is_paused",
-    ]
-    writer = csv.DictWriter(file_obj, fieldnames=fieldnames)
-    writer.writeheader()
-    file_obj.flush()
-    return file_obj, writer, fieldnames
-
-
-def do_login_and_save(driver, timeout_min=5):
+FEED_HEADER = [
+    "ts_iso",
+    "index",
+    "video_id",
+    "post_url",
+    "video_src",
+    "duration_sec",
+    "author_handle",
+    "caption",
+    "like_count",
+    "comment_count",
+    "share_count",
+    "music_title",
+    "is_paused",
+    "is_repeat",  # 1 if this persona was shown the video in an earlier row/session (seenindex)
+]
+
+
+def do_login_and_save(page, timeout_min=5, persona=None):
     print("Opening TikTok login… Complete login **manually** in the browser window.")
-    driver.get("https://www.tiktok.com/login")
-    start = time.time()
-    while time.time() - start < timeout_min * 60:
-        if "tiktok.com/login" not in driver.current_url and driver.get_cookies():
-            save_cookies_and_storage(driver)
+    page.goto("https://www.tiktok.com/login")
+    clock = get_clock()
+    start = clock.monotonic()
+    while clock.monotonic() - start < timeout_min * 60:
+        if "tiktok.com/login" not in page.url and page.context.cookies():
+            save_cookies_and_storage(page, persona=persona)
             print("✅ Login detected & session saved.")
             return
         human_sleep(1.0, 1.8)
-    raise TimeoutException("Login not detected within the time window.")
+    raise TimeoutError("Login not detected within the time window.")
 
 
 # -------------------------- main loop --------------------------
-def run(mode, max_videos, out_csv, headless, start_url, delay_min, delay_max):
-    driver = start_driver(headless=headless)
-    csv_file = None
+TT_RECS_HEADER = ["ts_iso", "batch", "rank", "video_id", "author_handle", "caption", "is_repeat"]
+TT_PRELOADED_HEADER = ["ts_iso", "video_id", "post_url", "duration_sec", "author_handle", "caption", "like_count",
+                       "comment_count", "share_count", "music_title", "is_repeat"]
+
+
+def run(mode, max_videos, out_csv, headless, start_url, delay_min, delay_max, user_data_dir=None,
+        capture=False, flush_rows=20, flush_secs=10.0, output="csv", lite_mode=False, browsers=None,
+        persona=None, resume=False, trace=False, metrics_dir=None, archive_dir=None,
+        mem_heap_mb=None, mem_rss_mb=None, mem_interval=30.0, mem_recycle="page", session=0,
+        stop=None):
+    """
+    Sample the feed into out_csv and return the number of rows written.
+
+    Rows are the videos the persona watched: the visible item at each step,
+    dwelled on before scrolling, so max_videos counts watches. Items the
+    in-page harvester (harvest.py) pushes ahead of the viewport go to
+    <out_csv>_preloaded.csv when first seen (once per run) and to out_csv only
+    when they are watched.
+
+    Progress (count, seen ids) is checkpointed in the ledger under the persona
+    (or out_csv), today's date and `session` (the run's index among the date's
+    runs, e.g. --days); with resume an interrupted run continues from there
+    instead of starting over. Rows are always appended, so earlier runs of the
+    date stay in out_csv. Setting the `stop` event (threading.Event) ends the
+    run before its next step.
+
+    The persistent profile in user_data_dir carries the login. With persona,
+    it is also restored from and saved back to that persona's session store
+    (sessions.py); without either, the shared cookies.json/localstorage.json
+    are used.
+    With capture, feed API responses fill the rows and every recommended batch
+    is logged to <out_csv>_recs.csv. With lite_mode, images/fonts/trackers are
+    blocked, playback is muted and per-session stats go to <out_csv>_lite.jsonl.
+    Pass a PlaywrightManager as `browsers` to keep Chromium warm across runs
+    (each run gets a fresh page); otherwise one is launched and closed here.
+    With trace, per-phase spans and counters go to <out_csv>_trace.jsonl; with
+    metrics_dir, a Prometheus textfile is written there when the run ends.
+    With archive_dir, each row's SIGI_STATE entry and item markup (and, with
+    capture, the feed responses) are archived for re-extraction (archive.py).
+    Every mem_interval seconds (0 = off) JS heap, DOM and browser RSS are
+    sampled to <out_csv>_memory.jsonl; past mem_heap_mb / mem_rss_mb (or after
+    a renderer crash) the page or, with mem_recycle="context", the whole
+    browser is recycled and the feed reopened (seen ids keep rows unique).
+    """
+    abs_csv = os.path.abspath(out_csv)
+    tracer = session_tracer("tiktok", persona or "default",
+                            os.path.splitext(abs_csv)[0] + "_trace.jsonl" if trace else None, metrics_dir)
+    own = browsers is None
+    browsers = browsers or PlaywrightManager()
+    log = ledger = seen_feed = seen_recs = seen_ahead = arc = wd = None
+    count = start = 0
     try:
-        if mode == "login":
-            do_login_and_save(driver)
-            return
+        with tracer.span("browser_start"):
+            page = open_page(browsers, headless, user_data_dir, lite_mode)
+        stats = None
+        if lite_mode:
+            stats = lite.LiteStats()
+            lite.attach_playwright(page, stats)
 
-        if not os.path.exists(COOKIES_PATH):
-            raise RuntimeError("Run first with --mode login to save cookies.")
+        if mode == "login":
+            do_login_and_save(page, persona=persona)
+            return count
+
+        use_store = bool(persona) or not user_data_dir
+        # bulk restore (cookies + one init script); start_url is the only navigation
+        with tracer.span("restore_session"):
+            restored = use_store and load_cookies_and_storage(page, persona=persona)
+        if use_store and not restored and not user_data_dir:
+            who = f" --persona {persona}" if persona else ""
+            raise RuntimeError(f"Run first with --mode login{who} to save cookies.")
+
+        key, day = persona or abs_csv, today()
+        ledger_day = session_day(day, session)
+        ledger = Ledger()
+        state = ledger.resume("tiktok", key, ledger_day) if resume else None
+        if state and state["count"] >= max_videos:
+            print(f"✅ {day} already complete ({state['count']} rows in {abs_csv}).")
+            return 0
+        if state:
+            count = start = state["count"]
+            print(f"↩️  Resuming at row {count + 1} ({len(state['seen'])} videos already seen)")
+        else:
+            ledger.start("tiktok", key, ledger_day)
 
-        abs_csv = os.path.abspath(out_csv)
         print(f"📄 Writing CSV to: {abs_csv}")
-        csv_file, writer, fieldnames = open_csv_writer(abs_csv)
-
-        load_cookies_and_storage(driver)
-        human_sleep(1.0, 1.6)
-        driver.get(start_url)
+        log = open_log_writer(output, abs_csv + ".journal", flush_rows, flush_secs, platform="tiktok",
+                              persona=persona)
+        seen_feed = SeenIndex.open("tiktok", persona or "default", "watched")
+        seen_recs = SeenIndex.open("tiktok", persona or "default", "recs")
+        seen_ahead = SeenIndex.open("tiktok", persona or "default", "preloaded")
+        # progress and seen ids are durable only once their rows are
+        log.after_flush += [ledger.commit, seen_feed.flush, seen_recs.flush, seen_ahead.flush]
+        log.open(abs_csv, FEED_HEADER)  # earlier sessions of the date stay in the file
+        preloaded_csv = os.path.splitext(abs_csv)[0] + "_preloaded.csv"
+        log.open(preloaded_csv, TT_PRELOADED_HEADER)
+        if archive_dir:
+            arc = Archive(archive_dir)
+            log.after_flush.append(arc.flush)
+        recs_csv = os.path.splitext(abs_csv)[0] + "_recs.csv"
+        netcap = None
+        if capture:
+            netcap = FeedCapture(keep_raw=bool(arc))
+            netcap.attach(page)
+            log.open(recs_csv, TT_RECS_HEADER)
+
+        harvester = FeedHarvester(keep_html=bool(arc))
+        harvester.attach(page)
+        wd = MemoryWatchdog(os.path.splitext(abs_csv)[0] + "_memory.jsonl" if mem_interval else None,
+                            mem_heap_mb, mem_rss_mb, mem_interval, mem_recycle,
+                            platform="tiktok", persona=persona or "default")
+        wd.attach(page)
+
+        def reopen(level):
+            # The feed can't be re-entered mid-scroll: reopen it on a fresh renderer
+            if level == "context":
+                if use_store:
+                    try:
+                        save_cookies_and_storage(page, persona=persona)
+                    except Exception:
+                        pass  # crashed renderer: fall back to the last saved session
+                browsers.recycle(user_data_dir or "")
+            new = open_page(browsers, headless, user_data_dir, lite_mode)
+            if stats:
+                lite.attach_playwright(new, stats)
+            if level == "context" and use_store:
+                load_cookies_and_storage(new, persona=persona)
+            if netcap:
+                netcap.attach(new)
+            harvester.attach(new)
+            with tracer.span("goto"):
+                new.goto(start_url)
+            human_sleep(2.0, 3.0)
+            dismiss_banners(new)
+            return new
+
+        with tracer.span("goto"):
+            page.goto(start_url)
         human_sleep(2.0, 3.0)
-        dismiss_banners(driver)
+        dismiss_banners(page)
 
-        seen = set()
-        count = 0
+        seen = set(state["seen"]) if state else set()
+        items = ItemCache()
+        ahead = ItemCache(256)  # harvested rows (and markup) of items not watched yet
+        preloaded_ids = set()
         no_progress_strikes = 0
         MAX_STRIKES = 10  # stop if we fail to progress 10 times in a row
+        hydrating = True  # the first step waits for the feed to render
 
         while count < max_videos:
-            # up to 3 attempts to let the page hydrate
-            attempts = 0
-            row_data = {}
-            while attempts < 3:
-                human_sleep(0.6, 1.2)
-                row_data = extract_current_video(driver)
-                if any(row_data.get(k) for k in ("video_id", "post_url", "author_handle")):
-                    break
-                attempts += 1
-
-            if not any(row_data.get(k) for k in ("video_id", "post_url", "author_handle")):
+            if stop is not None and stop.is_set():
+                tracer.count("stopped")
+                break
+            recycled = wd.check(page, reopen)
+            if recycled is not page:
+                page, hydrating = recycled, True
+            for b, batch, raw in (netcap.poll() if netcap else []):
+                now = ts()
+                with tracer.span("log_write"):
+                    log.write(recs_csv, TT_RECS_HEADER, tag([
+                        {"ts_iso": now, "batch": b, "rank": i + 1, "video_id": itm["video_id"],
+                         "author_handle": itm["author_handle"], "caption": itm["caption"]}
+                        for i, itm in enumerate(batch)], seen_recs, "video_id"))
+                if arc:
+                    arc.record("tiktok", persona or "default", day, {
+                        "kind": "response", "ts": now, "batch": b,
+                        "blobs": {"response": arc.put_json(raw)}})
+
+            # items the page pushed since the last step; block only while the visible one isn't hydrated
+            with tracer.span("harvest"):
+                harvested = harvester.drain(page)
+                current = harvested["current"]
+                if not harvested["items"] and (hydrating or (current and current not in seen)):
+                    tracer.count("harvest_wait")
+                    harvested = harvester.wait(page)
+                    current = harvested["current"]
+            hydrating = False
+            items.update({h["video_id"]: h["sigi"] for h in harvested["items"] if h.get("sigi")})
+            fresh = {}
+            for h in harvested["items"]:
+                vid = h["video_id"]
+                fresh[vid] = {"fields": item_fields(vid, items.get(vid), h.get("dom"), netcap), "html": h.get("html")}
+            ahead.update(fresh)
+            preloaded = [v["fields"] for vid, v in fresh.items()
+                         if vid != current and vid not in seen and vid not in preloaded_ids]
+            if preloaded:
+                preloaded_ids.update(d["video_id"] for d in preloaded)
+                now = ts()
+                with tracer.span("log_write"):
+                    log.write(preloaded_csv, TT_PRELOADED_HEADER, tag([
+                        {"ts_iso": now, **{k: d.get(k, "") for k in TT_PRELOADED_HEADER[1:-1]}}
+                        for d in preloaded], seen_ahead, "video_id"))
+                tracer.count("preloaded", len(preloaded))
+
+            # only the visible item is watched
+            watching = ahead.get(current) if current else None
+            found = [watching["fields"]] if watching else []
+            markup = {current: watching["html"]} if watching and watching["html"] else {}
+            if not found and current not in seen:
+                # feed markup the harvester doesn't recognize: read the visible video
+                tracer.count("harvest_fallback")
+                with tracer.span("extract"):
+                    found = [extract_current_video(page, netcap, items)]
+                if arc and found[0]["video_id"]:
+                    markup[found[0]["video_id"]] = page.evaluate(VISIBLE_ITEM_HTML_JS)
+            found = [d for d in found if any(d.get(k) for k in ("video_id", "post_url", "author_handle"))]
+
+            if not found and current not in seen:
+                tracer.count("extraction_miss")
                 no_progress_strikes += 1
                 if no_progress_strikes >= MAX_STRIKES:
                     print("⚠️  No progress after multiple attempts; stopping.")
                     break
-                scroll_next(driver)
+                with tracer.span("scroll_next"):
+                    scroll_next(page)
                 continue
 
-            vid = row_data.get("video_id", "")
-            if vid and vid in seen:
-                scroll_next(driver)
-                continue
-            if vid:
-                seen.add(vid)
-
-            row = {
-                "ts_iso": datetime.utcnow().isoformat(),
-                "index": count + 1,
-                "video_id": row_data.get("video_id", ""),
-                "post_url": row_data.get("post_url", ""),
-                "video_src": row_data.get("video_src", ""),
-                "duration_sec": row_data.get("duration_sec", ""),
-                "author_handle": row_data.get("author_handle", ""),
-                "caption": row_data.get("caption", ""),
-                "like_count": row_data.get("like_count", ""),
-                "comment_count": row_data.get("comment_count", ""),
-                "share_count": row_data.get("share_count", ""),
-                "music_title": row_data.get("music_title", ""),
-                "is_paused": row_data.get("is_paused", ""),
-            }
-
-            # write & flush
-            writer.writerow(row)
-            csv_file.flush()
-            os.fsync(csv_file.fileno())  # ensure it hits disk
-            print(f"[{count+1}/{max_videos}] wrote row → id:{row['video_id']} url:{row['post_url']}")
-
-            count += 1
-            no_progress_strikes = 0  # reset since we wrote a row
+            rows = []
+            for row_data in found:
+                vid = row_data.get("video_id", "")
+                if vid and vid in seen:
+                    tracer.count("duplicate_skip")
+                    continue
+                if vid:
+                    seen.add(vid)
+                rows.append({
+                    "ts_iso": ts(),
+                    "index": count + len(rows) + 1,
+                    "video_id": vid,
+                    "post_url": row_data.get("post_url", ""),
+                    "video_src": row_data.get("video_src", ""),
+                    "duration_sec": row_data.get("duration_sec", ""),
+                    "author_handle": row_data.get("author_handle", ""),
+                    "caption": row_data.get("caption", ""),
+                    "like_count": row_data.get("like_count", ""),
+                    "comment_count": row_data.get("comment_count", ""),
+                    "share_count": row_data.get("share_count", ""),
+                    "music_title": row_data.get("music_title", ""),
+                    "is_paused": row_data.get("is_paused", ""),
+                })
+                if count + len(rows) >= max_videos:
+                    break
 
-            human_sleep(delay_min, delay_max)
-            if not scroll_next(driver):
+            if rows:
+                # buffered; the journal keeps each flushed batch crash-safe
+                for row in rows:
+                    ledger.record("tiktok", key, ledger_day, row["video_id"], row["index"], cursor=row["post_url"])
+                with tracer.span("log_write"):
+                    log.write(abs_csv, FEED_HEADER, tag(rows, seen_feed, "video_id"))
+                if arc:
+                    with tracer.span("archive"):
+                        for row in rows:
+                            vid, blobs = row["video_id"], {}
+                            if items.get(vid):
+                                blobs["sigi"] = arc.put_json(items.get(vid))
+                            if markup.get(vid):
+                                blobs["html"] = arc.put(markup[vid])
+                            arc.record("tiktok", persona or "default", day, {
+                                "kind": "item", "ts": row["ts_iso"], "index": row["index"], "video_id": vid,
+                                "is_repeat": row["is_repeat"], "blobs": blobs})
+                tracer.count("videos", len(rows))
+                for row in rows:
+                    print(f"[{row['index']}/{max_videos}] wrote row → id:{row['video_id']} url:{row['post_url']}")
+                count += len(rows)
+                no_progress_strikes = 0  # reset since we wrote a row
+
+            # watch the visible video, then move on
+            with tracer.span("delay"):
+                human_sleep(delay_min, delay_max)
+            with tracer.span("scroll_next"):
+                moved = scroll_next(page)
+            if not moved:
+                tracer.count("no_progress_strike")
                 no_progress_strikes += 1
                 if no_progress_strikes >= MAX_STRIKES:
                     print("⚠️  Reached end or cannot scroll further; stopping.")
                     break
 
-        save_cookies_and_storage(driver)
+        if use_store:
+            save_cookies_and_storage(page, persona=persona)
         print(f"\n✅ Done. Saved {count} rows to {abs_csv}")
+        if stats:
+            stats.save(os.path.splitext(abs_csv)[0] + "_lite.jsonl", videos=count)
+            print(f"[lite] {stats.summary()}")
+        if arc:
+            print(f"[archive] {arc.summary()}")
+        if wd.recycles:
+            print(f"[memory] recycled the {mem_recycle} {wd.recycles}x")
+        return count - start
 
     finally:
         try:
-            if csv_file:
-                csv_file.close()
-        except Exception:
-            pass
-        try:
-            driver.quit()
-        except Exception:
-            pass
+            if log:
+                log.close()
+        except Exception as e:
+            print(f"⚠️  Closing the log failed ({e}); its unwritten progress is not checkpointed.")
+            if ledger:
+                ledger.rollback()
+        if ledger:
+            ledger.close()
+        for idx in (seen_feed, seen_recs, seen_ahead):
+            if idx:
+                idx.close()
+        if arc:
+            arc.close()
+        if wd:
+            wd.close()
+        if own:
+            browsers.close()
+        tracer.close()
+        set_tracer(NullTracer())
 
 
 if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="TikTok Selenium feed sampler (JSON-first + DOM fallback) with robust CSV.")
+    import yaml
+    ap = argparse.ArgumentParser(description="TikTok feed sampler (Playwright; JSON-first + DOM fallback) with robust CSV.")
     ap.add_argument("--mode", choices=["login", "scrape"], default="scrape", help="login: save cookies; scrape: reuse cookies")
-    ap.add_argument("--max_videos", type=int, default=30)
-    ap.add_argument("--out_csv", type=str, default="tiktok_feed_sample.csv")
+    ap.add_argument("--persona", type=str, default=None,
+                    help="Persona from personas.yaml: its profile, videos_per_day, data/logs dir and saved session.")
+    ap.add_argument("--config", type=str, default="personas/personas.yaml")
+    ap.add_argument("--days", type=int, default=1)
+    ap.add_argument("--max_videos", type=int, default=None, help="Default: the persona's videos_per_day, else 30.")
+    ap.add_argument("--out_csv", type=str, default=None,
+                    help="Default: data/logs/tiktok/<persona>/<day>/feed.csv, else tiktok_feed_sample.csv.")
     ap.add_argument("--headless", action="store_true", help="Headless mode (works after cookies are saved).")
     ap.add_argument("--start_url", type=str, default="https://www.tiktok.com/foryou")
     ap.add_argument("--delay_min", type=float, default=1.5)
     ap.add_argument("--delay_max", type=float, default=3.0)
+    ap.add_argument("--user_data_dir", type=str, default=None,
+                    help="Persistent browser profile (default: the persona's; none = throwaway + cookies.json).")
+    ap.add_argument("--resume", action="store_true", help="Continue today's interrupted run (appends to out_csv).")
+    ap.add_argument("--capture", action="store_true", help="Read items from the feed API responses (logs recs too).")
+    ap.add_argument("--flush_rows", type=int, default=20, help="Write the CSV after this many buffered rows…")
+    ap.add_argument("--flush_secs", type=float, default=10.0, help="…or after this many seconds.")
+    ap.add_argument("--output", choices=["csv", "parquet", "sqlite"], default="csv")
+    ap.add_argument("--clock", choices=["real", "virtual"], default="real",
+                    help="virtual: skip waits but log timestamps as if they happened (scrape mode only).")
+    ap.add_argument("--speedup", type=float, default=0, help="Virtual clock: real sleep = secs/speedup (0 = none).")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--lite", action="store_true",
+                    help="Audit-lite: block images/fonts/trackers and mute playback.")
+    ap.add_argument("--trace", action="store_true", help="Write per-phase timing spans to <out_csv>_trace.jsonl.")
+    ap.add_argument("--metrics_dir", type=str, default=None, help="Write a Prometheus textfile (.prom) here at the end.")
+    ap.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None,
+                    help="Profile the run; output goes to data/profiles/.")
+    ap.add_argument("--archive", nargs="?", const="data/archive", default=None, metavar="DIR",
+                    help="Archive raw item data for offline re-extraction (default dir: data/archive).")
+    ap.add_argument("--mem_interval", type=float, default=30.0,
+                    help="Sample JS heap/DOM/RSS to <out_csv>_memory.jsonl every N seconds (0 = off).")
+    ap.add_argument("--mem_heap_mb", type=float, default=None, help="Recycle when the JS heap exceeds this.")
+    ap.add_argument("--mem_rss_mb", type=float, default=None, help="Recycle when browser RSS exceeds this.")
+    ap.add_argument("--mem_recycle", choices=["page", "context"], default="page",
+                    help="What to recycle past a watermark: the tab, or the whole browser context.")
     args = ap.parse_args()
+    # manual login needs real time to poll against
+    set_clock(make_clock(args.clock if args.mode == "scrape" else "real", args.speedup, args.seed))
 
     if args.delay_max < args.delay_min:
         args.delay_max = args.delay_min
 
-    run(
-        mode=args.mode,
-        max_videos=args.max_videos,
-        out_csv=args.out_csv,
-        headless=args.headless,
-        start_url=args.start_url,
-        delay_min=args.delay_min,
-        delay_max=args.delay_max,
-    )
+    p = {}
+    if args.persona:
+        with open(args.config, "r") as f:
+            pmap = {p["name"]: p for p in yaml.safe_load(f)["personas"]}
+        if args.persona not in pmap:
+            raise SystemExit(f"Unknown persona {args.persona}.")
+        p = pmap[args.persona]
+    user_data_dir = args.user_data_dir or p.get("user_data_dir")
+    if user_data_dir:
+        ensure_dir(user_data_dir)
+
+    # one warm browser for all days; each run gets a fresh page
+    with profiled(args.profile, f"data/profiles/tiktok_{args.persona or 'default'}"), PlaywrightManager() as pm:
+        for d in range(args.days if args.mode == "scrape" else 1):
+            out_csv = args.out_csv or (tiktok_feed_path(args.persona) if args.persona else "tiktok_feed_sample.csv")
+            run(
+                mode=args.mode,
+                max_videos=args.max_videos or p.get("videos_per_day", 30),
+                out_csv=out_csv,
+                headless=args.headless,
+                start_url=args.start_url,
+                delay_min=args.delay_min,
+                delay_max=args.delay_max,
+                user_data_dir=user_data_dir,
+                capture=args.capture,
+                flush_rows=args.flush_rows,
+                flush_secs=args.flush_secs,
+                output=args.output,
+                lite_mode=args.lite,
+                browsers=pm,
+                persona=args.persona,
+                resume=args.resume,
+                session=d,
+                trace=args.trace,
+                metrics_dir=args.metrics_dir,
+                archive_dir=args.archive,
+                mem_heap_mb=args.mem_heap_mb,
+                mem_rss_mb=args.mem_rss_mb,
+                mem_interval=args.mem_interval,
+                mem_recycle=args.mem_recycle,
+            )
+        print(f"Browser startup: {pm.report()}")
@@ -0,0 +1,170 @@
+"""
+Memory watchdog for long sessions.
+
+Hours of SPA navigation (YouTube) or infinite scroll (TikTok) on one page
+grow the renderer until the host swaps or the tab crashes. Every `interval`
+seconds the watchdog samples
+
+- DevTools performance metrics of the page (Performance.getMetrics over a
+  CDP session): JS heap used/total, DOM nodes, documents, event listeners;
+- RSS of this process's browser tree (all Chromium processes under it, read
+  from /proc; psutil is used instead when installed), and of its largest
+  renderer;
+
+and appends each sample to a JSONL memory log next to the session's logs.
+When a sample crosses a watermark (heap_mb: JS heap used, rss_mb: browser
+tree RSS), or the page has crashed, the session's reopen(level) callback
+recycles the page ("page": a fresh tab in the same context) or the whole
+persistent context ("context": relaunch from the profile on disk), and puts
+the persona back where it was:
+
+    wd = MemoryWatchdog("…/memory.jsonl", heap_mb=800, rss_mb=3000, persona=persona)
+    wd.attach(page)
+    while …:
+        page = wd.check(page, reopen)   # same page unless it was recycled
+"""
+import json
+import os
+import time
+
+from common import ensure_dir, ts
+from instrument import get_tracer
+
+MB = 1024 * 1024
+
+
+def _proc_tree():
+    """{pid: (ppid, rss bytes, is renderer)} for every process, from /proc (Linux)."""
+    page = os.sysconf("SC_PAGE_SIZE")
+    out = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmd = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(b")") + 2:].split()  # the command name may contain spaces
+        out[int(name)] = (int(fields[1]), int(fields[21]) * page, b"--type=renderer" in cmd)
+    return out
+
+
+def browser_rss(root_pid=None):
+    """(total RSS MB of root_pid's descendants, largest renderer RSS MB); (None, None) if unavailable."""
+    root_pid = root_pid or os.getpid()
+    try:
+        import psutil  # optional dependency
+        procs = psutil.Process(root_pid).children(recursive=True)
+        rows = []
+        for p in procs:
+            try:
+                rows.append((p.memory_info().rss, "--type=renderer" in " ".join(p.cmdline())))
+            except psutil.Error:
+                pass
+    except ImportError:
+        if not os.path.isdir("/proc"):
+            return None, None
+        tree = _proc_tree()
+        children = {}
+        for pid, (ppid, _, _) in tree.items():
+            children.setdefault(ppid, []).append(pid)
+        rows, stack = [], list(children.get(root_pid, []))
+        while stack:
+            pid = stack.pop()
+            rows.append(tree[pid][1:])
+            stack.extend(children.get(pid, []))
+    total = sum(r for r, _ in rows)
+    renderer = max([r for r, is_renderer in rows if is_renderer] or [0])
+    return round(total / MB, 1), round(renderer / MB, 1)
+
+
+class MemoryWatchdog:
+    def __init__(self, log_path=None, heap_mb=None, rss_mb=None, interval=30.0, level="page", **labels):
+        self.log_path = log_path
+        self.heap_mb = heap_mb
+        self.rss_mb = rss_mb
+        self.interval = interval
+        self.level = level
+        self.labels = labels
+        self.cdp = None
+        self.crashed = False
+        self.last = time.monotonic()
+        self.recycles = 0
+        self.log = None
+        if log_path:
+            ensure_dir(os.path.dirname(os.path.abspath(log_path)))
+            self.log = open(log_path, "a", encoding="utf-8")
+
+    def _emit(self, record):
+        if self.log:
+            self.log.write(json.dumps({"ts": ts(), **self.labels, **record}) + "\n")
+            self.log.flush()
+
+    def attach(self, page):
+        """Watch a (new) page: crash listener plus a CDP session for its metrics."""
+        self.crashed = False
+        page.on("crash", lambda *_: setattr(self, "crashed", True))
+        try:
+            self.cdp = page.context.new_cdp_session(page)
+            self.cdp.send("Performance.enable")
+        except Exception:
+            self.cdp = None  # not Chromium: RSS only
+
+    def sample(self):
+        self.last = time.monotonic()
+        metrics = {}
+        if self.cdp:
+            try:
+                metrics = {m["name"]: m["value"] for m in self.cdp.send("Performance.getMetrics")["metrics"]}
+            except Exception:
+                pass
+        rss, renderer = browser_rss()
+        s = {"heap_used_mb": round(metrics["JSHeapUsedSize"] / MB, 1) if "JSHeapUsedSize" in metrics else None,
+             "heap_total_mb": round(metrics["JSHeapTotalSize"] / MB, 1) if "JSHeapTotalSize" in metrics else None,
+             "dom_nodes": metrics.get("Nodes"), "documents": metrics.get("Documents"),
+             "listeners": metrics.get("JSEventListeners"), "rss_mb": rss, "renderer_rss_mb": renderer}
+        self._emit(s)
+        return s
+
+    def over(self, s):
+        """Which watermark the sample crosses ("heap" / "rss"), or None."""
+        if self.heap_mb and (s["heap_used_mb"] or 0) > self.heap_mb:
+            return "heap"
+        if self.rss_mb and (s["rss_mb"] or 0) > self.rss_mb:
+            return "rss"
+        return None
+
+    def check(self, page, reopen):
+        """
+        Sample when due; on a crash or a crossed watermark call reopen(level),
+        which must return a page back at the persona's position. Returns the
+        page to keep using.
+        """
+        reason = "crash" if self.crashed else None
+        if not reason and self.interval and time.monotonic() - self.last >= self.interval:
+            reason = self.over(self.sample())
+        if not reason:
+            return page
+        tracer = get_tracer()
+        tracer.count("recycle", reason=reason, level=self.level)
+        self._emit({"event": "recycle", "reason": reason, "level": self.level})
+        with tracer.span("recycle", level=self.level):
+            page = reopen(self.level)
+        self.recycles += 1
+        self.attach(page)
+        self.sample()  # the post-recycle baseline
+        return page
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,315 @@
+"""
+Durable work queue for running personas across several worker machines
+(SQLite, WAL; no outside services).
+
+The coordinator turns personas.yaml into one job per (persona, platform, day)
+and stores it, together with the run's session options, in the queue file.
+Day N of a run becomes runnable on the run's start date + N - 1, so each job
+is that calendar day's session (--back-to-back runs them all at once, as the
+orchestrator's --days does, each as its own session of the date). Workers, on
+any machine that can open that file, lease one job at a time:
+
+    python workqueue.py enqueue --days 7 --headless          # coordinator
+    python workqueue.py work                                 # on each worker (one browser each)
+    python workqueue.py status                               # per-state and per-worker counts
+
+- A lease lasts --lease-secs and the worker's heartbeat thread renews it while
+  the session runs. A worker that dies stops renewing; once its lease expires
+  the job goes back to the queue and is re-run with resume, so the ledger
+  continues the day where it stopped (attempts are capped by --max-attempts).
+  A worker that finds its lease gone (it stalled past the lease) stops the
+  session at the next video and records nothing for the job.
+- A job is only leased while no other job with the same user_data_dir is
+  leased, and a persona's days run in order, so a profile is never open on
+  two workers at once.
+- A finished job records its videos, seconds and error; the worker row keeps
+  running totals, so status shows each worker's completions.
+
+The queue file must live where every worker can lock it: local disk for
+workers on one host, or a shared mount with working POSIX locks.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from common import ensure_dir, ts
+from orchestrator import PLATFORMS, add_session_args, build_jobs, load_personas, run_job, session_opts
+
+QUEUE_PATH = "data/queue.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY, opts TEXT NOT NULL, created TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run TEXT NOT NULL, persona TEXT NOT NULL, platform TEXT NOT NULL, day INTEGER NOT NULL,
+    profile TEXT NOT NULL, spec TEXT NOT NULL, not_before TEXT,  -- YYYY-MM-DD; NULL = now
+    state TEXT NOT NULL DEFAULT 'queued',  -- queued | leased | done | failed
+    worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0,
+    videos INTEGER NOT NULL DEFAULT 0, secs REAL, error TEXT, finished TEXT,
+    UNIQUE (run, persona, platform, day)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, profile);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY, host TEXT, started TEXT, last_seen TEXT,
+    jobs INTEGER NOT NULL DEFAULT 0, videos INTEGER NOT NULL DEFAULT 0, errors INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# oldest runnable job: its profile isn't leased and its persona's earlier days are finished
+NEXT_JOB = """
+SELECT id, run, spec, attempts FROM jobs j
+WHERE state = 'queued'
+  AND (not_before IS NULL OR not_before <= ?)
+  AND profile NOT IN (SELECT profile FROM jobs WHERE state = 'leased')
+  AND NOT EXISTS (SELECT 1 FROM jobs p WHERE p.run = j.run AND p.persona = j.persona
+                  AND p.platform = j.platform AND p.day < j.day AND p.state IN ('queued', 'leased'))
+ORDER BY day, id LIMIT 1
+"""
+
+
+class WorkQueue:
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()  # the heartbeat thread shares this connection
+
+    def _tx(self, fn):
+        """Run fn(db) in one write transaction (BEGIN IMMEDIATE: leases never race)."""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self.db)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return out
+
+    # -------------------------- coordinator --------------------------
+    def enqueue(self, run, jobs, days, opts, start=None, back_to_back=False):
+        """
+        Queue each job for days 1..days under run, day N not before start (a
+        date, default today) + N - 1; returns how many were new.
+        """
+        start = start or dt.date.today()
+        def add(db):
+            db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (run, json.dumps(opts), ts()))
+            n = 0
+            for job in jobs:
+                for day in range(1, days + 1):
+                    # back to back, the days share one date: each is its own session of it
+                    not_before = None if back_to_back else (start + dt.timedelta(days=day - 1)).isoformat()
+                    spec = {**job, "days": 1, "day": day, "session": day - 1 if back_to_back else 0}
+                    cur = db.execute(
+                        "INSERT OR IGNORE INTO jobs (run, persona, platform, day, profile, spec, not_before) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (run, job["persona"], job["platform"], day, os.path.abspath(job["user_data_dir"]),
+                         json.dumps(spec), not_before))
+                    n += cur.rowcount
+            return n
+        return self._tx(add)
+
+    def requeue_expired(self, max_attempts=3, now=None):
+        """Put jobs whose lease ran out back in the queue (or fail them after max_attempts)."""
+        now = now or time.time()
+        def expire(db):
+            db.execute("UPDATE jobs SET state = 'failed', error = 'lease expired', finished = ? "
+                       "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (ts(), now, max_attempts))
+            return db.execute("UPDATE jobs SET state = 'queued', worker = NULL "
+                              "WHERE state = 'leased' AND lease_until < ?", (now,)).rowcount
+        return self._tx(expire)
+
+    def status(self):
+        with self.lock:
+            states = dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            workers = self.db.execute("SELECT worker, last_seen, jobs, videos, errors FROM workers "
+                                      "ORDER BY worker").fetchall()
+            videos = self.db.execute("SELECT platform, SUM(videos) FROM jobs GROUP BY platform").fetchall()
+        return {"states": states, "workers": workers, "videos": dict(videos)}
+
+    # -------------------------- worker --------------------------
+    def register(self, worker):
+        self._tx(lambda db: db.execute(
+            "INSERT INTO workers (worker, host, started, last_seen) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (worker) DO UPDATE SET last_seen = excluded.last_seen",
+            (worker, socket.gethostname(), ts(), ts())))
+
+    def lease(self, worker, lease_secs=300, max_attempts=3):
+        """Claim the next runnable job: (job id, job, opts, attempt) or None."""
+        self.requeue_expired(max_attempts)
+        def claim(db):
+            row = db.execute(NEXT_JOB, (dt.date.today().isoformat(),)).fetchone()
+            if not row:
+                return None
+            job_id, run, spec, attempts = row
+            db.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (worker, time.time() + lease_secs, job_id))
+            db.execute("UPDATE workers SET last_seen = ? WHERE worker = ?", (ts(), worker))
+            opts = json.loads(db.execute("SELECT opts FROM runs WHERE run = ?", (run,)).fetchone()[0])
+            return job_id, json.loads(spec), opts, attempts + 1
+        return self._tx(claim)
+
+    def heartbeat(self, job_id, worker, lease_secs=300):
+        """Extend the lease; False if the job is no longer ours (it expired and was requeued)."""
+        def beat(db):
+            db.execute("UPDATE workers SET last_seen = ? WHERE worker = ?", (ts(), worker))
+            return db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                              (time.time() + lease_secs, job_id, worker)).rowcount == 1
+        return self._tx(beat)
+
+    def complete(self, job_id, worker, result, attempt, max_attempts=3):
+        """
+        Record the session's result; a failed attempt goes back to the queue
+        until max_attempts. Returns the job's new state, or "lease lost" (and
+        records nothing) if the job is no longer leased to this worker.
+        """
+        error = result.get("error") or ""
+        retry = bool(error) and attempt < max_attempts
+        state = "queued" if retry else ("failed" if error else "done")
+        def done(db):
+            owned = db.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL, videos = videos + ?, secs = ?, "
+                "error = ?, finished = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (state, result.get("videos", 0), result.get("secs"), error or None,
+                 None if retry else ts(), job_id, worker)).rowcount == 1
+            if not owned:
+                db.execute("UPDATE workers SET last_seen = ?, errors = errors + 1 WHERE worker = ?", (ts(), worker))
+                return "lease lost"
+            db.execute("UPDATE workers SET last_seen = ?, jobs = jobs + ?, videos = videos + ?, errors = errors + ? "
+                       "WHERE worker = ?", (ts(), 0 if error else 1, result.get("videos", 0), 1 if error else 0,
+                                            worker))
+            return state
+        return self._tx(done)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Renews a job's lease every lease_secs / 3 until stopped. Sets `lost` once
+    the lease is gone (requeued for another worker) or could not be renewed
+    before it ran out; the session polls it and stops.
+    """
+
+    def __init__(self, queue, job_id, worker, lease_secs):
+        super().__init__(daemon=True)
+        self.queue, self.job_id, self.worker, self.lease_secs = queue, job_id, worker, lease_secs
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        renewed = time.monotonic()
+        while not self.stopped.wait(self.lease_secs / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker, self.lease_secs):
+                    self.lost.set()
+                    return
+                renewed = time.monotonic()
+            except sqlite3.OperationalError:
+                if time.monotonic() - renewed >= self.lease_secs:
+                    self.lost.set()  # expired while the queue was unreachable: someone else may hold it
+                    return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def work(path=QUEUE_PATH, worker=None, lease_secs=300, max_attempts=3, max_jobs=None, idle_secs=30.0,
+         exit_when_empty=False):
+    """Lease and run jobs one at a time until the queue is drained (or max_jobs); returns totals."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    totals = {"jobs": 0, "videos": 0, "errors": 0}
+    with WorkQueue(path) as queue:
+        queue.register(worker)
+        while max_jobs is None or totals["jobs"] < max_jobs:
+            leased = queue.lease(worker, lease_secs, max_attempts)
+            if not leased:
+                st = queue.status()["states"]
+                if exit_when_empty and not st.get("queued") and not st.get("leased"):
+                    break
+                time.sleep(idle_secs)  # held back by a busy profile, or waiting for new runs
+                continue
+            job_id, job, opts, attempt = leased
+            if attempt > 1:
+                opts = {**opts, "resume": True}  # continue where the previous attempt stopped
+            print(f"[{worker}] {job['platform']}/{job['persona']} day {job['day']} (attempt {attempt})")
+            beat = _Heartbeat(queue, job_id, worker, lease_secs)
+            beat.start()
+            try:
+                result = run_job(job, opts, stop=beat.lost)
+            finally:
+                beat.stop()
+            if beat.lost.is_set():
+                result["error"] = "lease lost"
+            state = queue.complete(job_id, worker, result, attempt, max_attempts)
+            print(f"[{worker}] {job['platform']}/{job['persona']}: {result['videos']} videos in "
+                  f"{result['secs']:.0f}s — {state}" + (f" ({result['error']})" if result["error"] else ""))
+            totals["jobs"] += 1
+            totals["errors"] += 1 if result["error"] else 0
+            if state != "lease lost":
+                totals["videos"] += result["videos"]
+    return totals
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="SQLite work queue: coordinator (enqueue/status) and workers.")
+    ap.add_argument("--queue", default=QUEUE_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("enqueue", help="Queue persona/platform/day jobs from personas.yaml.")
+    p.add_argument("--config", default="personas/personas.yaml")
+    p.add_argument("--run", default=None, help="Run name (default: today's date); re-enqueueing skips existing jobs.")
+    p.add_argument("--days", type=int, default=1)
+    p.add_argument("--persona", action="append", help="Limit to these personas (repeatable).")
+    p.add_argument("--platform", action="append", choices=PLATFORMS, help="Limit to these platforms.")
+    p.add_argument("--back-to-back", action="store_true",
+                   help="Run all days now (one session each) instead of day N on start date + N - 1.")
+    add_session_args(p)
+    p = sub.add_parser("work", help="Lease and run jobs (one browser per worker process).")
+    p.add_argument("--worker", default=None, help="Worker name (default: host:pid).")
+    p.add_argument("--lease-secs", type=float, default=300, help="Lease length; renewed every third of it.")
+    p.add_argument("--max-attempts", type=int, default=3)
+    p.add_argument("--max-jobs", type=int, default=None)
+    p.add_argument("--idle-secs", type=float, default=30.0, help="Poll interval while nothing is runnable.")
+    p.add_argument("--exit-when-empty", action="store_true", help="Stop once no job is queued or leased.")
+    sub.add_parser("status", help="Jobs per state, videos per platform, completions per worker.")
+    args = ap.parse_args()
+
+    if args.cmd == "enqueue":
+        jobs = build_jobs(load_personas(args.config), 1, platforms=args.platform or PLATFORMS, names=args.persona)
+        if not jobs:
+            raise SystemExit("No persona/platform jobs selected.")
+        run = args.run or time.strftime("%Y-%m-%d")
+        with WorkQueue(args.queue) as q:
+            n = q.enqueue(run, jobs, args.days, session_opts(args), back_to_back=args.back_to_back)
+        print(f"Queued {n} jobs for run {run} ({len(jobs)} persona/platform pairs x {args.days} days) -> {args.queue}")
+    elif args.cmd == "work":
+        t = work(args.queue, args.worker, args.lease_secs, args.max_attempts, args.max_jobs, args.idle_secs,
+                 args.exit_when_empty)
+        print(f"Worker done: {t['jobs']} jobs, {t['videos']} videos, {t['errors']} errors")
+    else:
+        with WorkQueue(args.queue) as q:
+            q.requeue_expired()
+            st = q.status()
+        print("Jobs: " + ", ".join(f"{k} {v}" for k, v in sorted(st["states"].items())))
+        print("Videos: " + ", ".join(f"{k} {v}" for k, v in sorted(st["videos"].items())))
+        for worker, last_seen, jobs, videos, errors in st["workers"]:
+            print(f"  {worker:32s} {jobs:4d} jobs {videos:6d} videos {errors:3d} errors  last seen {last_seen}")
@@ -0,0 +1,173 @@
+"""
+Asyncio engine: many YouTube personas as contexts inside one Chromium.
+
+Instead of one persistent Chromium per persona (run_session), every persona
+gets its own BrowserContext on a shared browser, and dwell periods are
+interleaved on one asyncio loop, so one process drives many personas.
+
+Contexts cannot use a Chromium user_data_dir, so each persona's cookies and
+localStorage are kept as a Playwright storage state file inside its
+user_data_dir and reloaded on the next run (saved even when the session fails).
+
+Log flushes (fsync of the journal) and seen-index loads/saves block, so they
+run in worker threads (asyncio.to_thread) instead of stalling every other
+persona's page on the loop. Each session awaits its own writes in order, so a
+writer or index is never used by two threads at once.
+
+    python -m youtube.async_engine --max-contexts 8 --headless
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from playwright.async_api import async_playwright
+
+from common import rand_dwell, out_paths, ts, ensure_dir
+from clock import get_clock, set_clock, make_clock
+from logwriter import open_log_writer
+from seenindex import SeenIndex, tag
+from youtube.simple_watch_YT import SNAPSHOT_JS, WATCHED_HEADER, RECS_HEADER, parse_snapshot
+
+STATE_FILE = "playwright_state.json"
+
+
+def state_path(user_data_dir):
+    return os.path.join(user_data_dir, STATE_FILE)
+
+
+async def extract_snapshot_async(page, limit=20):
+    t0 = time.perf_counter()
+    raw = await page.evaluate(SNAPSHOT_JS, limit)
+    return parse_snapshot(raw, (time.perf_counter() - t0) * 1000)
+
+
+async def run_session_async(browser, persona, keywords, videos_per_day, user_data_dir,
+                            dwell_min=20, dwell_max=90, dry_run=False,
+                            base_url="https://www.youtube.com", output="csv"):
+    """Async counterpart of run_session; returns the number of videos logged."""
+    clock = get_clock()
+    ensure_dir(user_data_dir)
+    state = state_path(user_data_dir)
+    context = await browser.new_context(storage_state=state if os.path.exists(state) else None)
+    total = 0
+    log = seen_watched = seen_recs = None
+    try:
+        watched_path, recs_path = out_paths("youtube", persona)
+        log = await asyncio.to_thread(open_log_writer, output, os.path.join(os.path.dirname(watched_path), ".journal"))
+        seen_watched = await asyncio.to_thread(SeenIndex.open, "youtube", persona, "watched")
+        seen_recs = await asyncio.to_thread(SeenIndex.open, "youtube", persona, "recs")
+        log.after_flush += [seen_watched.flush, seen_recs.flush]
+
+        page = await context.new_page()
+
+        query = clock.random.choice(keywords)
+        await page.goto(f"{base_url}/results?search_query={query}", timeout=120000)
+        await page.wait_for_selector("ytd-video-renderer,ytd-rich-item-renderer", timeout=120000)
+
+        await page.click("ytd-video-renderer a#thumbnail >> nth=0")
+        await page.wait_for_selector(".html5-video-player", timeout=120000)
+
+        while total < videos_per_day:
+            await clock.async_sleep(2)
+            snap = await extract_snapshot_async(page)
+            title, vid_id, duration = snap["title"], snap["video_id"], snap["duration_secs"]
+
+            dwell = rand_dwell(dwell_min, dwell_max)
+            if duration and dwell > duration: dwell = int(0.9*duration)  # cap to 90%
+
+            now = ts()
+            recs = tag([{"ts": now, "persona": persona, "seed_query": query, "watching": vid_id, **r}
+                        for r in snap["recs"]], seen_recs, "rec_vid")
+            if recs:
+                await asyncio.to_thread(log.write, recs_path, RECS_HEADER, recs)
+
+            if not dry_run:
+                try:
+                    await page.keyboard.press("k")  # ensure playing
+                except Exception:
+                    pass
+                await clock.async_sleep(dwell)
+
+            sidebar = page.locator("ytd-watch-next-secondary-results-renderer #contents a#thumbnail")
+            try:
+                await sidebar.first.click()
+                await clock.async_sleep(1)
+            except Exception:
+                await page.goto(base_url, timeout=120000)
+                await page.wait_for_selector("ytd-rich-item-renderer", timeout=120000)
+                await page.click("ytd-rich-item-renderer a#thumbnail >> nth=0")
+
+            await asyncio.to_thread(log.write, watched_path, WATCHED_HEADER, tag(
+                       [{
+                           "ts": ts(), "persona": persona, "seed_query": query,
+                           "video_id": vid_id, "title": title, "dwell_secs": dwell, "duration_secs": duration
+                        }], seen_watched, "video_id"))
+            total += 1
+    finally:
+        try:
+            await context.storage_state(path=state)  # keep the login even if the session failed
+        except Exception:
+            pass
+        try:
+            for closable in (log, seen_watched, seen_recs):
+                if closable:
+                    await asyncio.to_thread(closable.close)
+        finally:
+            await context.close()
+    return total
+
+
+async def run_personas(personas, max_contexts=8, headless=False, dwell_min=20, dwell_max=90,
+                       dry_run=False, base_url="https://www.youtube.com", output="csv"):
+    """
+    Run one session for each persona dict (personas.yaml shape) on a single
+    browser, at most max_contexts at a time. Returns {persona: videos or exception}.
+    """
+    sem = asyncio.Semaphore(max_contexts)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+
+        async def one(cfg):
+            async with sem:
+                return await run_session_async(browser, cfg["name"], cfg["keywords"], cfg["videos_per_day"],
+                                               cfg["user_data_dir"], dwell_min, dwell_max,
+                                               dry_run=dry_run, base_url=base_url, output=output)
+
+        results = await asyncio.gather(*(one(cfg) for cfg in personas), return_exceptions=True)
+        await browser.close()
+    return {cfg["name"]: res for cfg, res in zip(personas, results)}
+
+
+if __name__ == "__main__":
+    import yaml
+    ap = argparse.ArgumentParser(description="Run many YouTube personas in one browser.")
+    ap.add_argument("--persona", action="append", help="Limit to these personas (repeatable).")
+    ap.add_argument("--days", type=int, default=1)
+    ap.add_argument("--max-contexts", type=int, default=8)
+    ap.add_argument("--dwell-min", type=int, default=20)
+    ap.add_argument("--dwell-max", type=int, default=90)
+    ap.add_argument("--headless", action="store_true")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--base-url", default="https://www.youtube.com")
+    ap.add_argument("--output", choices=["csv", "parquet", "sqlite"], default="csv")
+    ap.add_argument("--clock", choices=["real", "virtual"], default="real")
+    ap.add_argument("--speedup", type=float, default=0)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+    set_clock(make_clock(args.clock, args.speedup, args.seed))
+
+    with open("personas/personas.yaml","r") as f:
+        cfg = yaml.safe_load(f)
+
+    selected = [p for p in cfg["personas"]
+                if "youtube" in p.get("platform", []) and (not args.persona or p["name"] in args.persona)]
+    if not selected:
+        raise SystemExit("No YouTube personas selected.")
+
+    for _ in range(args.days):
+        results = asyncio.run(run_personas(selected, args.max_contexts, args.headless,
+                                           args.dwell_min, args.dwell_max, args.dry_run, args.base_url,
+                                           args.output))
+        for name, res in results.items():
+            print(f"[youtube/{name}] {res if isinstance(res, int) else f'ERROR {res!r}'}")
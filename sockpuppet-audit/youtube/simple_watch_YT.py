@@ -1,8 +1,16 @@
-import argparse, time, random, re
-import pandas as pd
-from pathlib import Path
-from playwright.sync_api import sync_playwright
-from common import rand_dwell, out_paths, write_rows, ts, ensure_dir
+import argparse, os, time
+from contextlib import nullcontext
+from common import rand_dwell, out_paths, ts, ensure_dir
+from clock import get_clock, set_clock, make_clock
+from capture import ResponseCapture
+from logwriter import open_log_writer
+from browsers import PlaywrightManager
+from ledger import Ledger, session_day
+from seenindex import SeenIndex, tag
+from instrument import session_tracer, profiled
+from archive import Archive
+from watchdog import MemoryWatchdog
+import lite
 
 def clean_time_to_secs(txt):
     # Formats like 12:34 or 1:02:03
@@ -15,82 +23,274 @@ def clean_time_to_secs(txt):
         return m*60 + s
     return 0
 
+# is_repeat: 1 if this persona already watched / was recommended the video (seenindex)
+WATCHED_HEADER = ["ts","persona","seed_query","video_id","title","dwell_secs","duration_secs","is_repeat"]
+RECS_HEADER = ["ts","persona","seed_query","watching","rec_vid","rank","rec_title","rec_channel","is_repeat"]
+
+# One in-page evaluation returns everything we log for a watch page.
+SNAPSHOT_JS = r"""
+(limit) => {
+  const txt = el => el ? (el.getAttribute('title') || el.textContent || '').trim() : '';
+  const anchors = Array.from(document.querySelectorAll(
+    'ytd-watch-next-secondary-results-renderer #contents a#thumbnail')).slice(0, limit);
+  const recs = anchors.map((a, i) => {
+    const card = a.closest('ytd-compact-video-renderer,ytd-compact-radio-renderer,' +
+                           'ytd-compact-playlist-renderer,yt-lockup-view-model') || a.parentElement;
+    return {
+      href: a.getAttribute('href') || '',
+      title: txt(card && card.querySelector('#video-title')),
+      channel: txt(card && card.querySelector('ytd-channel-name #text,#channel-name #text')),
+      rank: i + 1,
+    };
+  });
+  const dur = document.querySelector('.ytp-time-duration');
+  return {title: document.title, url: location.href, duration: dur ? dur.textContent : '', recs};
+}
+"""
+
+
+# Raw inputs for the archive: what SNAPSHOT_JS reads (the right-hand column, or
+# the whole body if it moved) and ytInitialData while it still describes this video.
+ARCHIVE_JS = r"""
+() => {
+  const side = document.querySelector('#secondary') ||
+               document.querySelector('ytd-watch-next-secondary-results-renderer') || document.body;
+  const dur = document.querySelector('.ytp-time-duration');
+  const vid = new URLSearchParams(location.search).get('v') || '';
+  let initial = null;
+  try {
+    const d = window.ytInitialData;
+    if (d && vid && JSON.stringify(d.currentVideoEndpoint || {}).includes(vid)) initial = JSON.stringify(d);
+  } catch (e) {}
+  return {page: {title: document.title, url: location.href, duration: dur ? dur.textContent : ''},
+          sidebar_html: side ? side.outerHTML : '', initial_data: initial};
+}
+"""
+
+
+def vid_from_url(url):
+    return url.split("v=")[-1].split("&")[0] if "watch?v=" in url else url
+
+
+def parse_snapshot(raw, extract_ms=0.0):
+    """Turn SNAPSHOT_JS output into logged fields (shared by sync/async engines)."""
+    try:
+        duration = clean_time_to_secs(raw.get("duration") or "")
+    except ValueError:
+        duration = 0
+    recs = [{"rec_vid": vid_from_url(r["href"]), "rank": r["rank"],
+             "rec_title": r["title"], "rec_channel": r["channel"]} for r in raw.get("recs") or []]
+    return {"title": raw.get("title", ""), "video_id": vid_from_url(raw.get("url", "")),
+            "duration_secs": duration, "recs": recs, "extract_ms": extract_ms}
+
+
+def extract_snapshot(page, limit=20):
+    """
+    Title, video id, duration and the ordered sidebar recs (with rank, title
+    and channel) in a single page round trip, plus how long it took.
+    """
+    t0 = time.perf_counter()
+    raw = page.evaluate(SNAPSHOT_JS, limit)
+    return parse_snapshot(raw, (time.perf_counter() - t0) * 1000)
+
+
 def run_session(persona, keywords, videos_per_day, user_data_dir,
-                dwell_min=20, dwell_max=90, headless=False, dry_run=False):
-    with sync_playwright() as p:
-        browser = p.chromium.launch_persistent_context(user_data_dir=user_data_dir, headless=headless)
-        page = browser.new_page()
-        watched_path, recs_path = out_paths("youtube", persona)
-
-        # Choose a seed query for this session
-        query = random.choice(keywords)
-        page.goto(f"https://www.youtube.com/results?search_query={query}", timeout=120000)
-        page.wait_for_selector("ytd-video-renderer,ytd-rich-item-renderer", timeout=120000)
-
-        # Click the first reasonable video
-        page.click("ytd-video-renderer a#thumbnail >> nth=0")
-        page.wait_for_selector(".html5-video-player", timeout=120000)
-
-        total = 0
+                dwell_min=20, dwell_max=90, headless=False, dry_run=False,
+                base_url="https://www.youtube.com", capture=False, flush_rows=100, flush_secs=30.0,
+                output="csv", lite_mode=False, browsers=None, resume=False, trace=False, metrics_dir=None,
+                archive_dir=None, mem_heap_mb=None, mem_rss_mb=None, mem_interval=30.0, mem_recycle="page",
+                session=0, stop=None):
+    """
+    One day's session; returns the number of videos logged by this call.
+    Pass a PlaywrightManager as `browsers` to reuse a warm browser across
+    sessions; otherwise one is launched and closed here. `session` numbers the
+    day's sessions when several run on one date (--days); each has its own
+    ledger progress and all append to the date's logs. Setting the `stop`
+    event (threading.Event) ends the session before its next video. With
+    resume, a day that was interrupted continues from the ledger's count and
+    last page.
+    With trace, per-phase spans and counters go to trace.jsonl in the day's log
+    dir; with metrics_dir, a Prometheus textfile is written there. With
+    archive_dir, each watch page's raw inputs (sidebar HTML, ytInitialData,
+    captured API responses) are archived for offline re-extraction (archive.py).
+    Every mem_interval seconds (0 = off) JS heap, DOM and browser RSS are
+    sampled to memory.jsonl in the day's log dir; past mem_heap_mb / mem_rss_mb
+    (or after a renderer crash) the page or, with mem_recycle="context", the
+    whole browser is recycled and the chain resumes on the current video.
+    """
+    clock = get_clock()
+    watched_path, recs_path = out_paths("youtube", persona)
+    day = os.path.basename(os.path.dirname(watched_path))
+    ledger_day = session_day(day, session)
+    journal = os.path.join(os.path.dirname(watched_path), ".journal")
+    trace_path = os.path.join(os.path.dirname(watched_path), "trace.jsonl") if trace else None
+    memory_path = os.path.join(os.path.dirname(watched_path), "memory.jsonl") if mem_interval else None
+    with session_tracer("youtube", persona, trace_path, metrics_dir) as tracer, \
+            nullcontext(browsers) if browsers else PlaywrightManager() as pm, Ledger() as ledger, \
+            SeenIndex.open("youtube", persona, "watched") as seen_watched, \
+            SeenIndex.open("youtube", persona, "recs") as seen_recs, \
+            open_log_writer(output, journal, flush_rows, flush_secs) as log, \
+            Archive(archive_dir) if archive_dir else nullcontext() as arc, \
+            MemoryWatchdog(memory_path, mem_heap_mb, mem_rss_mb, mem_interval, mem_recycle,
+                           platform="youtube", persona=persona) as wd:
+        state = ledger.resume("youtube", persona, ledger_day) if resume else None
+        if state and state["count"] >= videos_per_day:
+            print(f"{persona}: {day} already complete ({state['count']} videos).")
+            return 0
+        if not state:
+            ledger.start("youtube", persona, ledger_day)
+        log.after_flush += [ledger.commit, seen_watched.flush, seen_recs.flush]  # durable only once rows are
+        if arc:
+            log.after_flush.append(arc.flush)
+
+        with tracer.span("browser_start"):
+            page = pm.page(user_data_dir, headless, lite.CHROME_ARGS if lite_mode else None)
+        stats = None
+        if lite_mode:
+            # Block images/fonts/beacons, mute and pin the player to its lowest quality
+            stats = lite.LiteStats()
+            lite.attach_playwright(page, stats)
+        cap = None
+        if capture:
+            # Prefer youtubei/v1/next + player JSON over the rendered sidebar
+            cap = ResponseCapture(keep_raw=bool(arc))
+            cap.attach(page)
+        wd.attach(page)
+
+        def reopen(level):
+            # Same video, fresh renderer: lite routes and capture follow the new page
+            url = page.url
+            if level == "context":
+                pm.recycle(user_data_dir)
+            new = pm.page(user_data_dir, headless, lite.CHROME_ARGS if lite_mode else None)
+            if stats:
+                lite.attach_playwright(new, stats)
+            if cap:
+                cap.attach(new)
+            with tracer.span("goto", page="recycle"):
+                new.goto(url, timeout=120000)
+            with tracer.span("wait_selector", page="watch"):
+                new.wait_for_selector(".html5-video-player", timeout=120000)
+            return new
+
+        total = start = state["count"] if state else 0
+        if state and state["cursor"]:
+            # Continue the chain on the page we were about to watch
+            query = state["seed"] or clock.random.choice(keywords)
+            print(f"{persona}: resuming {day} at video {total + 1}")
+            with tracer.span("goto", page="resume"):
+                page.goto(state["cursor"], timeout=120000)
+        else:
+            # Choose a seed query for this session
+            query = clock.random.choice(keywords)
+            with tracer.span("goto", page="results"):
+                page.goto(f"{base_url}/results?search_query={query}", timeout=120000)
+            with tracer.span("wait_selector", page="results"):
+                page.wait_for_selector("ytd-video-renderer,ytd-rich-item-renderer", timeout=120000)
+
+            # Click the first reasonable video
+            with tracer.span("click", target="result"):
+                page.click("ytd-video-renderer a#thumbnail >> nth=0")
+        with tracer.span("wait_selector", page="watch"):
+            page.wait_for_selector(".html5-video-player", timeout=120000)
+
         while total < videos_per_day:
-            time.sleep(2)
-            # Fetch metadata
-            title = page.title()
-            vid_id = page.url.split("v=")[-1].split("&")[0] if "watch?v=" in page.url else page.url
-            try:
-                dur_txt = page.locator(".ytp-time-duration").inner_text(timeout=5000)
-                duration = clean_time_to_secs(dur_txt)
-            except:
-                duration = 0
+            if stop is not None and stop.is_set():
+                tracer.count("stopped")
+                break
+            page = wd.check(page, reopen)
+            clock.sleep(2)
+            # Fetch metadata + sidebar recs in one round trip
+            with tracer.span("extract"):
+                snap = extract_snapshot(page)
+            title, vid_id, duration = snap["title"], snap["video_id"], snap["duration_secs"]
+            if not snap["recs"]:
+                tracer.count("extraction_miss", what="recs")
+            net = cap.take(vid_id) if cap else None
+            blobs = None
+            if arc:
+                with tracer.span("archive"):
+                    raw = page.evaluate(ARCHIVE_JS)
+                    blobs = {"page": arc.put_json(raw["page"]), "sidebar_html": arc.put(raw["sidebar_html"])}
+                    if raw["initial_data"]:
+                        blobs["initial_data"] = arc.put(raw["initial_data"])
+                    if net and net.get("raw"):
+                        blobs["responses"] = [[ep, arc.put_json(data)] for ep, data in net["raw"]]
+            if net:
+                snap["recs"] = net["recs"] or snap["recs"]
+                duration = net["meta"].get("duration_secs") or duration
+            elif cap:
+                tracer.count("capture_miss")
 
             dwell = rand_dwell(dwell_min, dwell_max)
             if duration and dwell > duration: dwell = int(0.9*duration)  # cap to 90%
 
-            # Collect sidebar recs
-            recs = []
-            sidebar = page.locator("ytd-watch-next-secondary-results-renderer #contents a#thumbnail")
-            n = min(sidebar.count(), 20) if sidebar.count() else 0
-            for i in range(n):
-                try:
-                    a = sidebar.nth(i)
-                    href = a.get_attribute("href") or ""
-                    rec_vid = href.split("v=")[-1].split("&")[0] if "watch?v=" in href else href
-                    recs.append({"ts": ts(), "persona": persona, "seed_query": query, "watching": vid_id, "rec_vid": rec_vid})
-                except:
-                    pass
+            # Log sidebar recs
+            now = ts()
+            recs = tag([{"ts": now, "persona": persona, "seed_query": query, "watching": vid_id, **r}
+                        for r in snap["recs"]], seen_recs, "rec_vid")
             if recs:
-                write_rows(recs_path, ["ts","persona","seed_query","watching","rec_vid"], recs)
+                with tracer.span("log_write"):
+                    log.write(recs_path, RECS_HEADER, recs)
 
             # Watch
             if not dry_run:
                 try:
                     page.keyboard.press("k")  # ensure playing
                 except: pass
-                time.sleep(dwell)
+                with tracer.span("dwell"):
+                    clock.sleep(dwell)
 
             # Move to a recommendation (first item)
-            try:
-                sidebar.first.click()
-                page.wait_for_timeout(1000)
-            except:
+            moved = False
+            for _ in range(2):
+                try:
+                    with tracer.span("click", target="sidebar"):
+                        page.locator("ytd-watch-next-secondary-results-renderer #contents a#thumbnail").first.click()
+                    clock.sleep(1)
+                    moved = True
+                    break
+                except:
+                    if not wd.crashed:
+                        break
+                    # the renderer died: the recycled page is back on this video, so click from there
+                    page = wd.check(page, reopen)
+            if not moved:
                 # Fallback: go to homepage
-                page.goto("https://www.youtube.com", timeout=120000)
-                page.wait_for_selector("ytd-rich-item-renderer", timeout=120000)
-                page.click("ytd-rich-item-renderer a#thumbnail >> nth=0")
+                tracer.count("fallback_homepage")
+                with tracer.span("goto", page="home"):
+                    page.goto(base_url, timeout=120000)
+                with tracer.span("wait_selector", page="home"):
+                    page.wait_for_selector("ytd-rich-item-renderer", timeout=120000)
+                with tracer.span("click", target="home"):
+                    page.click("ytd-rich-item-renderer a#thumbnail >> nth=0")
 
             # Log watched
-            write_rows(watched_path,
-                       ["ts","persona","seed_query","video_id","title","dwell_secs","duration_secs"],
-                       [{
-                           "ts": ts(), "persona": persona, "seed_query": query,
-                           "video_id": vid_id, "title": title, "dwell_secs": dwell, "duration_secs": duration
-                        }])
+            ledger.record("youtube", persona, ledger_day, vid_id, total + 1, cursor=page.url, seed=query)
+            watched = tag([{"ts": ts(), "persona": persona, "seed_query": query, "video_id": vid_id,
+                            "title": title, "dwell_secs": dwell, "duration_secs": duration}],
+                          seen_watched, "video_id")
+            with tracer.span("log_write"):
+                log.write(watched_path, WATCHED_HEADER, watched)
+            if blobs:
+                arc.record("youtube", persona, day, {
+                    "kind": "watch", "ts": now, "watched_ts": watched[0]["ts"], "persona": persona,
+                    "seed_query": query, "video_id": vid_id, "dwell_secs": dwell,
+                    "is_repeat": watched[0]["is_repeat"], "capture": bool(cap), "blobs": blobs})
+            tracer.count("videos")
             total += 1
 
-        browser.close()
+        if stats:
+            stats.save(os.path.join(os.path.dirname(watched_path), "lite.jsonl"), persona=persona, videos=total)
+            print(f"[lite] {persona}: {stats.summary()}")
+        if arc:
+            print(f"[archive] {persona}: {arc.summary()}")
+        if wd.recycles:
+            print(f"[memory] {persona}: recycled the {mem_recycle} {wd.recycles}x")
+        return total - start
 
 if __name__ == "__main__":
-    import yaml, os
+    import yaml
     ap = argparse.ArgumentParser()
     ap.add_argument("--persona", required=True)
     ap.add_argument("--days", type=int, default=1)
@@ -98,7 +298,32 @@ if __name__ == "__main__":
     ap.add_argument("--dwell-max", type=int, default=90)
     ap.add_argument("--headless", action="store_true")
     ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--base-url", default="https://www.youtube.com")
+    ap.add_argument("--capture", action="store_true", help="Read recs/metadata from youtubei API responses.")
+    ap.add_argument("--flush-rows", type=int, default=100, help="Write logs after this many buffered rows…")
+    ap.add_argument("--flush-secs", type=float, default=30.0, help="…or after this many seconds.")
+    ap.add_argument("--output", choices=["csv", "parquet", "sqlite"], default="csv")
+    ap.add_argument("--clock", choices=["real", "virtual"], default="real",
+                    help="virtual: skip dwell/sleeps but log timestamps as if they happened.")
+    ap.add_argument("--speedup", type=float, default=0, help="Virtual clock: real sleep = secs/speedup (0 = none).")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--lite", action="store_true",
+                    help="Audit-lite: block images/fonts/trackers, mute and play at lowest quality.")
+    ap.add_argument("--resume", action="store_true", help="Continue today's interrupted session from the ledger.")
+    ap.add_argument("--trace", action="store_true", help="Write per-phase timing spans to trace.jsonl in the log dir.")
+    ap.add_argument("--metrics-dir", default=None, help="Write a Prometheus textfile (.prom) here after each session.")
+    ap.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None,
+                    help="Profile the run; output goes to data/profiles/.")
+    ap.add_argument("--archive", nargs="?", const="data/archive", default=None, metavar="DIR",
+                    help="Archive raw page data for offline re-extraction (default dir: data/archive).")
+    ap.add_argument("--mem-interval", type=float, default=30.0,
+                    help="Sample JS heap/DOM/RSS to memory.jsonl every N seconds (0 = off).")
+    ap.add_argument("--mem-heap-mb", type=float, default=None, help="Recycle when the JS heap exceeds this.")
+    ap.add_argument("--mem-rss-mb", type=float, default=None, help="Recycle when browser RSS exceeds this.")
+    ap.add_argument("--mem-recycle", choices=["page", "context"], default="page",
+                    help="What to recycle past a watermark: the tab, or the whole browser context.")
     args = ap.parse_args()
+    set_clock(make_clock(args.clock, args.speedup, args.seed))
 
     with open("personas/personas.yaml","r") as f:
         cfg = yaml.safe_load(f)
@@ -109,7 +334,16 @@ if __name__ == "__main__":
 
     p = pmap[args.persona]
     ensure_dir(p["user_data_dir"])
-    for _ in range(args.days):
-        run_session(p["name"], p["keywords"], p["videos_per_day"],
-                    p["user_data_dir"], args.dwell_min, args.dwell_max,
-                    headless=args.headless, dry_run=args.dry_run)
+    # one warm browser for all days; each session gets a fresh page
+    with profiled(args.profile, f"data/profiles/youtube_{p['name']}"), PlaywrightManager() as pm:
+        for d in range(args.days):
+            run_session(p["name"], p["keywords"], p["videos_per_day"],
+                        p["user_data_dir"], args.dwell_min, args.dwell_max,
+                        headless=args.headless, dry_run=args.dry_run,
+                        base_url=args.base_url, capture=args.capture,
+                        flush_rows=args.flush_rows, flush_secs=args.flush_secs, output=args.output,
+                        lite_mode=args.lite, browsers=pm, resume=args.resume, session=d,
+                        trace=args.trace, metrics_dir=args.metrics_dir, archive_dir=args.archive,
+                        mem_heap_mb=args.mem_heap_mb, mem_rss_mb=args.mem_rss_mb,
+                        mem_interval=args.mem_interval, mem_recycle=args.mem_recycle)
+        print(f"Browser startup: {pm.report()}")